@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg import sql
+
+from config import get_settings
+
+logger = logging.getLogger('ingest')
+
+"""
+Asyncio write stage for loading many zip members at once.
+
+process_directory's default path gives each member an OS thread that parses a
+chunk, then blocks on the database while to_sql inserts it, then parses the
+next one. With the writer setting 'async' (see config.py and database.py) the
+database writes instead run on one event loop over async_writer_connections
+psycopg async connections:
+- each member is streamed into its table with one COPY in one transaction, so
+  a member is still all-or-nothing;
+- up to async_writer_connections COPY streams are in flight at once; further
+  members wait for a free connection;
+- a member's rows are parsed in a worker thread (pandas parsing is blocking)
+  and handed to its COPY through an asyncio queue of at most
+  async_writer_queue_batches batches, so parsing the next batch overlaps with
+  sending the current one and a slow connection holds back its parser.
+
+A member's parser only starts once its COPY has a connection, so the number of
+busy parse threads never exceeds the number of connections.
+
+benchmark_writers.py compares this path with the thread pool.
+"""
+
+"""
+A member to write. Called in a parse thread once a connection is free; returns
+(table name, COPY column names, iterator of row batches, finish, records year), each
+batch a list of tuples in column order. The table must exist by the time it returns.
+finish(committed) is called once the COPY has committed or failed, so outputs
+written alongside the rows (e.g. Parquet snapshots) are only published with them.
+Unless the records year is None, the table's rows for that year are deleted in the
+COPY's transaction, so a member replaces its earlier load.
+"""
+CopyStream = Callable[[], Tuple[str, Sequence[str], Iterator[List[tuple]], Callable[[bool], None], Optional[int]]]
+
+_DONE = object()
+
+
+def _copy_sql(table_name: str, columns: Sequence[str]) -> sql.Composed:
+    return sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table_name), sql.SQL(', ').join(sql.Identifier(c) for c in columns))
+
+"""
+Parse thread side: move batches from the iterator to the queue until it is exhausted
+or stop is set. A parse error is passed on through the queue.
+"""
+async def _produce(batches: Iterator[List[tuple]], queue: asyncio.Queue, stop: asyncio.Event,
+                   executor: ThreadPoolExecutor):
+    loop = asyncio.get_running_loop()
+    try:
+        while not stop.is_set():
+            batch = await loop.run_in_executor(executor, next, batches, _DONE)
+            await queue.put(batch)
+            if batch is _DONE:
+                return
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        # closes the files and writers held by a generator that was stopped early
+        close = getattr(batches, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(executor, close)
+
+"""
+Write one member over a pooled connection. Returns the number of rows copied.
+"""
+async def _write_stream(stream: CopyStream, connections: asyncio.Queue, conninfo: str,
+                        executor: ThreadPoolExecutor) -> int:
+    loop = asyncio.get_running_loop()
+    connection = await connections.get()
+    try:
+        if connection.broken or connection.closed:
+            connection = await psycopg.AsyncConnection.connect(conninfo, autocommit=True)
+        table_name, columns, batches, finish, records_year = await loop.run_in_executor(executor, stream)
+        logger.info(f"Writing to table: {table_name}")
+
+        queue = asyncio.Queue(maxsize=get_settings().async_writer_queue_batches)
+        stop = asyncio.Event()
+        producer = asyncio.create_task(_produce(batches, queue, stop, executor))
+        rows = 0
+        try:
+            async with connection.transaction(), connection.cursor() as cursor:
+                if records_year is not None:
+                    await cursor.execute(sql.SQL("DELETE FROM {} WHERE records_year = %s").format(
+                        sql.Identifier(table_name)), [records_year])
+                async with cursor.copy(_copy_sql(table_name, columns)) as copy:
+                    while (batch := await queue.get()) is not _DONE:
+                        if isinstance(batch, Exception):
+                            raise batch
+                        for row in batch:
+                            await copy.write_row(row)
+                        rows += len(batch)
+        except BaseException:
+            # unblock the producer so it sees stop and closes the iterator
+            stop.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await producer
+            await loop.run_in_executor(executor, finish, False)
+            raise
+        await producer
+        await loop.run_in_executor(executor, finish, True)
+        return rows
+    finally:
+        connections.put_nowait(connection)
+
+
+async def _write_all(streams: Dict[str, CopyStream], conninfo: str, connection_count: int) -> Dict[str, bool]:
+    connections = asyncio.Queue()
+    for _ in range(connection_count):
+        connections.put_nowait(await psycopg.AsyncConnection.connect(conninfo, autocommit=True))
+
+    results = {}
+
+    async def write(name: str, stream: CopyStream):
+        try:
+            rows = await _write_stream(stream, connections, conninfo, executor)
+            logger.info(f"Finished writing {rows} rows from {name}.")
+            results[name] = True
+        except Exception as e:
+            logger.error(f"Error writing {name}: {e}")
+            results[name] = False
+
+    with ThreadPoolExecutor(max_workers=connection_count, thread_name_prefix='parse') as executor:
+        try:
+            await asyncio.gather(*(write(name, stream) for name, stream in streams.items()))
+        finally:
+            while not connections.empty():
+                await connections.get_nowait().close()
+    return results
+
+"""
+Write every stream ({name: stream}) over at most `connections` async connections.
+Returns {name: True if it was written and committed}; a failed stream is logged and
+does not affect the others.
+"""
+def write_streams(streams: Dict[str, CopyStream], conninfo: str, connections: Optional[int] = None) -> Dict[str, bool]:
+    if not streams:
+        return {}
+    connection_count = min(connections or get_settings().async_writer_connections, len(streams))
+    return asyncio.run(_write_all(streams, conninfo, connection_count))
@@ -0,0 +1,158 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import psycopg
+
+import async_writer
+import config
+import database
+import parallel_load
+from column_encoding import drop_table
+import parquet_snapshots
+from quarantine import conninfo
+
+logger = logging.getLogger('ingest')
+
+"""
+Benchmark of process_directory's two write paths on synthetic members.
+
+Generates --members TSV files of --rows rows each, shaped like HCAD members
+(acct plus text columns), then loads all of them, --repeat times per path:
+- threads: one load_data_from_csv per member on a ThreadPoolExecutor, as
+  process_directory does by default;
+- copy:    the async path's COPY streams (member_copy_stream), each written
+  by its own thread over a blocking psycopg connection, --connections at a
+  time, so the async row against it measures the asyncio stage alone and
+  the threads row against it measures COPY versus to_sql;
+- async:   load_members_async, i.e. COPY streams over --connections async
+  connections (see async_writer.py).
+The benchmark tables (bench_writer_<n>) are dropped before every run and at the
+end. Parquet snapshots are disabled unless --snapshots is given so that only
+parsing and database writes are timed.
+
+Usage (against the database configured in config.py):
+    python benchmark_writers.py --members 8 --rows 200000 --connections 4
+"""
+TABLE_PREFIX = 'bench_writer_'
+BENCHMARK_YEAR = 1900
+COLUMNS = ['acct', 'name', 'site_addr_1', 'site_addr_2', 'state_class', 'land_val', 'bld_val', 'tot_appr_val']
+
+
+def write_members(directory: str, members: int, rows: int) -> List[str]:
+    generator = random.Random(42)
+    paths = []
+    for member in range(members):
+        path = os.path.join(directory, f'{TABLE_PREFIX}{member}.txt')
+        with open(path, 'w', encoding='MacRoman', newline='') as file:
+            file.write('\t'.join(COLUMNS) + '\n')
+            for row in range(rows):
+                file.write('\t'.join([
+                    f'{row:013d}',
+                    f'OWNER {generator.randrange(100000)}',
+                    f'{generator.randrange(1, 20000)} MAIN ST',
+                    'HOUSTON TX',
+                    generator.choice(['A1', 'B2', 'F1', 'XV']),
+                    str(generator.randrange(10 ** 6)),
+                    str(generator.randrange(10 ** 6)),
+                    str(generator.randrange(10 ** 7)),
+                ]) + '\n')
+        paths.append(path)
+    return paths
+
+
+def drop_tables(paths: List[str]):
+    # with the storage and dictionary tables of their encoded columns
+    for path in paths:
+        drop_table(config.get_engine(), database.getTableName(path))
+
+
+def load_with_threads(paths: List[str]) -> bool:
+    with ThreadPoolExecutor() as executor:
+        loaded = executor.map(lambda path: database.load_data_from_csv(path, BENCHMARK_YEAR, threading.Semaphore(1)), paths)
+        return all(list(loaded))
+
+
+def copy_member(path: str, dsn: str) -> bool:
+    try:
+        # the benchmark drops its tables before each run, so there are no earlier rows for the year to replace
+        table_name, columns, batches, finish, _ = database.member_copy_stream(path, BENCHMARK_YEAR)()
+    except Exception as e:
+        logger.error(f"copy: error preparing {path}: {e}")
+        return False
+    try:
+        # the connection commits when the block exits without an error
+        with psycopg.connect(dsn) as connection, connection.cursor() as cursor, \
+                cursor.copy(async_writer._copy_sql(table_name, columns)) as copy:
+            for batch in batches:
+                for row in batch:
+                    copy.write_row(row)
+    except Exception as e:
+        batches.close()
+        finish(False)
+        logger.error(f"copy: error writing {path}: {e}")
+        return False
+    finish(True)
+    parquet_snapshots.remove_stale_parts(table_name, BENCHMARK_YEAR, 1)
+    return True
+
+
+def load_with_thread_copy(paths: List[str]) -> bool:
+    # large members go through parallel_load, as in load_members_async
+    large = [path for path in paths if parallel_load.should_load_in_parallel(path)]
+    dsn = conninfo(config.get_engine())
+    with ThreadPoolExecutor(max_workers=config.get_settings().async_writer_connections) as executor:
+        loaded = list(executor.map(lambda path: copy_member(path, dsn), [p for p in paths if p not in large]))
+    loaded += [database.load_data_from_csv(path, BENCHMARK_YEAR, threading.Semaphore(1)) for path in large]
+    return all(loaded)
+
+
+def load_with_async(paths: List[str]) -> bool:
+    return all(database.load_members_async(paths, BENCHMARK_YEAR).values())
+
+
+def time_load(name: str, load: Callable[[List[str]], bool], paths: List[str], total_rows: int, repeat: int):
+    for run in range(repeat):
+        drop_tables(paths)
+        started = time.perf_counter()
+        loaded = load(paths)
+        elapsed = time.perf_counter() - started
+        status = '' if loaded else ' (errors, see log)'
+        print(f"{name:8} run {run + 1}: {elapsed:8.2f}s  {total_rows / elapsed:12,.0f} rows/s{status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the thread pool, threaded COPY and asyncio ingest writers.')
+    parser.add_argument('--members', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=200000, help='rows per member')
+    parser.add_argument('--connections', type=int, help='default: the async_writer_connections setting')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--snapshots', action='store_true', help='also write Parquet snapshots')
+    parser.add_argument('--config', help='ingest config file (see config.py)')
+    args = parser.parse_args()
+
+    overrides = {} if args.snapshots else {'parquet_snapshot_dir': ''}
+    if args.connections:
+        overrides['async_writer_connections'] = args.connections
+    settings = config.configure(args.config, **overrides)
+    config.configure_logging(settings)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_members(directory, args.members, args.rows)
+        total_rows = args.members * args.rows
+        print(f"{args.members} members x {args.rows} rows, {settings.async_writer_connections} copy threads / async connections")
+        try:
+            time_load('threads', load_with_threads, paths, total_rows, args.repeat)
+            time_load('copy', load_with_thread_copy, paths, total_rows, args.repeat)
+            time_load('async', load_with_async, paths, total_rows, args.repeat)
+        finally:
+            drop_tables(paths)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+
+import config
+
+logger = logging.getLogger('ingest')
+
+"""
+Command line entry point for the ingest.
+
+    python cli.py [--config FILE] codebook [--pdf PATH]
+    python cli.py [--config FILE] load [--folder DIR] [--year YEAR] [--no-refresh] [FILE ...]
+    python cli.py [--config FILE] refresh [--year YEAR ...]
+    python cli.py [--config FILE] verify [--counts]
+    python cli.py [--config FILE] encode [--no-refresh] [TABLE ...]
+    python cli.py [--config FILE] enqueue [--folder DIR] [--wait] [--no-refresh]
+    python cli.py [--config FILE] worker [--processes N] [--exit-when-idle]
+    python cli.py [--config FILE] queue
+
+- codebook: print the suggested primary keys read from pdataCodebook.pdf as JSON;
+- load:     load the zip files in the records folder (or only the given extracted
+            member files), then refresh and verify unless --no-refresh is given or
+            nothing changed since the last load;
+- refresh:  rebuild the summary tables, year-over-year value deltas (of the given years and
+            any missing ones) and search indexes and bump the data generation;
+- verify:   log the tables in the database, with row counts per records year if --counts;
+- encode:   dictionary-encode the low-cardinality columns of tables loaded before encoding
+            existed (see column_encoding.py), then refresh unless --no-refresh;
+- enqueue:  queue the changed members of the records folder for queue workers and, with
+            --wait, wait for them and then refresh and verify (see work_queue.py);
+- worker:   claim and load queued tasks, in N local processes;
+- queue:    show the members of the latest queued runs and their progress.
+
+Settings come from the config file and environment (see config.py). This module only
+imports the standard library and config.py; each command imports what it needs, and the
+worker processes spawned by parallel_load.py, which re-import the main module, start
+without pandas, pdfplumber or a database connection of their own.
+
+Exit status is 0 on success and 1 if a load had errors, verify found no tables or a worker
+process failed.
+"""
+
+
+def _codebook(args) -> int:
+    import database
+
+    database.retieve_primary_keys(args.pdf or f"{config.records_folder_path()}/{database.CODEBOOK_FILE}")
+    print(json.dumps(database.suggested_keys, indent=2, sort_keys=True))
+    return 0
+
+
+def _load(args) -> int:
+    import database
+
+    loaded, loaded_count = database.load(args.folder, args.files, args.year)
+    if args.no_refresh:
+        return 0 if loaded else 1
+    if loaded and loaded_count == 0:
+        logger.info("No zip members changed since the last load; nothing to refresh.")
+        return 0
+
+    database.refresh(loaded, [args.year or database.records_year(args.folder or config.records_folder_path())])
+    database.verify()
+    return 0 if loaded else 1
+
+
+def _refresh(args) -> int:
+    import database
+
+    database.refresh(years=args.year or ())
+    return 0
+
+
+def _verify(args) -> int:
+    import database
+
+    return 0 if database.verify(args.counts) else 1
+
+
+def _encode(args) -> int:
+    import database
+
+    encodings = database.encode_tables(args.tables)
+    for table, encoding in encodings.items():
+        logger.info(f"{table}: {', '.join(encoding) or 'no columns'} encoded")
+    if not args.no_refresh:
+        database.refresh()
+    return 0
+
+
+def _enqueue(args) -> int:
+    import work_queue
+    from quarantine import new_run_id
+
+    run_id = new_run_id()
+    records_folder = args.folder or config.records_folder_path()
+    member_ids = work_queue.enqueue_directory(records_folder, run_id)
+    logger.info(f"Queued {len(member_ids)} members as run {run_id}")
+    if not args.wait or not member_ids:
+        return 0
+
+    merged, failed = work_queue.wait_for_run(config.get_engine(), run_id)
+    if not args.no_refresh:
+        import database
+
+        database.refresh(failed == 0, [database.records_year(records_folder)])
+        database.verify()
+    return 0 if failed == 0 else 1
+
+
+def _worker(args) -> int:
+    import work_queue
+
+    if args.processes == 1:
+        work_queue.run_worker(exit_when_idle=args.exit_when_idle)
+        return 0
+    return 0 if work_queue.run_local_workers(args.processes, args.config, args.exit_when_idle) == 0 else 1
+
+
+def _queue(args) -> int:
+    import work_queue
+
+    work_queue.queue_status(config.get_engine())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Load HCAD records into PostgreSQL.')
+    parser.add_argument('--config', help='INI file with an [ingest] section (default: $INGEST_CONFIG or ingest.ini)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    codebook = commands.add_parser('codebook', help='print the suggested primary keys from the codebook')
+    codebook.add_argument('--pdf', help='codebook PDF (default: pdataCodebook.pdf in the records folder)')
+    codebook.set_defaults(handler=_codebook)
+
+    load = commands.add_parser('load', help='load zip files or extracted member files')
+    load.add_argument('--folder', help='records folder for one year (default: records_folder setting)')
+    load.add_argument('--year', type=int, help='records year for FILE arguments (default: the folder name)')
+    load.add_argument('--no-refresh', action='store_true', help='skip summary tables, search indexes and verify')
+    load.add_argument('files', nargs='*', metavar='FILE')
+    load.set_defaults(handler=_load)
+
+    refresh = commands.add_parser('refresh', help='rebuild summary tables and search indexes, bump the data generation')
+    refresh.add_argument('--year', type=int, action='append', help='also recompute the value deltas of this records year')
+    refresh.set_defaults(handler=_refresh)
+
+    verify = commands.add_parser('verify', help='list the loaded tables')
+    verify.add_argument('--counts', action='store_true', help='also count rows per records year')
+    verify.set_defaults(handler=_verify)
+
+    encode = commands.add_parser('encode', help='dictionary-encode low-cardinality columns of existing tables')
+    encode.add_argument('--no-refresh', action='store_true', help='skip recreating the summary tables')
+    encode.add_argument('tables', nargs='*', metavar='TABLE', help='tables to encode (default: every loaded table)')
+    encode.set_defaults(handler=_encode)
+
+    enqueue = commands.add_parser('enqueue', help='queue changed members for queue workers')
+    enqueue.add_argument('--folder', help='records folder for one year (default: records_folder setting)')
+    enqueue.add_argument('--wait', action='store_true', help='wait for the queued members, then refresh and verify')
+    enqueue.add_argument('--no-refresh', action='store_true', help='with --wait, skip refresh and verify')
+    enqueue.set_defaults(handler=_enqueue)
+
+    worker = commands.add_parser('worker', help='load queued tasks')
+    worker.add_argument('--processes', type=int, default=1, help='worker processes to run on this host')
+    worker.add_argument('--exit-when-idle', action='store_true', help='exit once no queued member is left loading')
+    worker.set_defaults(handler=_worker)
+
+    queue = commands.add_parser('queue', help='show queued runs and their progress')
+    queue.set_defaults(handler=_queue)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = config.configure(args.config)
+    config.configure_logging(settings)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
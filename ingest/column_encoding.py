@@ -0,0 +1,479 @@
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import psycopg
+from psycopg import sql
+
+from config import get_settings
+
+# parse workers only use ColumnEncoder, so SQLAlchemy is imported by the functions that need it
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger('ingest')
+
+"""
+Dictionary encoding of low-cardinality text columns.
+
+Every column is loaded as text, so code columns such as state_class repeat the
+same short strings millions of times. When the ingest creates a table it
+samples the member file and stores each low-cardinality column as a SMALLINT
+code instead, with the text in a dictionary table per column:
+    <table>__<column>_codes (code SMALLINT PRIMARY KEY, value TEXT UNIQUE)
+The rows of a table with encoded columns are stored in <table>__encoded and
+<table> itself is a view joining the codes back to their text, so readers
+(the web app, the summary tables, users' SQL) query the same relation with the
+same text columns whether or not it is encoded. Rows are smaller, so scans and
+GROUP BYs on those columns touch far fewer pages. Writers write to
+storage_table_name(table, encoding); a table without encoded columns is stored
+under its own name.
+
+A column is encoded if, in the first encoding_sample_rows rows of the file,
+it has at most encoding_max_distinct distinct values and not every value is a
+number (measures such as land_val stay text), unless it is excluded by the
+caller (keys, searched columns). The encoded_columns setting forces columns
+regardless of the sample. Files with fewer than encoding_min_sample_rows rows
+are not worth encoding (see config.py for the settings). The choice is recorded in ENCODED_TABLE_TABLE and
+ENCODED_COLUMN_TABLE when the table is created and kept for its lifetime, so
+every later load writes the same layout.
+
+Codes are assigned while loading by ColumnEncoder: a value not yet in the
+dictionary is inserted on a separate autocommit connection, so codes are
+shared by concurrent loads and a rolled back load at most leaves unused
+codes. A SMALLINT dictionary holds 32767 values; a load that needs more fails
+with EncodingOverflow, and the loader widens the column's codes to INTEGER
+(widen_encoded_column) and loads the member again.
+
+Tables loaded before encoding existed keep their text columns until they are
+converted with `python cli.py encode` (see encode_existing_table).
+"""
+ENCODED_TABLE_TABLE = 'ingest_encoded_tables'
+ENCODED_COLUMN_TABLE = 'ingest_encoded_columns'
+ENCODED_TABLE_SUFFIX = '__encoded'
+SMALLINT_CODES = 32767  # codes a SMALLINT dictionary can hold
+FILE_ENCODING = 'MacRoman'
+
+NUMERIC_PATTERN = r'^\s*-?[0-9]+(\.[0-9]+)?\s*$'
+
+# {column: dictionary table}
+Encoding = Dict[str, str]
+
+
+def dictionary_table_name(table_name: str, column: str) -> str:
+    suffix = f"__{column}_codes"
+    return table_name[:63 - len(suffix)] + suffix
+
+
+def encoded_table_name(table_name: str) -> str:
+    return table_name[:63 - len(ENCODED_TABLE_SUFFIX)] + ENCODED_TABLE_SUFFIX
+
+"""
+The table holding table_name's rows: <table>__encoded if it has encoded columns, else the table itself.
+"""
+def storage_table_name(table_name: str, encoding: Optional[Encoding]) -> str:
+    return encoded_table_name(table_name) if encoding else table_name
+
+
+class EncodingOverflow(Exception):
+    """A dictionary ran out of SMALLINT codes; the load must be retried once widen_encoded_column has run."""
+
+    def __init__(self, dictionary_table: str):
+        super().__init__(dictionary_table)
+        self.dictionary_table = dictionary_table
+
+    def __str__(self):
+        return f"Dictionary {self.dictionary_table} has no SMALLINT codes left"
+
+"""
+Returns the columns of table_name forced by the encoded_columns setting ("table.column, ...").
+"""
+def forced_encoded_columns(table_name: str) -> List[str]:
+    columns = []
+    for pair in get_settings().encoded_columns.split(','):
+        table, _, column = pair.strip().partition('.')
+        if table == table_name and column:
+            columns.append(column)
+    return columns
+
+"""
+Returns the columns to encode given the sampled (distinct values, all numeric) of each column.
+"""
+def choose_encoded_columns(table_name: str, sample_rows: int, column_stats: Dict[str, Tuple[int, bool]],
+                           excluded: Iterable[str] = ()) -> List[str]:
+    settings = get_settings()
+    forced = set(forced_encoded_columns(table_name))
+    excluded = set(excluded) | {'records_year'}
+    chosen = []
+    for column, (distinct, numeric) in column_stats.items():
+        if column in forced:
+            chosen.append(column)
+        elif (sample_rows >= settings.encoding_min_sample_rows and column not in excluded
+              and 0 < distinct <= settings.encoding_max_distinct and not numeric):
+            chosen.append(column)
+    return chosen
+
+"""
+Returns (rows sampled, {column: (distinct values, all numeric)}) for the start of a cleaned member file.
+"""
+def sample_member_file(file_path: str) -> Tuple[int, Dict[str, Tuple[int, bool]]]:
+    sample = pd.read_csv(file_path, sep='\x09', engine='python', encoding=FILE_ENCODING, escapechar='\\',
+                         doublequote=False, on_bad_lines='skip', nrows=get_settings().encoding_sample_rows, dtype=str)
+    stats = {}
+    for column in sample.columns:
+        values = sample[column].dropna()
+        stats[str(column)] = (values.nunique(), bool(values.str.match(NUMERIC_PATTERN).all()))
+    return len(sample), stats
+
+
+def _ensure_tables(connection: 'Connection'):
+    from sqlalchemy import text
+
+    # loads of different tables decide their encodings concurrently
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': ENCODED_COLUMN_TABLE})
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ENCODED_TABLE_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            sample_rows INTEGER NOT NULL,
+            decided_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ENCODED_COLUMN_TABLE} (
+            table_name TEXT NOT NULL REFERENCES {ENCODED_TABLE_TABLE} ON DELETE CASCADE,
+            column_name TEXT NOT NULL,
+            dictionary_table TEXT NOT NULL,
+            sample_distinct INTEGER,
+            PRIMARY KEY (table_name, column_name)
+        )
+    """))
+
+
+def _create_dictionary(connection: 'Connection', dictionary_table: str):
+    from sqlalchemy import text
+
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS "{dictionary_table}" (
+            code SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        )
+    """))
+
+"""
+Record the encoding chosen for table_name and create its dictionary tables. Returns it.
+"""
+def _record_encoding(connection: 'Connection', table_name: str, sample_rows: int,
+                     column_stats: Dict[str, Tuple[int, bool]], columns: Sequence[str]) -> Encoding:
+    from sqlalchemy import text
+
+    connection.execute(text(f"DELETE FROM {ENCODED_TABLE_TABLE} WHERE table_name = :table"), {'table': table_name})
+    connection.execute(text(f"INSERT INTO {ENCODED_TABLE_TABLE} (table_name, sample_rows) VALUES (:table, :rows)"),
+                       {'table': table_name, 'rows': sample_rows})
+    encoding = {}
+    for column in columns:
+        encoding[column] = dictionary_table_name(table_name, column)
+        _create_dictionary(connection, encoding[column])
+        connection.execute(text(f"""
+            INSERT INTO {ENCODED_COLUMN_TABLE} (table_name, column_name, dictionary_table, sample_distinct)
+            VALUES (:table, :column, :dictionary, :distinct)
+        """), {'table': table_name, 'column': column, 'dictionary': encoding[column],
+               'distinct': column_stats.get(column, (None, False))[0]})
+    return encoding
+
+"""
+Returns the recorded encoding of table_name ({} if it has none).
+"""
+def load_table_encoding(engine: 'Engine', table_name: str) -> Encoding:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT to_regclass(:name)"), {'name': ENCODED_COLUMN_TABLE}).scalar() is None:
+            return {}
+        rows = connection.execute(text(
+            f"SELECT column_name, dictionary_table FROM {ENCODED_COLUMN_TABLE} WHERE table_name = :table"),
+            {'table': table_name})
+        return dict(rows.all())
+
+"""
+The encoding for loading cleaned_file into table_name. If the table does not exist yet it
+is chosen from a sample of the file (never encoding the excluded columns) and recorded;
+otherwise the table keeps the encoding it was created with.
+"""
+def table_encoding(engine: 'Engine', table_name: str, cleaned_file: str, excluded: Iterable[str] = ()) -> Encoding:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        # the storage table alone if a load stopped before creating the view
+        exists = connection.execute(text("SELECT coalesce(to_regclass(:name), to_regclass(:storage))"),
+                                    {'name': table_name, 'storage': encoded_table_name(table_name)}).scalar() is not None
+    if exists:
+        return load_table_encoding(engine, table_name)
+
+    sample_rows, column_stats = sample_member_file(cleaned_file)
+    columns = choose_encoded_columns(table_name, sample_rows, column_stats, excluded)
+    with engine.begin() as connection:
+        _ensure_tables(connection)
+        encoding = _record_encoding(connection, table_name, sample_rows, column_stats, columns)
+    if encoding:
+        logger.info(f"Dictionary-encoding {table_name} columns: {', '.join(encoding)}")
+    return encoding
+
+
+"""
+Replaces the values of a table's encoded columns in parsed frames with their codes,
+adding unseen values to the dictionaries. Codes are cached for the encoder's lifetime;
+use as a context manager to close its connection. Raises EncodingOverflow when a
+SMALLINT dictionary is full.
+"""
+class ColumnEncoder:
+
+    def __init__(self, conninfo: str, encoding: Optional[Encoding]):
+        self.conninfo = conninfo
+        self.encoding = encoding or {}
+        self.codes: Dict[str, Dict[str, int]] = {column: {} for column in self.encoding}
+        self.connection = None
+
+    def _lookup(self, dictionary_table: str, values: List[str]) -> Dict[str, int]:
+        if self.connection is None:
+            self.connection = psycopg.connect(self.conninfo, autocommit=True)
+        select = sql.SQL("SELECT value, code FROM {} WHERE value = ANY(%s)").format(sql.Identifier(dictionary_table))
+        with self.connection.cursor() as cursor:
+            codes = dict(cursor.execute(select, (values,)).fetchall())
+            new_values = [value for value in values if value not in codes]
+            if new_values:
+                # ON CONFLICT: another load may add the same value first
+                try:
+                    cursor.execute(sql.SQL(
+                        "INSERT INTO {} (value) SELECT unnest(%s::text[]) ON CONFLICT (value) DO NOTHING"
+                    ).format(sql.Identifier(dictionary_table)), (new_values,))
+                except psycopg.errors.SequenceGeneratorLimitExceeded:
+                    raise EncodingOverflow(dictionary_table) from None
+                codes.update(cursor.execute(select, (new_values,)).fetchall())
+        return codes
+
+    def encode(self, frame: pd.DataFrame) -> pd.DataFrame:
+        if not self.encoding:
+            return frame
+        frame = frame.copy()
+        for column, dictionary_table in self.encoding.items():
+            if column not in frame.columns:
+                continue
+            codes = self.codes[column]
+            unseen = [value for value in frame[column].dropna().unique() if value not in codes]
+            if unseen:
+                codes.update(self._lookup(dictionary_table, unseen))
+            frame[column] = pd.Series([codes.get(value) for value in frame[column]], index=frame.index, dtype=object)
+        return frame
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _decoding_view_sql(connection: 'Connection', table_name: str, encoding: Encoding) -> str:
+    from sqlalchemy import text
+
+    storage_table = encoded_table_name(table_name)
+    columns = connection.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table
+        ORDER BY ordinal_position
+    """), {'table': storage_table}).scalars().all()
+    selected, joins = [], []
+    for column in columns:
+        if column in encoding:
+            alias = f"d{len(joins)}"
+            selected.append(f'{alias}.value AS "{column}"')
+            joins.append(f'LEFT JOIN "{encoding[column]}" {alias} ON {alias}.code = t."{column}"')
+        else:
+            selected.append(f't."{column}"')
+    return f'SELECT {", ".join(selected)} FROM "{storage_table}" t {" ".join(joins)}'
+
+
+def _create_decoding_view(connection: 'Connection', table_name: str, encoding: Encoding):
+    from sqlalchemy import text
+
+    connection.execute(text(f'CREATE VIEW "{table_name}" AS {_decoding_view_sql(connection, table_name, encoding)}'))
+
+"""
+Drop the views and materialized views reading relation (e.g. the summary tables), which the
+next refresh recreates. Returns their names.
+"""
+def _drop_dependent_views(connection: 'Connection', relation: str) -> List[str]:
+    from sqlalchemy import text
+
+    views = connection.execute(text("""
+        SELECT DISTINCT v.relname, v.relkind FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = to_regclass(:relation) AND v.oid <> d.refobjid
+    """), {'relation': relation}).all()
+    for name, kind in views:
+        connection.execute(text(f'DROP {"MATERIALIZED VIEW" if kind == "m" else "VIEW"} IF EXISTS "{name}" CASCADE'))
+    if views:
+        logger.warning(f"Dropped views reading {relation} until the next refresh: {', '.join(name for name, _ in views)}")
+    return [name for name, _ in views]
+
+"""
+Create the view table_name over its storage table (see storage_table_name) once the storage
+table exists. Does nothing for a table without encoded columns or whose view exists.
+"""
+def create_decoding_view(engine: 'Engine', table_name: str, encoding: Encoding):
+    from sqlalchemy import text
+
+    if not encoding:
+        return
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': table_name})
+        if connection.execute(text("SELECT to_regclass(:name)"), {'name': table_name}).scalar() is None:
+            _create_decoding_view(connection, table_name, encoding)
+
+"""
+Widen the codes of the column whose dictionary overflowed (see EncodingOverflow) from SMALLINT
+to INTEGER, in the dictionary and in the table's storage table. The table's view is recreated
+and the views reading it are dropped until the next refresh. Waits for loads still writing to
+the table, so it must run once the failed load has rolled back. Returns False (logged) on failure.
+"""
+def widen_encoded_column(engine: 'Engine', dictionary_table: str) -> bool:
+    from sqlalchemy import text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    try:
+        with engine.begin() as connection:
+            # serializes loads widening the same column
+            _ensure_tables(connection)
+            row = connection.execute(text(
+                f"SELECT table_name, column_name FROM {ENCODED_COLUMN_TABLE} WHERE dictionary_table = :dictionary"),
+                {'dictionary': dictionary_table}).first()
+            if row is None:
+                raise ValueError(f"{dictionary_table} is not a recorded dictionary")
+            table_name, column = row
+            storage_table = encoded_table_name(table_name)
+            data_type = connection.execute(text("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+            """), {'table': storage_table, 'column': column}).scalar()
+            if data_type != 'smallint':
+                # widened by a concurrent load
+                return True
+            encoding = dict(connection.execute(text(
+                f"SELECT column_name, dictionary_table FROM {ENCODED_COLUMN_TABLE} WHERE table_name = :table"),
+                {'table': table_name}).all())
+
+            _drop_dependent_views(connection, table_name)
+            connection.execute(text(f'DROP VIEW IF EXISTS "{table_name}"'))
+            # the identity sequence behind the codes is widened with its column
+            connection.execute(text(f'ALTER TABLE "{dictionary_table}" ALTER COLUMN code TYPE INTEGER'))
+            connection.execute(text(f'ALTER TABLE "{storage_table}" ALTER COLUMN "{column}" TYPE INTEGER'))
+            _create_decoding_view(connection, table_name, encoding)
+        logger.warning(f"Widened the codes of {table_name}.{column} to INTEGER")
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        logger.error(f"Error widening the codes of {dictionary_table}: {e}")
+        return False
+
+"""
+Returns the loaded tables stored as text: base tables with a records_year column, other than
+the ingest's own tables (ingest_*, staging, dictionary and <table>__encoded storage tables) and
+those in excluded.
+"""
+def loaded_tables(engine: 'Engine', excluded: Iterable[str] = ()) -> List[str]:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        tables = connection.execute(text("""
+            SELECT c.table_name FROM information_schema.columns c
+            JOIN information_schema.tables t USING (table_schema, table_name)
+            WHERE c.table_schema = current_schema() AND c.column_name = 'records_year'
+              AND t.table_type = 'BASE TABLE' AND c.table_name NOT LIKE 'ingest\\_%' AND c.table_name NOT LIKE '%\\_\\_%'
+            ORDER BY c.table_name
+        """)).scalars().all()
+    return [table for table in tables if table not in set(excluded)]
+
+"""
+Drop table_name with its storage table, dictionaries and recorded encoding, e.g. a benchmark's tables.
+"""
+def drop_table(engine: 'Engine', table_name: str):
+    from sqlalchemy import text
+
+    encoding = load_table_encoding(engine, table_name)
+    with engine.begin() as connection:
+        if not encoding:
+            connection.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+            return
+        connection.execute(text(f'DROP VIEW IF EXISTS "{table_name}" CASCADE'))
+        connection.execute(text(f'DROP TABLE IF EXISTS "{encoded_table_name(table_name)}"'))
+        for dictionary_table in encoding.values():
+            connection.execute(text(f'DROP TABLE IF EXISTS "{dictionary_table}"'))
+        connection.execute(text(f"DELETE FROM {ENCODED_TABLE_TABLE} WHERE table_name = :table"), {'table': table_name})
+
+"""
+Convert a table loaded before encoding existed: choose its columns from a sample of its
+rows, fill their dictionaries, move the rows to the table's storage table with the columns
+rewritten as codes in one ALTER TABLE, and create the table's view in its place. Views
+reading the table (e.g. summary tables) are dropped and are recreated by the next refresh.
+Returns the encoding; a table with a recorded encoding is left alone.
+"""
+def encode_existing_table(engine: 'Engine', table_name: str, excluded: Iterable[str] = ()) -> Encoding:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        if connection.execute(text("SELECT to_regclass(:name)"), {'name': ENCODED_TABLE_TABLE}).scalar() is not None:
+            if connection.execute(text(f"SELECT 1 FROM {ENCODED_TABLE_TABLE} WHERE table_name = :table"),
+                                  {'table': table_name}).first():
+                logger.info(f"{table_name} already has a recorded encoding")
+                return load_table_encoding(engine, table_name)
+        text_columns = connection.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :table AND data_type IN ('text', 'character varying')
+            ORDER BY ordinal_position
+        """), {'table': table_name}).scalars().all()
+        if not text_columns:
+            raise ValueError(f"Table {table_name} not found or has no text columns")
+
+        aggregates = ', '.join(
+            f'count(DISTINCT "{column}"), coalesce(bool_and("{column}" ~ \'{NUMERIC_PATTERN}\'), true)'
+            for column in text_columns)
+        row = connection.execute(text(
+            f'SELECT count(*), {aggregates} FROM (SELECT * FROM "{table_name}" LIMIT {get_settings().encoding_sample_rows}) s')).one()
+    sample_rows = row[0]
+    column_stats = {column: (row[1 + 2 * i], row[2 + 2 * i]) for i, column in enumerate(text_columns)}
+    columns = choose_encoded_columns(table_name, sample_rows, column_stats, excluded)
+
+    storage_table = encoded_table_name(table_name)
+    with engine.begin() as connection:
+        _ensure_tables(connection)
+        encoding = _record_encoding(connection, table_name, sample_rows, column_stats, columns)
+        if not encoding:
+            return encoding
+        # a column with more distinct values than SMALLINT codes gets INTEGER codes straight away
+        distinct_sql = ', '.join(f'count(DISTINCT "{column}")' for column in encoding)
+        distinct_counts = connection.execute(text(f'SELECT {distinct_sql} FROM "{table_name}"')).one()
+        _drop_dependent_views(connection, table_name)
+        connection.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{storage_table}"'))
+        alterations = []
+        for index, ((column, dictionary_table), distinct) in enumerate(zip(encoding.items(), distinct_counts)):
+            code_type = 'SMALLINT' if distinct <= SMALLINT_CODES else 'INTEGER'
+            if code_type == 'INTEGER':
+                connection.execute(text(f'ALTER TABLE "{dictionary_table}" ALTER COLUMN code TYPE INTEGER'))
+            connection.execute(text(
+                f'INSERT INTO "{dictionary_table}" (value) SELECT DISTINCT "{column}" FROM "{storage_table}" '
+                f'WHERE "{column}" IS NOT NULL ORDER BY 1 ON CONFLICT (value) DO NOTHING'))
+            # ALTER ... USING cannot contain a subquery, so the lookup goes through a function
+            connection.execute(text(
+                f"CREATE OR REPLACE FUNCTION pg_temp.ingest_code_{index}(text) RETURNS INTEGER STABLE LANGUAGE sql "
+                f"AS 'SELECT code FROM \"{dictionary_table}\" WHERE value = $1'"))
+            alterations.append(f'ALTER COLUMN "{column}" TYPE {code_type} USING pg_temp.ingest_code_{index}("{column}")')
+        logger.info(f"Rewriting {table_name} with dictionary-encoded columns: {', '.join(encoding)}")
+        connection.execute(text(f'ALTER TABLE "{storage_table}" {", ".join(alterations)}'))
+        _create_decoding_view(connection, table_name, encoding)
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text(f'ANALYZE "{storage_table}"'))
+    return encoding
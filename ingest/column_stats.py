@@ -0,0 +1,308 @@
+import logging
+import math
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import get_settings
+from shared_definitions import COLUMN_STATS_TABLE
+
+# parse workers only accumulate statistics, so SQLAlchemy is imported by the functions that store them
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger('ingest')
+
+"""
+Per-column statistics of each loaded table and records year, computed while parsing.
+
+Every loader path feeds the frames it parses (the text, before dictionary
+encoding) to a TableStats, so the statistics cost no extra scan of the file or
+the table. Per column it keeps:
+- the null count (empty fields are nulls);
+- a HyperLogLog estimate of the distinct values (2**STATS_HLL_PRECISION
+  registers, about 1.6% standard error at the default; small counts are
+  estimated by linear counting and are close to exact);
+- the smallest and largest value in code point order and the longest value;
+- whether every value is a number and, if so, the numeric minimum and maximum.
+Frames are buffered up to stats_batch_rows rows and processed together, so the
+small chunks of the to_sql path do not add per-chunk overhead.
+
+Statistics from different workers merge exactly (the HLL registers merge by
+maximum), so parallel ranges and queue tasks each profile their own rows. Once
+a member has loaded, its statistics replace the table and year's rows in
+COLUMN_STATS_TABLE; the queue keeps each range's in STATS_PART_TABLE until the
+member's merge task combines them. Rows quarantined while parsing are not
+counted. The web app's `tables/stats/` endpoint serves COLUMN_STATS_TABLE.
+Min and max values are stored truncated to stats_max_value_length characters
+(see config.py for the settings).
+"""
+STATS_PART_TABLE = 'ingest_column_stats_parts'
+STATS_HLL_PRECISION = 12  # not a setting: stored registers only merge with registers of the same precision
+
+_STAT_COLUMNS = ('ordinal', 'row_count', 'null_count', 'distinct_estimate', 'min_value', 'max_value',
+                 'max_length', 'is_numeric', 'numeric_min', 'numeric_max', 'hll')
+
+"""
+Accumulated statistics of one column.
+"""
+class ColumnStats:
+
+    def __init__(self, precision: int = STATS_HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.row_count = 0
+        self.null_count = 0
+        self.min_value: Optional[str] = None
+        self.max_value: Optional[str] = None
+        self.max_length = 0
+        self.is_numeric = True
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+
+    def update(self, values: pd.Series):
+        rows = len(values)
+        values = values.dropna()
+        self.row_count += rows
+        self.null_count += rows - len(values)
+        if values.empty:
+            return
+        # no statistic below depends on duplicates, so they are computed over the distinct values
+        values = pd.Series(values.unique()).astype(str)
+        self._add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.min_value = _keep(min, self.min_value, values.min())
+        self.max_value = _keep(max, self.max_value, values.max())
+        self.max_length = max(self.max_length, int(values.str.len().max()))
+        if self.is_numeric:
+            numbers = pd.to_numeric(values, errors='coerce')
+            if numbers.isna().any():
+                self.is_numeric, self.numeric_min, self.numeric_max = False, None, None
+            else:
+                self.numeric_min = _keep(min, self.numeric_min, float(numbers.min()))
+                self.numeric_max = _keep(max, self.numeric_max, float(numbers.max()))
+
+    def _add_hashes(self, hashes: np.ndarray):
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << width) - 1)
+        # rank: position of the leftmost 1 bit in the remaining bits; frexp's exponent is the bit
+        # length, exact here since the remainder has fewer than 53 bits
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        np.maximum.at(self.registers, index, (width - bit_length + 1).astype(np.uint8))
+
+    def merge(self, other: 'ColumnStats'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        self.min_value = _keep(min, self.min_value, other.min_value)
+        self.max_value = _keep(max, self.max_value, other.max_value)
+        self.max_length = max(self.max_length, other.max_length)
+        if other.row_count > other.null_count:
+            if not other.is_numeric:
+                self.is_numeric, self.numeric_min, self.numeric_max = False, None, None
+            elif self.is_numeric:
+                self.numeric_min = _keep(min, self.numeric_min, other.numeric_min)
+                self.numeric_max = _keep(max, self.numeric_max, other.numeric_max)
+
+    def distinct_estimate(self) -> int:
+        registers = len(self.registers)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers * registers / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        if estimate <= 2.5 * registers and zeros:
+            estimate = registers * math.log(registers / zeros)
+        return min(int(round(estimate)), self.row_count - self.null_count)
+
+    def to_row(self) -> Dict[str, Any]:
+        has_values = self.row_count > self.null_count
+        value_length = get_settings().stats_max_value_length
+        return {
+            'row_count': self.row_count,
+            'null_count': self.null_count,
+            'distinct_estimate': self.distinct_estimate(),
+            'min_value': None if self.min_value is None else self.min_value[:value_length],
+            'max_value': None if self.max_value is None else self.max_value[:value_length],
+            'max_length': self.max_length,
+            'is_numeric': self.is_numeric and has_values,
+            'numeric_min': self.numeric_min,
+            'numeric_max': self.numeric_max,
+            'hll': self.registers.tobytes(),
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'ColumnStats':
+        stats = cls()
+        stats.registers = np.frombuffer(bytes(row['hll']), dtype=np.uint8).copy()
+        stats.precision = int(math.log2(len(stats.registers)))
+        stats.row_count, stats.null_count = row['row_count'], row['null_count']
+        stats.min_value, stats.max_value, stats.max_length = row['min_value'], row['max_value'], row['max_length']
+        stats.is_numeric = row['is_numeric'] or row['row_count'] == row['null_count']
+        stats.numeric_min, stats.numeric_max = row['numeric_min'], row['numeric_max']
+        return stats
+
+
+def _keep(choose, current, value):
+    if value is None:
+        return current
+    return value if current is None else choose(current, value)
+
+"""
+Statistics of every column of the frames added to it. Use add() while parsing and
+columns() (or to_rows()) once done.
+"""
+class TableStats:
+
+    def __init__(self):
+        self._columns: Dict[str, ColumnStats] = {}
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+        self._batch_rows = get_settings().stats_batch_rows
+
+    def add(self, frame: pd.DataFrame):
+        # a shallow copy, so the caller's later changes to the frame's columns (records_year,
+        # set_index) do not reach the buffered one
+        self._pending.append(frame.copy(deep=False))
+        self._pending_rows += len(frame)
+        if self._pending_rows >= self._batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        frame = pd.concat(self._pending, ignore_index=True) if len(self._pending) > 1 else self._pending[0]
+        self._pending, self._pending_rows = [], 0
+        for column in frame.columns:
+            if column == 'records_year':
+                continue
+            self._columns.setdefault(str(column), ColumnStats()).update(frame[column])
+
+    def columns(self) -> Dict[str, ColumnStats]:
+        self.flush()
+        return self._columns
+
+    def merge(self, other: 'TableStats'):
+        for name, stats in other.columns().items():
+            if name in self.columns():
+                self._columns[name].merge(stats)
+            else:
+                self._columns[name] = stats
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [{'column_name': name, 'ordinal': ordinal, **stats.to_row()}
+                for ordinal, (name, stats) in enumerate(self.columns().items())]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'TableStats':
+        stats = cls()
+        for row in sorted(rows, key=lambda row: row['ordinal']):
+            stats._columns[row['column_name']] = ColumnStats.from_row(row)
+        return stats
+
+
+def ensure_stats_tables(connection: 'Connection'):
+    from sqlalchemy import text
+
+    if connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': STATS_PART_TABLE}).scalar():
+        return
+    # concurrent loads store their first statistics at the same time
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': COLUMN_STATS_TABLE})
+    columns = """
+            ordinal INTEGER NOT NULL,
+            row_count BIGINT NOT NULL,
+            null_count BIGINT NOT NULL,
+            distinct_estimate BIGINT NOT NULL,
+            min_value TEXT,
+            max_value TEXT,
+            max_length INTEGER NOT NULL,
+            is_numeric BOOLEAN NOT NULL,
+            numeric_min DOUBLE PRECISION,
+            numeric_max DOUBLE PRECISION,
+            hll BYTEA NOT NULL"""
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {COLUMN_STATS_TABLE} (
+            table_name TEXT NOT NULL,
+            records_year INTEGER NOT NULL,
+            column_name TEXT NOT NULL,{columns},
+            profiled_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (table_name, records_year, column_name)
+        )
+    """))
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {STATS_PART_TABLE} (
+            member_id BIGINT NOT NULL,
+            range_index INTEGER NOT NULL,
+            column_name TEXT NOT NULL,{columns},
+            PRIMARY KEY (member_id, range_index, column_name)
+        )
+    """))
+
+"""
+Replace the statistics of table_name for the year, within the caller's transaction.
+"""
+def store_table_stats(connection: 'Connection', table_name: str, year: int, stats: TableStats):
+    from sqlalchemy import text
+
+    ensure_stats_tables(connection)
+    connection.execute(text(f"DELETE FROM {COLUMN_STATS_TABLE} WHERE table_name = :table AND records_year = :year"),
+                       {'table': table_name, 'year': year})
+    rows = stats.to_rows()
+    if rows:
+        connection.execute(text(f"""
+            INSERT INTO {COLUMN_STATS_TABLE} (table_name, records_year, column_name, {', '.join(_STAT_COLUMNS)})
+            VALUES (:table, :year, :column_name, {', '.join(':' + column for column in _STAT_COLUMNS)})
+        """), [{'table': table_name, 'year': year, **row} for row in rows])
+
+"""
+store_table_stats in its own transaction, for loaders that have already committed the rows.
+A failure is logged and does not fail the load.
+"""
+def record_table_stats(engine: 'Engine', table_name: str, year: int, stats: TableStats):
+    from sqlalchemy.exc import SQLAlchemyError
+
+    try:
+        with engine.begin() as connection:
+            store_table_stats(connection, table_name, year, stats)
+    except SQLAlchemyError as e:
+        logger.error(f"Error storing column statistics of {table_name} ({year}): {e}")
+
+"""
+Queue worker: store one range's statistics within the task's transaction.
+"""
+def store_stats_part(connection: 'Connection', member_id: int, range_index: int, stats: TableStats):
+    from sqlalchemy import text
+
+    ensure_stats_tables(connection)
+    connection.execute(text(f"DELETE FROM {STATS_PART_TABLE} WHERE member_id = :member_id AND range_index = :index"),
+                       {'member_id': member_id, 'index': range_index})
+    rows = stats.to_rows()
+    if rows:
+        connection.execute(text(f"""
+            INSERT INTO {STATS_PART_TABLE} (member_id, range_index, column_name, {', '.join(_STAT_COLUMNS)})
+            VALUES (:member_id, :index, :column_name, {', '.join(':' + column for column in _STAT_COLUMNS)})
+        """), [{'member_id': member_id, 'index': range_index, **row} for row in rows])
+
+"""
+Queue merge task: combine and delete the member's range statistics.
+"""
+def merge_stats_parts(connection: 'Connection', member_id: int) -> TableStats:
+    from sqlalchemy import text
+
+    ensure_stats_tables(connection)
+    rows = connection.execute(text(f"""
+        DELETE FROM {STATS_PART_TABLE} WHERE member_id = :member_id
+        RETURNING range_index, column_name, {', '.join(_STAT_COLUMNS)}
+    """), {'member_id': member_id}).mappings().all()
+    stats = TableStats()
+    for range_index in sorted({row['range_index'] for row in rows}):
+        stats.merge(TableStats.from_rows(row for row in rows if row['range_index'] == range_index))
+    return stats
+
+"""
+Delete the range statistics of members that will not be merged (e.g. failed queue members).
+"""
+def delete_stats_parts(connection: 'Connection', member_ids: List[int]):
+    from sqlalchemy import text
+
+    if member_ids and connection.execute(text("SELECT to_regclass(:name)"), {'name': STATS_PART_TABLE}).scalar():
+        connection.execute(text(f"DELETE FROM {STATS_PART_TABLE} WHERE member_id = ANY(:ids)"), {'ids': member_ids})
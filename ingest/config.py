@@ -0,0 +1,211 @@
+import configparser
+import logging
+import os
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+
+logger = logging.getLogger('ingest')
+
+"""
+Ingest settings and the lazily created database engine.
+
+Settings are read, highest precedence first, from:
+- INGEST_<SETTING> environment variables, e.g. INGEST_DB_HOST;
+- the [ingest] section of an INI file: --config on the command line, else the
+  INGEST_CONFIG environment variable, else ingest.ini next to these scripts if
+  it exists (see ingest.example.ini);
+- the web app's POSTGRES_* environment variables, for the database settings,
+  so one environment can configure both;
+- the defaults in Settings.
+
+Importing this module (or database.py) connects to nothing and opens no log
+file: the engine is created by the first get_engine() call and logging is set
+up by the entry point (cli.py). Worker processes spawned by parallel_load.py
+therefore only pay for the modules they actually use.
+"""
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingest.ini')
+CONFIG_SECTION = 'ingest'
+
+# database settings that fall back to the web app's environment variables (see web/web/settings.py)
+WEB_ENVIRONMENT_FALLBACKS = {
+    'db_host': 'POSTGRES_HOSTNAME',
+    'db_name': 'POSTGRES_DB_NAME',
+    'db_user': 'POSTGRES_USERNAME',
+    'db_password': 'POSTGRES_PASSWORD',
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    db_host: str = 'localhost'
+    db_port: int = 5432
+    db_name: str = 'testdb'
+    db_user: str = 'postgres'
+    db_password: str = 'local'
+    # folder holding one year's zip files and pdataCodebook.pdf; relative paths are relative to the repository root
+    records_folder: str = 'test/data/2025'
+    # 'threads' or 'async' (see process_directory and async_writer.py)
+    writer: str = 'threads'
+    # where the work queue's coordinator extracts members; every worker must be able to read it (see work_queue.py)
+    queue_dir: str = 'queue'
+    log_level: str = 'INFO'
+    log_file: str = 'app.log'  # empty for stderr only
+    # Parquet snapshots for the web app's analytics backend, relative to the repository root; empty to disable
+    # (see parquet_snapshots.py)
+    parquet_snapshot_dir: str = 'ingest/snapshots'
+    parquet_compression: str = 'zstd'
+    # files of at least parallel_load_min_bytes are loaded in byte ranges by a process pool (see parallel_load.py)
+    parallel_load_min_bytes: int = 128 * 1024 * 1024
+    parallel_load_range_bytes: int = 64 * 1024 * 1024
+    parallel_load_workers: int = 0  # 0 for one per CPU
+    parallel_parse_chunk_rows: int = 50000
+    # COPY connections and queued row batches per member of the 'async' writer (see async_writer.py)
+    async_writer_connections: int = 4
+    async_writer_queue_batches: int = 4
+    # choice of dictionary-encoded columns from a sample of each file (see column_encoding.py)
+    encoding_sample_rows: int = 20000
+    encoding_min_sample_rows: int = 1000
+    encoding_max_distinct: int = 1000
+    encoded_columns: str = ''  # table.column pairs, comma separated, encoded whatever the sample shows
+    # rows buffered before profiling, and the stored length of min/max values (see column_stats.py)
+    stats_batch_rows: int = 50000
+    stats_max_value_length: int = 200
+    # rejected rows buffered before they are written (see quarantine.py)
+    quarantine_batch_rows: int = 5000
+    quarantine_batch_bytes: int = 4 * 1024 * 1024
+    # work queue task leases, retries and polling (see work_queue.py)
+    queue_lease_seconds: int = 300
+    queue_max_attempts: int = 3
+    queue_retry_backoff_seconds: int = 30
+    queue_poll_seconds: int = 5
+
+
+_settings: Optional[Settings] = None
+_engine = None
+_lock = threading.Lock()
+
+"""
+Read the settings from the environment and config_file (see above). Unknown keys in the
+config file are an error, so a misspelt setting is not silently ignored.
+"""
+def load_settings(config_file: Optional[str] = None) -> Settings:
+    config_file = config_file or os.getenv('INGEST_CONFIG')
+    if config_file is None and os.path.exists(DEFAULT_CONFIG_FILE):
+        config_file = DEFAULT_CONFIG_FILE
+
+    file_values: Dict[str, str] = {}
+    if config_file:
+        parser = configparser.ConfigParser(interpolation=None)
+        if not parser.read(config_file):
+            raise FileNotFoundError(f"Ingest config file not found: {config_file}")
+        if parser.has_section(CONFIG_SECTION):
+            file_values = dict(parser[CONFIG_SECTION])
+
+    known = {field.name: field for field in fields(Settings)}
+    unknown = sorted(set(file_values) - set(known))
+    if unknown:
+        raise ValueError(f"Unknown ingest settings in {config_file}: {', '.join(unknown)}")
+
+    values = {}
+    for name, field in known.items():
+        value = os.getenv(f'INGEST_{name.upper()}')
+        if value is None:
+            value = file_values.get(name)
+        if value is None and name in WEB_ENVIRONMENT_FALLBACKS:
+            value = os.getenv(WEB_ENVIRONMENT_FALLBACKS[name])
+        if value is not None:
+            values[name] = int(value) if field.type is int else value
+
+    settings = replace(Settings(), **values)
+    if settings.writer not in ('threads', 'async'):
+        raise ValueError(f"Unknown ingest writer {settings.writer!r}; expected 'threads' or 'async'")
+    return settings
+
+"""
+Use the settings from config_file, with any overrides (e.g. from command-line options),
+from now on (the entry point calls this once, before anything connects). Discards an
+engine created with earlier settings.
+"""
+def configure(config_file: Optional[str] = None, **overrides) -> Settings:
+    return use_settings(replace(load_settings(config_file), **overrides))
+
+"""
+Use settings from now on, e.g. the parent's settings in a spawned worker process (see
+parallel_load.py). Discards an engine created with earlier settings.
+"""
+def use_settings(settings: Settings) -> Settings:
+    global _settings, _engine
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        _settings = settings
+    return settings
+
+
+def get_settings() -> Settings:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = load_settings()
+        return _settings
+
+"""
+The SQLAlchemy engine for the configured database, created on first use.
+"""
+def get_engine():
+    global _engine
+    settings = get_settings()
+    with _lock:
+        if _engine is None:
+            from sqlalchemy import URL, create_engine
+
+            _engine = create_engine(URL.create(
+                "postgresql+psycopg",
+                host=settings.db_host,
+                port=settings.db_port,
+                username=settings.db_user,
+                password=settings.db_password,
+                database=settings.db_name,
+            ))
+        return _engine
+
+
+def _repository_path(path: str) -> str:
+    repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(repository_root, path)
+
+"""
+Absolute path of the configured records folder.
+"""
+def records_folder_path(settings: Optional[Settings] = None) -> str:
+    return _repository_path((settings or get_settings()).records_folder)
+
+"""
+Absolute path of the configured work queue directory.
+"""
+def queue_dir_path(settings: Optional[Settings] = None) -> str:
+    return _repository_path((settings or get_settings()).queue_dir)
+
+"""
+Absolute path of the configured Parquet snapshot directory, or None if snapshots are disabled.
+"""
+def parquet_snapshot_dir_path(settings: Optional[Settings] = None) -> Optional[str]:
+    snapshot_dir = (settings or get_settings()).parquet_snapshot_dir
+    return _repository_path(snapshot_dir) if snapshot_dir else None
+
+"""
+Log to stderr and, if log_file is set, to that file. Called by entry points only, so
+importing ingest modules never creates a log file.
+"""
+def configure_logging(settings: Optional[Settings] = None):
+    settings = settings or get_settings()
+    handlers = [logging.StreamHandler()]
+    if settings.log_file:
+        handlers.append(logging.FileHandler(settings.log_file))
+    logging.basicConfig(
+        level=settings.log_level.upper(),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers,
+    )
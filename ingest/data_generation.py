@@ -0,0 +1,38 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from shared_definitions import DATA_GENERATION_TABLE
+
+logger = logging.getLogger('ingest')
+
+"""
+Single-row counter (DATA_GENERATION_TABLE) identifying the current version of the ingested data.
+
+The web app keys its shared result cache on this value, so bumping it at the
+end of a successful load invalidates every cached result at once.
+"""
+
+"""
+Increment the data generation counter (creating the table on first use) and
+return the new generation.
+"""
+def bump_data_generation(engine: Engine) -> int:
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {DATA_GENERATION_TABLE} (
+                id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                generation BIGINT NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        generation = connection.execute(text(f"""
+            INSERT INTO {DATA_GENERATION_TABLE} (id, generation) VALUES (1, 1)
+            ON CONFLICT (id) DO UPDATE
+                SET generation = {DATA_GENERATION_TABLE}.generation + 1, updated_at = now()
+            RETURNING generation
+        """)).scalar_one()
+
+    logger.info(f"Data generation bumped to {generation}")
+    return generation
@@ -4,51 +4,40 @@ import zipfile
 import pandas as pd
 import logging
 import threading
-import pdfplumber
 import sys
 import csv
 
 from concurrent.futures import ThreadPoolExecutor, as_completed, Future
-from sqlalchemy import create_engine, URL, inspect
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy import String
+from sqlalchemy import Integer, SmallInteger, String
 from pandas import DataFrame
-from typing import List
-
-# Initialize the logger
-logging.basicConfig(
-    level=logging.INFO,  
-    format='%(asctime)s - %(levelname)s - %(message)s',  
-    handlers=[
-        logging.StreamHandler(),  # Handler for outputting to stdout
-        logging.FileHandler('app.log')  # Handler for outputting to a file named 'app.log'
-    ]
-)
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from config import get_engine, get_settings, records_folder_path
+from summary_tables import refresh_summary_tables
+from value_deltas import VALUE_DELTA_TABLE, refresh_value_deltas
+from search_indexes import SEARCH_COLUMNS, create_search_indexes
+from data_generation import bump_data_generation
+from parquet_snapshots import ParquetSnapshotWriter, remove_stale_parts
+from parallel_load import load_file_in_ranges, should_load_in_parallel
+from quarantine import QuarantineWriter, QuarantiningReader, conninfo, new_run_id
+from async_writer import write_streams
+from member_checksums import load_member_checksums, member_checksum, record_member_checksum
+from column_encoding import (ColumnEncoder, Encoding, EncodingOverflow, create_decoding_view, encode_existing_table,
+                             loaded_tables, storage_table_name, table_encoding, widen_encoded_column)
+from column_stats import TableStats, record_table_stats
+from table_keys import record_table_keys
+
+# Logging is configured by the entry point (see cli.py and config.py)
 logger = logging.getLogger('ingest')
 
-# Configuration variables - TODO: migrate to config file
-DB_HOST = 'localhost'
-DB_NAME = 'testdb'
-DB_USER = 'postgres'
-DB_PASSWORD = 'local'
-DB_PORT = 5432
-
-# TODO: swap pathing to use Pathlib
-ANNUAL_TAX_RECORDS_FOLDER = 'test/data/2025' 
-
-# Connect to the PostgreSQL database
-engine = create_engine(URL.create(
-    "postgresql+psycopg",
-    host=str(DB_HOST), 
-    port=DB_PORT,
-    username=DB_USER,
-    password=DB_PASSWORD, 
-    database=DB_NAME
-    ))
-
-# Create a scoped_session factory for multi-threading with SQL Alchemy
-Session_factory = sessionmaker(bind=engine)
-Scoped_Session = scoped_session(Session_factory)
+# Settings (database, records folder, writer) are read by config.py; the engine is created on first use.
+ASYNC_PARSE_CHUNK_ROWS = 5000
+CODEBOOK_FILE = 'pdataCodebook.pdf'
+
+# scoped_session factory for multi-threading with SQL Alchemy, created with the engine on first use
+_scoped_session: Optional[scoped_session] = None
+_scoped_session_lock = threading.Lock()
 
 # for parsing primary key values from pdataCodebook.pdf
 filename_regex = r'Text file: [^\n]+'
@@ -60,25 +49,52 @@ table_name_pattern = re.compile(table_name_regex)
 suggested_keys = {}
 invalid_tables = ['ownership_history'] # tables were pdataCodebook is invalid
 
+# identifies this run's rows in the quarantine table (see quarantine.py)
+RUN_ID = new_run_id()
+
 # semaphores for each table to prevent collision on table creates and writes
 locks = {}
 
+def get_scoped_session() -> scoped_session:
+    global _scoped_session
+    with _scoped_session_lock:
+        if _scoped_session is None:
+            _scoped_session = scoped_session(sessionmaker(bind=get_engine()))
+        return _scoped_session
+
 def getTableName(file_path: str):
     filename = os.path.basename(file_path)
     file_basename, suffix = filename.split(".")
     return file_basename
 
-# Extracts the CSV files from the zip file and returns list(str) of file names
-def unzip(zipFilePath: str):
+"""
+Extracts the CSV files from the zip file and returns the list(str) of extracted file names
+together with their checksums (see member_checksums.py).
+
+Members whose checksum matches known_checksums (this zip's {member: checksum}) were loaded
+unchanged by a previous run and are skipped without being decompressed. Members are extracted
+into directory (default: the working directory); the returned names are relative to it.
+"""
+def unzip(zipFilePath: str, known_checksums: Optional[Dict[str, Tuple[int, int]]] = None, directory: Optional[str] = None):
     extracted = []
+    checksums = {}
+    known_checksums = known_checksums or {}
     try:
         with zipfile.ZipFile(zipFilePath, 'r') as zf:
-            zf.extractall()
-            extracted = zf.namelist()
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                checksum = member_checksum(info)
+                if known_checksums.get(info.filename) == checksum:
+                    logger.info(f"Skipping unchanged member {info.filename}")
+                    continue
+                zf.extract(info, directory)
+                extracted.append(info.filename)
+                checksums[info.filename] = checksum
     except zipfile.BadZipFile:
         logger.error(f"Error: Could not extract files from {zipFilePath}. File may be corrupt.")
 
-    return extracted
+    return extracted, checksums
 
 def prepare_dataframe_for_db(year: int, table_name: str, data_frame: DataFrame) -> DataFrame:
     data_frame['records_year'] = year
@@ -93,6 +109,21 @@ def prepare_dataframe_for_db(year: int, table_name: str, data_frame: DataFrame)
 
     return data_frame
 
+"""
+The dictionary encoding for loading cleaned_file into table_name (see column_encoding.py).
+Key columns and the columns behind the web app's search are never encoded.
+"""
+def member_encoding(cleaned_file: str, table_name: str) -> Encoding:
+    excluded = ['acct'] + suggested_keys.get(table_name, []) + SEARCH_COLUMNS.get(table_name, [])
+    return table_encoding(get_engine(), table_name, cleaned_file, excluded)
+
+"""
+to_sql column types: code_type for encoded columns, String for the rest. Rows appended to an
+existing table bind their codes as INTEGER, which also fits columns widened by widen_encoded_column.
+"""
+def column_types(columns: Sequence[str], encoding: Encoding, code_type: type = SmallInteger) -> Dict[str, type]:
+    return {column: code_type if column in encoding else String for column in columns}
+
 """
 Remove NUL bytes from input file and write cleaned content to output_file_path.
 If output_file_path is None, overwrite the input file.
@@ -112,17 +143,6 @@ def clean_file_remove_nulls(input_file_path, output_file_path=None):
 
     return output_file_path
 
-"""
-Logs warning for any errors encountered while using Pandas to parse CSV file
-
-Returns:
-        None: Indicates that the bad line should be skipped.
-"""
-def log_bad_line(bad_line, table_name):
-    logger.warning(f"While processing {table_name} file, bad line encountered: {bad_line}")
-    return None # Returning None will skip the line
-
-
 """
 Function to ingest data from a TSV file with a ".txt" extension into the database.
 Ignores files with non ".txt" extensions and subdirectories.
@@ -130,41 +150,43 @@ Ignores files with non ".txt" extensions and subdirectories.
 - Removes null values from input file.
 - Adds a "record_year" column and a composite index on "acct" and "records_year" for faster lookups and to prevent data collisions.
 - By default reads all CSV values as string (see dtyptes in pd.read_csv method call).
-- Logs Pandas parsing errors when reading TSV using class logger.
+- Rows that cannot be parsed are written to the quarantine table for this run (see quarantine.py); only a summary is logged.
+- Also writes the rows to the table's Parquet snapshot for the year (see parquet_snapshots.py).
+- Profiles the columns of the rows while parsing and stores the statistics once they are written (see column_stats.py).
+- Files of at least parallel_load_min_bytes (see config.py) are split into byte ranges loaded by parallel workers (see parallel_load.py).
+- The member replaces the table's rows for the year: they are deleted in the transaction that writes it, so
+  reloading a changed member does not duplicate them.
+- A member that overflows the SMALLINT codes of a dictionary-encoded column is loaded again once the column is widened
+  (see column_encoding.py); its rejected rows may then be quarantined twice.
+- Returns True if the file was written to the database, False on error.
 
 TODO: make "acct" and "records_year" values constants
 """
-def load_data_from_csv(filePath: str, year: int, db_table_lock: threading.Semaphore):
+def load_data_from_csv(filePath: str, year: int, db_table_lock: threading.Semaphore) -> bool:
     table_name = ""
+    loaded = False
     if filePath.endswith('.txt'):
         table_name = getTableName(filePath)
 
+    Scoped_Session = get_scoped_session()
     with db_table_lock:
         logger.info(f"Acuiring DB table lock for {table_name}")
 
         try: 
-            with Scoped_Session() as session: 
-                logger.info(f"Cleaning input file for table: {table_name}")
-                cleaned_file = clean_file_remove_nulls(filePath, )
-
-                logger.info(f"Writing to table: {table_name}")
-                textFileReader = pd.read_csv(
-                    cleaned_file, 
-                    sep='\x09', 
-                    engine='python', 
-                    encoding='MacRoman', 
-                    escapechar='\\', 
-                    doublequote=False,
-                    on_bad_lines=lambda x: log_bad_line(x, table_name),  
-                    chunksize=500, 
-                    dtype=str) # setting all d-types to string
-                
-                
-                for count, df in enumerate(textFileReader): 
-                    df = prepare_dataframe_for_db(year, table_name, df)
-                    df.to_sql(name=table_name, con=session.connection(), if_exists="append", index=True, chunksize=500, method='multi', dtype=String)
-                session.commit()
-                logger.info(f"Finished writing to {table_name} table.")
+            logger.info(f"Cleaning input file for table: {table_name}")
+            cleaned_file = clean_file_remove_nulls(filePath, )
+            try:
+                snapshot_parts, stats = write_member(cleaned_file, table_name, year)
+            except EncodingOverflow as e:
+                # the member's rows have rolled back, so the table can be altered
+                logger.warning(f"{e}; loading {table_name} again with wider codes")
+                widen_encoded_column(get_engine(), e.dictionary_table)
+                snapshot_parts, stats = write_member(cleaned_file, table_name, year)
+
+            remove_stale_parts(table_name, year, snapshot_parts)
+            record_table_stats(get_engine(), table_name, year, stats)
+            loaded = True
+            logger.info(f"Finished writing to {table_name} table.")
         except Exception as e:
             logger.error(f"Thread {threading.current_thread().name}: Error writing to {table_name}: {e}")
             Scoped_Session.rollback()
@@ -172,14 +194,186 @@ def load_data_from_csv(filePath: str, year: int, db_table_lock: threading.Semaph
             # Crucial for multithreading: remove() closes the thread-local session.
             Scoped_Session.remove()
 
+    return loaded
+
+"""
+Write a cleaned member to table_name: in parallel ranges if it is large enough, else parsed
+and inserted in chunks by this thread with the quarantine of rejected rows. Returns the
+number of Parquet snapshot parts written and the column statistics of the rows, which the
+caller stores once the member has loaded.
+"""
+def write_member(cleaned_file: str, table_name: str, year: int) -> Tuple[int, TableStats]:
+    encoding = member_encoding(cleaned_file, table_name)
+    if should_load_in_parallel(cleaned_file):
+        return load_large_file(cleaned_file, table_name, year, encoding)
+
+    create_table_from_header(cleaned_file, table_name, year, encoding)
+    storage_table = storage_table_name(table_name, encoding)
+    stats = TableStats()
+    Scoped_Session = get_scoped_session()
+    with Scoped_Session() as session, ParquetSnapshotWriter(table_name, year) as snapshot, \
+            QuarantineWriter(conninfo(get_engine()), RUN_ID, table_name, year) as quarantine, \
+            ColumnEncoder(conninfo(get_engine()), encoding) as encoder, \
+            open(cleaned_file, encoding='MacRoman', newline='') as source: 
+        logger.info(f"Writing to table: {table_name}")
+        # a changed member replaces the rows its earlier load wrote for the year
+        session.execute(text(f'DELETE FROM "{storage_table}" WHERE records_year = :year'), {'year': year})
+        textFileReader = pd.read_csv(
+            QuarantiningReader(source, quarantine), 
+            sep='\x09', 
+            engine='python', 
+            escapechar='\\', 
+            doublequote=False,
+            on_bad_lines=quarantine.bad_line,  
+            chunksize=500, 
+            dtype=str) # setting all d-types to string
+        
+        
+        for count, df in enumerate(textFileReader): 
+            stats.add(df)
+            df = prepare_dataframe_for_db(year, table_name, df)
+            encoder.encode(df).to_sql(name=storage_table, con=session.connection(), if_exists="append", index=True, chunksize=500, method='multi', dtype=column_types(df.columns, encoding, Integer))
+            snapshot.write(df)
+        # the rejected rows must be stored before the member's rows commit
+        quarantine.flush()
+        session.commit()
+    if quarantine.counts:
+        logger.warning(quarantine.summary())
+    return 1, stats
+
+"""
+Create table_name from the file's header exactly as to_sql would create it (an empty
+DataFrame with the same index), so later writers only ever append; a table with encoded
+columns is created as its storage table and view (see column_encoding.py). Does nothing if
+the table exists. encoding defaults to member_encoding's. Returns the file's column names.
+"""
+def create_table_from_header(cleaned_file: str, table_name: str, year: int, encoding: Optional[Encoding] = None) -> List[str]:
+    if encoding is None:
+        encoding = member_encoding(cleaned_file, table_name)
+    header = pd.read_csv(cleaned_file, sep='\x09', encoding='MacRoman', escapechar='\\', doublequote=False, nrows=0, dtype=str)
+    columns = [str(column) for column in header.columns]
+    Scoped_Session = get_scoped_session()
+    with Scoped_Session() as session:
+        header = prepare_dataframe_for_db(year, table_name, header)
+        header.to_sql(name=storage_table_name(table_name, encoding), con=session.connection(), if_exists="append", index=True, dtype=column_types(header.columns, encoding))
+        session.commit()
+    Scoped_Session.remove()
+    create_decoding_view(get_engine(), table_name, encoding)
+    return columns
+
+"""
+Load a file too large for a single thread as parallel byte ranges (see parallel_load.py).
+Returns the number of ranges, i.e. of Parquet snapshot parts written, and the column
+statistics of the rows loaded.
+"""
+def load_large_file(cleaned_file: str, table_name: str, year: int, encoding: Encoding) -> Tuple[int, TableStats]:
+    create_table_from_header(cleaned_file, table_name, year, encoding)
+
+    rows, ranges, stats = load_file_in_ranges(cleaned_file, table_name, year, get_engine(), RUN_ID, encoding)
+    logger.info(f"Loaded {rows} rows into {table_name} from {ranges} parallel ranges.")
+    return ranges, stats
+
+
+"""
+Parse a cleaned member into batches of rows (file columns then records_year) for a COPY,
+with the same options and quarantine as load_data_from_csv, and encoded columns as codes.
+The rows are also written (as text) to snapshot, which the caller publishes or aborts,
+and profiled into stats.
+"""
+def read_member_rows(cleaned_file: str, table_name: str, year: int, columns: Sequence[str],
+                     snapshot: ParquetSnapshotWriter, encoding: Encoding, stats: TableStats) -> Iterator[List[tuple]]:
+    copy_columns = list(columns) + ['records_year']
+    with QuarantineWriter(conninfo(get_engine()), RUN_ID, table_name, year) as quarantine, \
+            ColumnEncoder(conninfo(get_engine()), encoding) as encoder, \
+            open(cleaned_file, encoding='MacRoman', newline='') as source:
+        textFileReader = pd.read_csv(
+            QuarantiningReader(source, quarantine),
+            sep='\x09',
+            engine='python',
+            escapechar='\\',
+            doublequote=False,
+            on_bad_lines=quarantine.bad_line,
+            chunksize=ASYNC_PARSE_CHUNK_ROWS,
+            dtype=str)
+
+        for df in textFileReader:
+            stats.add(df)
+            df['records_year'] = year
+            snapshot.write(df)
+            df = encoder.encode(df[copy_columns]).astype(object).where(df.notna(), None)
+            yield list(df.itertuples(index=False, name=None))
+        if quarantine.counts:
+            logger.warning(quarantine.summary())
+
+"""
+The async writer's stream for one member (see async_writer.py): cleans the file and
+creates the table when the writer is ready for it. The member's Parquet snapshot is
+published and its column statistics stored only if its COPY commits. A member that
+overflows a dictionary is recorded in overflows ({file path: dictionary table}).
+"""
+def member_copy_stream(file_path: str, year: int, overflows: Optional[Dict[str, str]] = None):
+    def open_stream():
+        table_name = getTableName(file_path)
+        logger.info(f"Cleaning input file for table: {table_name}")
+        cleaned_file = clean_file_remove_nulls(file_path)
+        encoding = member_encoding(cleaned_file, table_name)
+        columns = create_table_from_header(cleaned_file, table_name, year, encoding)
+        snapshot = ParquetSnapshotWriter(table_name, year)
+        stats = TableStats()
+
+        def rows():
+            try:
+                yield from read_member_rows(cleaned_file, table_name, year, columns, snapshot, encoding, stats)
+            except EncodingOverflow as e:
+                if overflows is not None:
+                    overflows[file_path] = e.dictionary_table
+                raise
+
+        def finish(committed: bool):
+            if not committed:
+                snapshot.abort()
+                return
+            snapshot.close()
+            record_table_stats(get_engine(), table_name, year, stats)
+        return storage_table_name(table_name, encoding), columns + ['records_year'], rows(), finish, year
+    return open_stream
+
+"""
+Load members with the asyncio COPY writer (writer = 'async' in config.py). Files large enough
+for parallel_load.py (judged by their size before NUL removal) are still loaded by
+load_data_from_csv, one after another, since each already uses every worker process, as
+are members that overflowed a dictionary, once its codes are widened. Returns {file path: loaded}.
+"""
+def load_members_async(file_paths: Sequence[str], year: int) -> Dict[str, bool]:
+    large = [f for f in file_paths if should_load_in_parallel(f)]
+    overflows: Dict[str, str] = {}
+    streams = {f: member_copy_stream(f, year, overflows) for f in file_paths if f not in large}
+
+    results = write_streams(streams, conninfo(get_engine()))
+    for file_path, loaded in results.items():
+        if loaded:
+            remove_stale_parts(getTableName(file_path), year, 1)
+    for file_path, dictionary_table in overflows.items():
+        widen_encoded_column(get_engine(), dictionary_table)
+        large.append(file_path)
+    for file_path in large:
+        results[file_path] = load_data_from_csv(file_path, year, threading.Semaphore(1))
+    return results
+
+"""
+Function to process a single directory (year).
 
-# Function to process a single directory (year)
-def process_directory(dirPath: str):
+Returns (all_loaded, loaded_count): whether every extracted file loaded successfully and how many
+did. Members unchanged since their last successful load are skipped (see member_checksums.py), and
+the checksum of each member is recorded once it loads. Members are loaded by a thread pool, or by
+load_members_async when the writer setting is 'async'.
+"""
+def process_directory(dirPath: str) -> Tuple[bool, int]:
     # retrieve the year value from the folder name
     try: 
         year = int(os.path.basename(dirPath))
     except ValueError as e:
-        logger.error("File structure improperly formatted:", str(e))
+        logger.error(f"File structure improperly formatted: {e}")
         exit(1)
 
     # retrieve list of zip files to process
@@ -187,23 +381,44 @@ def process_directory(dirPath: str):
     if not zip_files:
         logger.warning("No .zip files found in {}".format(dirPath))
 
+    all_loaded = True
+    loaded_count = 0
+    engine = get_engine()
+    known_checksums = load_member_checksums(engine, year)
+
 #TODO: think about how to handle multiple zip files (will use a lot of memory for multiple files)
     # process csv files extracted from each zip file concurrently
     for zip in zip_files: 
-        csv_file_names = unzip(os.path.join(dirPath, zip))
+        csv_file_names, checksums = unzip(os.path.join(dirPath, zip), known_checksums.get(zip))
+
+        if get_settings().writer == 'async':
+            results = load_members_async([os.path.join(os.getcwd(), c) for c in csv_file_names], year)
+            for csv_file in csv_file_names:
+                if results[os.path.join(os.getcwd(), csv_file)]:
+                    loaded_count += 1
+                    record_member_checksum(engine, year, zip, csv_file, checksums[csv_file])
+                else:
+                    all_loaded = False
+            continue
+
         locks = {getTableName(file_path=c): threading.Semaphore(1) for c in csv_file_names}
 
         with ThreadPoolExecutor() as executor:
-            futures: List[Future]  = []
+            futures: Dict[Future, str] = {}
             for csv_file in csv_file_names:
                 table_name = getTableName(csv_file)
                 lock = locks[table_name]
-                futures.append(
-                    executor.submit(load_data_from_csv, os.path.join(os.getcwd(), csv_file), year, lock)
-                )
+                future = executor.submit(load_data_from_csv, os.path.join(os.getcwd(), csv_file), year, lock)
+                futures[future] = csv_file
  
-            for _ in as_completed(futures):
-                pass
+            for future in as_completed(futures):
+                if future.result():
+                    loaded_count += 1
+                    record_member_checksum(engine, year, zip, futures[future], checksums[futures[future]])
+                else:
+                    all_loaded = False
+
+    return all_loaded, loaded_count
 
 """
 Removes all files ending in .txt or .cleaned in the same directory as this Python script.
@@ -221,6 +436,9 @@ def retieve_primary_keys(filePath: str):
     table_name = ''
 
     try:
+        # only needed for the codebook, so imported here to keep importing this module cheap
+        import pdfplumber
+
         pdf = pdfplumber.open(filePath)
         pages = pdf.pages[2::1] # start from the 3rd page of the pdf
 
@@ -242,13 +460,15 @@ def retieve_primary_keys(filePath: str):
 
                     suggested_keys[table_name] = keys_str.replace(' ', '').split(',')
     except Exception as e:
-        logger.error('Error extracting primary keys from tables using pdfplumber', e)
+        logger.error(f'Error extracting primary keys from tables using pdfplumber: {e}')
     finally:
         if pdf is not None:
             pdf.close()
 
-def main(): 
-    # configure max field size limit for reading csv file data
+"""
+Raise the csv module's field size limit as far as the platform allows, for HCAD's long fields.
+"""
+def raise_csv_field_size_limit():
     field_size_limit = sys.maxsize
     while True:
         try:
@@ -257,30 +477,107 @@ def main():
         except OverflowError:
             field_size_limit = int(field_size_limit / 10)
 
-    # Start processing the ZIP folder
-    # TODO: expand to handle multiple directories (multiple tax years)
-    current_script_folder = os.path.dirname(os.getcwd()) 
-    test_data_filepath = current_script_folder + '/' + ANNUAL_TAX_RECORDS_FOLDER
+"""
+Read the suggested primary keys from the records folder's codebook and record them for the
+web app's schema catalog (see table_keys.py).
+"""
+def load_primary_keys(records_folder: str):
+    retieve_primary_keys(os.path.join(records_folder, CODEBOOK_FILE))
+    logger.debug(f'Suggested primary keys: {suggested_keys}')
+    record_table_keys(get_engine(), {table: keys for table, keys in suggested_keys.items() if table not in invalid_tables})
+
+"""
+The records year of a records folder, i.e. its name.
+"""
+def records_year(records_folder: str) -> int:
+    return int(os.path.basename(os.path.normpath(records_folder)))
+
+"""
+Load one year of records: every zip file in records_folder (default: the configured folder),
+or only the given extracted member files. The year defaults to the folder's name.
+Suggested primary keys are read from the folder's codebook first.
+
+Returns (all_loaded, loaded_count) as process_directory does.
+"""
+def load(records_folder: Optional[str] = None, files: Sequence[str] = (), year: Optional[int] = None) -> Tuple[bool, int]:
+    raise_csv_field_size_limit()
+    records_folder = records_folder or records_folder_path()
 
     # retrieve the suggested primary keys for the tables 
-    retieve_primary_keys(rf'{test_data_filepath}/pdataCodebook.pdf')
-    logger.debug(f'Suggested primary keys: {suggested_keys}')
+    load_primary_keys(records_folder)
+
+    if files:
+        year = year or records_year(records_folder)
+        results = [load_data_from_csv(os.path.abspath(f), year, threading.Semaphore(1)) for f in files]
+        return all(results), sum(results)
+
+    # TODO: expand to handle multiple directories (multiple tax years)
+    loaded, loaded_count = process_directory(records_folder)
+
+    # cleanup generated text files
+    remove_txt_files()
+    return loaded, loaded_count
+
+"""
+Rebuild what the web app derives from the loaded tables. years are the records years
+just loaded, whose year-over-year deltas are recomputed (see value_deltas.py). The data
+generation is only bumped (invalidating the web app's cached results) if the load succeeded.
+"""
+def refresh(loaded: bool = True, years: Sequence[int] = ()):
+    engine = get_engine()
+
+    # rebuild precomputed results for the web app's predefined queries
+    refresh_summary_tables(engine)
 
-    if (len(sys.argv) > 1): 
-        filepath = os.path.join(os.getcwd(), sys.argv[1])
-        logger.debug(f'Filepath: {filepath}')
-        load_data_from_csv(filepath, 2025, threading.Semaphore(1))
-    else: 
-        # Start processing the ZIP folder
-        process_directory(test_data_filepath)
+    # per-account changes in appraised values against the prior loaded year
+    refresh_value_deltas(engine, years)
 
-        # cleanup generated text files
-        remove_txt_files()
+    # trigram and full-text indexes behind the web app's owner/address search
+    create_search_indexes(engine)
 
-    # verify tables created
+    # invalidate the web app's cached results once the new data is fully loaded
+    if loaded:
+        bump_data_generation(engine)
+    else:
+        logger.warning("Load finished with errors; data generation not bumped.")
+
+"""
+Dictionary-encode the low-cardinality columns of tables loaded before encoding existed (default:
+every loaded table; see column_encoding.encode_existing_table). Indexed columns, i.e. the keys,
+are never encoded. Returns {table: encoding}.
+"""
+def encode_tables(tables: Sequence[str] = ()) -> Dict[str, Encoding]:
+    engine = get_engine()
+    inspector = inspect(engine)
+    encodings = {}
+    for table in tables or loaded_tables(engine, [VALUE_DELTA_TABLE]):
+        indexed = [column for index in inspector.get_indexes(table) for column in index['column_names'] if column]
+        excluded = ['acct'] + indexed + SEARCH_COLUMNS.get(table, [])
+        encodings[table] = encode_existing_table(engine, table, excluded)
+    return encodings
+
+"""
+Log the tables in the database and, with counts=True, the rows per records year of each
+table that has a records_year column. Returns the table names.
+"""
+def verify(counts: bool = False) -> List[str]:
+    engine = get_engine()
     inspector = inspect(engine)
     tables = inspector.get_table_names()
     logger.info(f"Tables in the database:  {tables}")
 
+    if counts:
+        with engine.connect() as connection:
+            for table in tables:
+                if 'records_year' not in {column['name'] for column in inspector.get_columns(table)}:
+                    continue
+                rows = connection.execute(text(
+                    f'SELECT records_year, count(*) FROM "{table}" GROUP BY records_year ORDER BY records_year'))
+                per_year = ', '.join(f"{year}: {count}" for year, count in rows)
+                logger.info(f"{table}: {per_year or 'no rows'}")
+    return tables
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # kept for `python database.py [file ...]`; see cli.py
+    from cli import main
+    sys.exit(main(['load'] + sys.argv[1:]))
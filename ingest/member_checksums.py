@@ -0,0 +1,73 @@
+import logging
+import zipfile
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger('ingest')
+
+"""
+Checksums of the zip members loaded for each records year.
+
+A member's checksum is the CRC-32 and uncompressed size stored in the zip's
+central directory, so it is read without decompressing anything. After a
+member loads successfully its checksum is recorded here; on the next run a
+member whose checksum matches is not extracted or loaded again, so a refresh
+where nothing changed only reads the zip directories. A changed member is
+loaded again and replaces its table's rows for the year; its new checksum is
+recorded only once that load has committed. Checksums are kept per
+zip file, since two zips of a year may hold members with the same name.
+"""
+MEMBER_CHECKSUM_TABLE = 'ingest_member_checksums'
+
+Checksum = Tuple[int, int]
+
+
+def member_checksum(info: zipfile.ZipInfo) -> Checksum:
+    return info.CRC, info.file_size
+
+"""
+Create the checksum table if needed and return {zip file name: {member name: checksum}} for the year.
+"""
+def load_member_checksums(engine: Engine, year: int) -> Dict[str, Dict[str, Checksum]]:
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {MEMBER_CHECKSUM_TABLE} (
+                records_year INTEGER NOT NULL,
+                zip_file TEXT NOT NULL,
+                member TEXT NOT NULL,
+                crc32 BIGINT NOT NULL,
+                file_size BIGINT NOT NULL,
+                loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (records_year, zip_file, member)
+            )
+        """))
+        rows = connection.execute(
+            text(f"SELECT zip_file, member, crc32, file_size FROM {MEMBER_CHECKSUM_TABLE} WHERE records_year = :year"),
+            {'year': year},
+        )
+        checksums: Dict[str, Dict[str, Checksum]] = {}
+        for zip_file, member, crc32, file_size in rows:
+            checksums.setdefault(zip_file, {})[member] = (crc32, file_size)
+        return checksums
+
+"""
+Record that a member of zip_file (the zip's file name) with the given checksum has been loaded for the year.
+"""
+def record_member_checksum(engine: Engine, year: int, zip_file: str, member: str, checksum: Checksum):
+    with engine.begin() as connection:
+        upsert_member_checksum(connection, year, zip_file, member, checksum)
+
+"""
+record_member_checksum within the caller's transaction (a SQLAlchemy Connection), so the
+checksum commits together with the load it describes.
+"""
+def upsert_member_checksum(connection: Connection, year: int, zip_file: str, member: str, checksum: Checksum):
+    crc32, file_size = checksum
+    connection.execute(text(f"""
+        INSERT INTO {MEMBER_CHECKSUM_TABLE} (records_year, zip_file, member, crc32, file_size)
+        VALUES (:year, :zip_file, :member, :crc32, :file_size)
+        ON CONFLICT (records_year, zip_file, member) DO UPDATE
+            SET crc32 = EXCLUDED.crc32, file_size = EXCLUDED.file_size, loaded_at = now()
+    """), {'year': year, 'zip_file': zip_file, 'member': member, 'crc32': crc32, 'file_size': file_size})
@@ -0,0 +1,299 @@
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import psycopg
+from psycopg import sql
+
+import config
+from column_encoding import ColumnEncoder, storage_table_name
+from column_stats import TableStats
+from parquet_snapshots import ParquetSnapshotWriter, discard_staged_parts, publish_staged_parts
+from quarantine import QuarantineWriter, QuarantiningReader, conninfo as engine_conninfo
+
+# workers never touch SQLAlchemy, so it is only imported by the coordinator (see load_file_in_ranges)
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('ingest')
+
+"""
+Parallel loading of one large TSV member by newline-aligned byte ranges.
+
+A single big member (real_acct.txt, ownership_history.txt, ...) used to be
+parsed and inserted by one thread. Files of at least parallel_load_min_bytes
+are instead memory-mapped and cut into ranges of about parallel_load_range_bytes
+(see config.py) that each start at the beginning of a record:
+- a newline preceded by an odd number of backslashes is escaped (HCAD's
+  escapechar is '\\') and is part of a field, never a record boundary;
+- a candidate boundary is also only accepted if the line after it has as many
+  fields as the header, which skips newlines inside quoted fields.
+
+Each range is parsed with the same pandas options (and quarantine of rejected
+rows, see quarantine.py) as load_data_from_csv in a worker process (parsing is CPU bound, so threads would serialize on the GIL)
+and COPYed over its own connection into an unlogged staging table. Once every
+range has loaded, the staging tables are moved into the target table in a
+single transaction, so the table is still all-or-nothing per member, and
+dropped.
+
+Workers are spawned rather than forked because the loader is multi-threaded,
+and are handed the coordinator's settings. One process pool of
+parallel_load_workers is shared by all tables loading at the same time.
+"""
+FILE_ENCODING = 'MacRoman'
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def should_load_in_parallel(file_path: str) -> bool:
+    return os.path.getsize(file_path) >= config.get_settings().parallel_load_min_bytes
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = config.get_settings()
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.parallel_load_workers or os.cpu_count() or 4,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(settings,),
+            )
+        return _pool
+
+
+def _init_worker(settings: config.Settings):
+    config.use_settings(settings)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+"""
+Returns True if the byte at position pos is preceded by an odd number of backslashes.
+"""
+def _is_escaped(buffer, pos: int) -> bool:
+    backslashes = 0
+    pos -= 1
+    while pos >= 0 and buffer[pos] == 0x5C:
+        backslashes += 1
+        pos -= 1
+    return backslashes % 2 == 1
+
+"""
+Returns the position just past the next unescaped newline at or after pos (end if there is none).
+"""
+def _next_line_start(buffer, pos: int, end: int) -> int:
+    while True:
+        newline = buffer.find(b'\n', pos, end)
+        if newline == -1:
+            return end
+        if not _is_escaped(buffer, newline):
+            return newline + 1
+        pos = newline + 1
+
+"""
+Returns the start of the first record at or after pos: the first line start whose
+line has expected_tabs field separators (end if there is none).
+"""
+def _next_record_start(buffer, pos: int, end: int, expected_tabs: int) -> int:
+    start = _next_line_start(buffer, pos, end)
+    while start < end:
+        line_end = _next_line_start(buffer, start, end)
+        if buffer[start:line_end].count(b'\t') == expected_tabs:
+            return start
+        start = line_end
+    return end
+
+"""
+Split a TSV file into (start, end) byte ranges of roughly range_bytes that each begin
+at a record boundary. The header line is excluded; returns [] for an empty body.
+"""
+def split_byte_ranges(file_path: str, range_bytes: Optional[int] = None) -> List[Tuple[int, int]]:
+    range_bytes = range_bytes or config.get_settings().parallel_load_range_bytes
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            body_start = _next_line_start(buffer, 0, size)
+            expected_tabs = buffer[0:body_start].count(b'\t')
+            boundaries = [body_start]
+            position = body_start + range_bytes
+            while position < size:
+                boundary = _next_record_start(buffer, position, size, expected_tabs)
+                if boundary >= size:
+                    break
+                boundaries.append(boundary)
+                position = boundary + range_bytes
+            boundaries.append(size)
+
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def read_columns(file_path: str) -> List[str]:
+    header = pd.read_csv(file_path, sep='\x09', encoding=FILE_ENCODING, escapechar='\\', doublequote=False,
+                         nrows=0, dtype=str)
+    return [str(column) for column in header.columns]
+
+
+def read_header_line(file_path: str) -> str:
+    with open(file_path, encoding=FILE_ENCODING, newline='') as file:
+        return file.readline().rstrip('\r\n')
+
+
+"""
+Physical line number (1-based) of the first line of each range.
+"""
+def range_line_numbers(file_path: str, ranges: Sequence[Tuple[int, int]]) -> List[int]:
+    line_numbers = []
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        line_number = buffer[0:ranges[0][0]].count(b'\n') + 1
+        for start, end in ranges:
+            line_numbers.append(line_number)
+            line_number += buffer[start:end].count(b'\n')
+    return line_numbers
+
+
+def _stage_table_name(table_name: str, staging: str, index: int) -> str:
+    # staging is unique to the load, so concurrent loads of a table never share a stage table
+    suffix = f"__{staging}_{index}"
+    return table_name[:63 - len(suffix)] + suffix
+
+"""
+Parse one byte range and COPY its rows into stage_table over connection (a psycopg
+connection; the caller commits). Rejected rows go to the quarantine (see quarantine.py)
+and the rows to Parquet snapshot part `index`, staged as `staging` (if given) for the
+caller to publish once the rows commit (see parquet_snapshots.py). Columns in encoding ({column:
+dictionary table}, see column_encoding.py) are written as codes. Returns (rows loaded, rows
+quarantined per reason, the rows' column statistics (see column_stats.py)).
+"""
+def copy_range(connection, file_path: str, start: int, end: int, first_line_number: int, header: str,
+               columns: Sequence[str], table_name: str, stage_table: str, year: int,
+               conninfo: str, run_id: str, index: int, staging: Optional[str],
+               encoding: Optional[Dict[str, str]] = None) -> Tuple[int, Counter, TableStats]:
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        body = buffer[start:end].decode(FILE_ENCODING)
+
+    copy_columns = list(columns) + ['records_year']
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(stage_table), sql.SQL(', ').join(sql.Identifier(c) for c in copy_columns))
+    rows = 0
+    stats = TableStats()
+    with QuarantineWriter(conninfo, run_id, table_name, year, header) as quarantine, \
+            ParquetSnapshotWriter(table_name, year, part=index, staging=staging) as snapshot, \
+            ColumnEncoder(conninfo, encoding) as encoder:
+        reader = pd.read_csv(
+            QuarantiningReader(io.StringIO(body, newline=''), quarantine,
+                               expected_fields=len(columns), first_line_number=first_line_number),
+            sep='\x09',
+            engine='python',
+            header=None,
+            names=list(columns),
+            escapechar='\\',
+            doublequote=False,
+            on_bad_lines=quarantine.bad_line,
+            chunksize=config.get_settings().parallel_parse_chunk_rows,
+            dtype=str)
+
+        with connection.cursor() as cursor, cursor.copy(copy_sql) as copy:
+            for frame in reader:
+                stats.add(frame)
+                frame['records_year'] = str(year)
+                frame = frame.astype(object).where(frame.notna(), None)
+                for row in encoder.encode(frame).itertuples(index=False, name=None):
+                    copy.write_row(row)
+                snapshot.write(frame)
+                rows += len(frame)
+    return rows, quarantine.counts, stats
+
+"""
+Worker: copy_range over its own connection, committed when the range has loaded.
+"""
+def _load_range(file_path: str, start: int, end: int, first_line_number: int, header: str,
+                columns: Sequence[str], table_name: str, stage_table: str, year: int,
+                conninfo: str, run_id: str, index: int, staging: str,
+                encoding: Optional[Dict[str, str]]) -> Tuple[int, Counter, TableStats]:
+    with psycopg.connect(conninfo) as connection:
+        return copy_range(connection, file_path, start, end, first_line_number, header, columns, table_name,
+                          stage_table, year, conninfo, run_id, index, staging, encoding)
+
+"""
+Load a large TSV file into table_name for the given year using parallel workers.
+
+The target table must already exist (load_data_from_csv creates it from the header);
+returns (rows loaded, number of ranges, column statistics of the rows loaded). The
+ranges' snapshot parts are published only once the merge into the table commits.
+"""
+def load_file_in_ranges(file_path: str, table_name: str, year: int, engine: 'Engine', run_id: str,
+                        encoding: Optional[Dict[str, str]] = None) -> Tuple[int, int, TableStats]:
+    from sqlalchemy import text
+
+    ranges = split_byte_ranges(file_path)
+    if not ranges:
+        return 0, 0, TableStats()
+    columns = read_columns(file_path)
+    header = read_header_line(file_path)
+    line_numbers = range_line_numbers(file_path, ranges)
+    conninfo = engine_conninfo(engine)
+    staging = uuid.uuid4().hex
+    stage_tables = [_stage_table_name(table_name, staging, index) for index in range(len(ranges))]
+    # a table with encoded columns stores its rows in <table>__encoded (see column_encoding.py)
+    storage_table = storage_table_name(table_name, encoding)
+    logger.info(f"Loading {table_name} in {len(ranges)} parallel ranges")
+
+    with engine.begin() as connection:
+        for stage_table in stage_tables:
+            connection.execute(text(f'DROP TABLE IF EXISTS "{stage_table}"'))
+            connection.execute(text(f'CREATE UNLOGGED TABLE "{stage_table}" (LIKE "{storage_table}" INCLUDING DEFAULTS)'))
+
+    pool = _get_pool()
+    futures = [
+        pool.submit(_load_range, file_path, start, end, line_number, header, columns, table_name, stage_table,
+                    year, conninfo, run_id, index, staging, encoding)
+        for index, ((start, end), line_number, stage_table) in enumerate(zip(ranges, line_numbers, stage_tables))
+    ]
+    try:
+        rows = 0
+        quarantined = Counter()
+        stats = TableStats()
+        for future in futures:
+            # result() re-raises a worker's exception
+            range_rows, range_quarantined, range_stats = future.result()
+            rows += range_rows
+            quarantined.update(range_quarantined)
+            stats.merge(range_stats)
+        if quarantined:
+            reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(quarantined.items()))
+            logger.warning(f"Quarantined {sum(quarantined.values())} {table_name} rows for {year} (run {run_id}; {reasons})")
+
+        column_list = ', '.join(f'"{column}"' for column in columns + ['records_year'])
+        with engine.begin() as connection:
+            # the member replaces the rows an earlier load of it wrote for the year
+            connection.execute(text(f'DELETE FROM "{storage_table}" WHERE records_year = :year'), {'year': year})
+            for stage_table in stage_tables:
+                connection.execute(text(
+                    f'INSERT INTO "{storage_table}" ({column_list}) SELECT {column_list} FROM "{stage_table}"'))
+        publish_staged_parts(table_name, year, staging, len(ranges))
+    except Exception:
+        for future in futures:
+            future.cancel()
+        # let running ranges finish before removing what they staged
+        for future in futures:
+            if not future.cancelled():
+                future.exception()
+        discard_staged_parts(table_name, year, staging)
+        raise
+    finally:
+        with engine.begin() as connection:
+            for stage_table in stage_tables:
+                connection.execute(text(f'DROP TABLE IF EXISTS "{stage_table}"'))
+
+    return rows, len(ranges), stats
@@ -0,0 +1,181 @@
+import logging
+import os
+import re
+from typing import Optional
+
+from pandas import DataFrame, RangeIndex
+
+from config import get_settings, parquet_snapshot_dir_path
+
+logger = logging.getLogger('ingest')
+
+# pyarrow is optional; snapshots are skipped when it is not installed.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+"""
+Parquet snapshots of the ingested tables for the web app's analytical (DuckDB) backend.
+
+Each table loaded for a year is also written to
+    <parquet_snapshot_dir>/<table>/records_year=<year>/part-<n>.parquet
+i.e. one hive-style partition per records_year, with one part per range when
+a large file is loaded in parallel (see parallel_load.py). The directory and
+compression are settings (see config.py); point the web app's
+ANALYTICS_PARQUET_DIR setting at the same directory. Re-ingesting a year
+replaces that year's file; the file is written under a temporary name and
+renamed into place only once the whole table loaded, so readers never see a
+partial snapshot. The parts of a parallel load are staged under a name
+specific to that load and published together (publish_staged_parts) only
+once the merge into the table has committed.
+"""
+PARTITION_COLUMN = 'records_year'
+
+
+def snapshots_enabled() -> bool:
+    return parquet_snapshot_dir_path() is not None and pa is not None
+
+
+"""
+Writes one table's rows for one year, chunk by chunk, to its partition file.
+
+Every column is stored as a string (matching the all-string DataFrames read by
+load_data_from_csv); the partition column is carried by the directory name.
+A frame indexed by its key columns (see prepare_dataframe_for_db) has the index
+written as columns; an unindexed frame is written as is.
+Use as a context manager: the file is published on a clean exit and discarded
+if an exception escapes. With `staging` set the file is only staged on a clean
+exit, as part-<n>.parquet.<staging>, for publish_staged_parts. A snapshot error is logged and disables the writer
+without interrupting the database load; the writer is a no-op when snapshots
+are disabled.
+"""
+class ParquetSnapshotWriter:
+
+    def __init__(self, table_name: str, year: int, base_dir: Optional[str] = None, part: int = 0,
+                 staging: Optional[str] = None):
+        base_dir = base_dir or parquet_snapshot_dir_path() or ''  # unused when snapshots are disabled
+        self.table_name = table_name
+        self.year = year
+        self.partition_dir = _partition_dir(base_dir, table_name, year)
+        self.path = os.path.join(self.partition_dir, _part_name(part, staging))
+        self._tmp_path = self.path + '.tmp'
+        self._writer = None
+        self._schema = None
+        self.rows_written = 0
+        self.enabled = snapshots_enabled()
+
+    def write(self, data_frame: DataFrame):
+        if not self.enabled:
+            return
+        try:
+            self._write(data_frame)
+        except Exception as e:
+            logger.error(f"Error writing Parquet snapshot for {self.table_name} ({self.year}): {e}")
+            self.abort()
+
+    def _write(self, data_frame: DataFrame):
+        # the index set by prepare_dataframe_for_db holds the key columns
+        if not isinstance(data_frame.index, RangeIndex):
+            data_frame = data_frame.reset_index()
+        frame = data_frame.drop(columns=[PARTITION_COLUMN], errors='ignore')
+        if self._writer is None:
+            os.makedirs(self.partition_dir, exist_ok=True)
+            self._schema = pa.schema([(str(name), pa.string()) for name in frame.columns])
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema, compression=get_settings().parquet_compression)
+        frame = frame.reindex(columns=self._schema.names)
+        self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        self.rows_written += len(frame)
+
+    def close(self):
+        if not self.enabled or self._writer is None:
+            return
+        try:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmp_path, self.path)
+            logger.info(f"Wrote Parquet snapshot {self.path} ({self.rows_written} rows)")
+        except Exception as e:
+            logger.error(f"Error publishing Parquet snapshot {self.path}: {e}")
+            self.abort()
+
+    def abort(self):
+        self.enabled = False
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        # a partition directory without parts would make the web app's glob over the table match nothing
+        try:
+            os.rmdir(self.partition_dir)
+        except OSError:
+            pass  # missing, or holds other parts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def _partition_dir(base_dir: str, table_name: str, year: int) -> str:
+    return os.path.join(base_dir, table_name, f"{PARTITION_COLUMN}={year}")
+
+
+def _part_name(part: int, staging: Optional[str] = None) -> str:
+    return f'part-{part}.parquet' + (f'.{staging}' if staging else '')
+
+"""
+Publish the parts a load staged (ParquetSnapshotWriter with `staging`) by renaming them into
+place; call once the rows they hold have committed. A part that was not staged (a range
+without rows, or a snapshot error) has its previous file removed, so the snapshot never
+mixes an earlier load's rows into this one.
+"""
+def publish_staged_parts(table_name: str, year: int, staging: str, parts: int, base_dir: Optional[str] = None):
+    if not snapshots_enabled():
+        return
+    partition_dir = _partition_dir(base_dir or parquet_snapshot_dir_path(), table_name, year)
+    for part in range(parts):
+        staged = os.path.join(partition_dir, _part_name(part, staging))
+        live = os.path.join(partition_dir, _part_name(part))
+        if os.path.exists(staged):
+            os.replace(staged, live)
+        elif os.path.exists(live):
+            os.remove(live)
+    logger.info(f"Published {parts} Parquet snapshot parts of {table_name} ({year})")
+
+"""
+Remove the parts a failed load staged.
+"""
+def discard_staged_parts(table_name: str, year: int, staging: str, base_dir: Optional[str] = None):
+    if not snapshots_enabled():
+        return
+    partition_dir = _partition_dir(base_dir or parquet_snapshot_dir_path(), table_name, year)
+    if not os.path.isdir(partition_dir):
+        return
+    suffix = f'.parquet.{staging}'
+    for filename in os.listdir(partition_dir):
+        if filename.startswith('part-') and filename.endswith(suffix):
+            os.remove(os.path.join(partition_dir, filename))
+
+"""
+Remove part files left over from an earlier load of the year that wrote more parts
+(e.g. a parallel load followed by a single-threaded one). Keeps part-0 .. part-<parts - 1>.
+"""
+def remove_stale_parts(table_name: str, year: int, parts: int, base_dir: Optional[str] = None):
+    if not snapshots_enabled():
+        return
+    partition_dir = _partition_dir(base_dir or parquet_snapshot_dir_path(), table_name, year)
+    if not os.path.isdir(partition_dir):
+        return
+    for filename in os.listdir(partition_dir):
+        match = re.match(r'^part-(\d+)\.parquet$', filename)
+        if match and int(match.group(1)) >= parts:
+            os.remove(os.path.join(partition_dir, filename))
@@ -0,0 +1,383 @@
+import argparse
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+import config
+from column_encoding import ColumnEncoder, load_table_encoding, storage_table_name
+
+# parse workers only use the writer and reader, so SQLAlchemy is imported by the commands below
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('ingest')
+
+"""
+Quarantine for rows rejected while parsing the HCAD TSV files.
+
+Rejected rows used to be logged one by one (and dropped). They are now
+buffered in memory and bulk-written with COPY to QUARANTINE_TABLE, tagged with
+the ingest run, table, year, physical line number, raw bytes and reason. Only
+a per-table summary is logged.
+
+Rows are rejected in two places:
+- QuarantiningReader sits between the file and pandas and diverts records with
+  more fields than the header (the usual HCAD defect) before pandas parses
+  them, so their exact line number and raw bytes are kept;
+- QuarantineWriter.bad_line is the pandas on_bad_lines fallback for anything
+  else pandas rejects (e.g. records containing quotes); only the parsed fields
+  are available there, so the line number is unknown and the stored line is
+  those fields re-joined with tabs (escapes and quoting are lost), which its
+  reason, parse_error_reconstructed, records.
+
+A member whose rejected rows cannot be written to the quarantine fails rather
+than losing them; its load is rolled back and retried like any other failure.
+
+Fixing rows: run
+    python quarantine.py list
+    python quarantine.py export --run <run> --table <table> --year <year> rows.txt
+edit rows.txt (a TSV with the file's header and a leading quarantine_id column), then
+    python quarantine.py reingest --table <table> --year <year> rows.txt
+which appends the rows that now parse to the table and marks them re-ingested.
+"""
+QUARANTINE_TABLE = 'ingest_quarantine'
+QUARANTINE_HEADER_TABLE = 'ingest_quarantine_headers'
+FILE_ENCODING = 'MacRoman'
+
+REASON_TOO_MANY_FIELDS = 'too_many_fields'
+REASON_PARSE_ERROR_RECONSTRUCTED = 'parse_error_reconstructed'
+
+_FIELD_TOKEN = re.compile(r'\\.|\t', re.DOTALL)
+
+
+class QuarantineError(Exception):
+    """Rejected rows could not be written to the quarantine; the member being loaded must fail."""
+
+
+def new_run_id() -> str:
+    return time.strftime('%Y%m%dT%H%M%S') + f"-{os.getpid()}"
+
+"""
+Number of tab-separated fields in a record, ignoring backslash-escaped tabs.
+"""
+def count_fields(record: str) -> int:
+    if '\\' not in record:
+        return record.count('\t') + 1
+    return sum(1 for token in _FIELD_TOKEN.findall(record) if token == '\t') + 1
+
+
+"""
+Create the quarantine tables if needed. Concurrent loads quarantining their first rows at
+the same time would race on CREATE TABLE IF NOT EXISTS, so creation is serialized with an
+advisory lock.
+"""
+def _ensure_tables(connection):
+    with connection.transaction():
+        connection.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (QUARANTINE_TABLE,))
+        _create_tables(connection)
+
+
+def _create_tables(connection):
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {QUARANTINE_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            run_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            records_year INTEGER NOT NULL,
+            line_number BIGINT,
+            raw_line BYTEA NOT NULL,
+            reason TEXT NOT NULL,
+            quarantined_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            reingested_at TIMESTAMPTZ
+        )
+    """)
+    connection.execute(f"""
+        CREATE INDEX IF NOT EXISTS {QUARANTINE_TABLE}_run_table
+        ON {QUARANTINE_TABLE} (run_id, table_name, records_year)
+    """)
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {QUARANTINE_HEADER_TABLE} (
+            run_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            records_year INTEGER NOT NULL,
+            header TEXT NOT NULL,
+            PRIMARY KEY (run_id, table_name, records_year)
+        )
+    """)
+
+"""
+Collects rejected rows for one table and year and COPYs them to QUARANTINE_TABLE
+in batches of quarantine_batch_rows rows or quarantine_batch_bytes bytes (see config.py).
+
+Use as a context manager; the remaining rows are flushed on exit and the number
+of rows per reason is available in `counts`. A quarantine write error raises
+QuarantineError so the load fails instead of dropping the rows; callers commit
+the member's rows only after the writer has been flushed.
+"""
+class QuarantineWriter:
+
+    def __init__(self, conninfo: str, run_id: str, table_name: str, year: int, header: str = ''):
+        self.conninfo = conninfo
+        self.run_id = run_id
+        self.table_name = table_name
+        self.year = year
+        self.header = header  # the source file's header line, set by QuarantiningReader if not given
+        self.counts = Counter()
+        self._pending: List[Tuple[Optional[int], bytes, str]] = []
+        self._pending_bytes = 0
+        self._connection = None
+        settings = config.get_settings()
+        self._batch_rows, self._batch_bytes = settings.quarantine_batch_rows, settings.quarantine_batch_bytes
+
+    def add(self, line_number: Optional[int], raw_line: bytes, reason: str):
+        self._pending.append((line_number, raw_line, reason))
+        self._pending_bytes += len(raw_line)
+        self.counts[reason] += 1
+        if len(self._pending) >= self._batch_rows or self._pending_bytes >= self._batch_bytes:
+            self.flush()
+
+    """
+    pandas on_bad_lines callable for rows the reader did not catch. pandas only passes the
+    parsed fields, so the stored line is reconstructed from them.
+    """
+    def bad_line(self, fields: List[str]):
+        self.add(None, '\t'.join(fields).encode(FILE_ENCODING, errors='replace'), REASON_PARSE_ERROR_RECONSTRUCTED)
+        return None  # Returning None will skip the line
+
+    def flush(self):
+        rows, self._pending, self._pending_bytes = self._pending, [], 0
+        if not rows:
+            return
+        try:
+            if self._connection is None:
+                connection = psycopg.connect(self.conninfo, autocommit=True)
+                try:
+                    _ensure_tables(connection)
+                    connection.execute(
+                        f"INSERT INTO {QUARANTINE_HEADER_TABLE} (run_id, table_name, records_year, header) "
+                        "VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                        (self.run_id, self.table_name, self.year, self.header))
+                except Exception:
+                    connection.close()
+                    raise
+                self._connection = connection
+            with self._connection.cursor() as cursor, cursor.copy(
+                    f"COPY {QUARANTINE_TABLE} (run_id, table_name, records_year, line_number, raw_line, reason) "
+                    "FROM STDIN") as copy:
+                for line_number, raw_line, reason in rows:
+                    copy.write_row((self.run_id, self.table_name, self.year, line_number, raw_line, reason))
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} quarantined {self.table_name} rows: {e}")
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            raise QuarantineError(f"Could not quarantine {len(rows)} {self.table_name} rows for {self.year}: {e}") from e
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def summary(self) -> str:
+        reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(self.counts.items()))
+        return f"Quarantined {sum(self.counts.values())} {self.table_name} rows for {self.year} (run {self.run_id}; {reasons})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.close()
+        except QuarantineError:
+            # already logged; keep the error that ended the load
+            if exc_type is None:
+                raise
+        return False
+
+"""
+Iterates the records of a TSV text stream for pandas, diverting records with more
+fields than expected to the quarantine instead of yielding them.
+
+A record is one line, joined with the following line(s) when the newline is
+backslash-escaped. Records containing a quote character are passed through (quoted
+fields may contain tabs) and left to pandas. With expected_fields=None the first
+record is the header and sets the expected field count. first_line_number is the
+physical line number of the stream's first line.
+"""
+class QuarantiningReader:
+
+    def __init__(self, lines: Iterable[str], quarantine: QuarantineWriter,
+                 expected_fields: Optional[int] = None, first_line_number: int = 1):
+        self._lines = iter(lines)
+        self._quarantine = quarantine
+        self._expected_fields = expected_fields
+        self._next_line_number = first_line_number
+
+    def _next_record(self) -> Tuple[str, int]:
+        start = self._next_line_number
+        record = next(self._lines)
+        self._next_line_number += 1
+        while _ends_with_escaped_newline(record):
+            try:
+                record += next(self._lines)
+            except StopIteration:
+                break
+            self._next_line_number += 1
+        return record, start
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        while True:
+            record, line_number = self._next_record()
+            if self._expected_fields is None:
+                self._quarantine.header = record.rstrip('\r\n')
+                self._expected_fields = count_fields(self._quarantine.header)
+                return record
+            if '"' not in record and count_fields(record.rstrip('\r\n')) > self._expected_fields:
+                self._quarantine.add(line_number, record.rstrip('\r\n').encode(FILE_ENCODING), REASON_TOO_MANY_FIELDS)
+                continue
+            return record
+
+    # pandas requires file handles to have read() and readline(); the python engine iterates them.
+    def readline(self) -> str:
+        return next(self, '')
+
+    def read(self, size: int = -1) -> str:
+        return ''.join(self)
+
+
+def _ends_with_escaped_newline(line: str) -> bool:
+    if not line.endswith('\n'):
+        return False
+    stripped = line[:-1].rstrip('\r')
+    return (len(stripped) - len(stripped.rstrip('\\'))) % 2 == 1
+
+
+"""
+libpq connection string for an SQLAlchemy engine, for code that connects with psycopg directly.
+Built from keywords rather than the rendered URL so that a Unix socket directory host survives.
+"""
+def conninfo(engine: 'Engine') -> str:
+    url = engine.url
+    params = {'host': url.host, 'port': url.port, 'user': url.username, 'password': url.password,
+              'dbname': url.database, **url.query}
+    return make_conninfo(**{key: value for key, value in params.items() if value not in (None, '')})
+
+
+def list_quarantine(engine: 'Engine'):
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT run_id, table_name, records_year, reason, count(*) AS total, count(reingested_at) AS reingested
+            FROM {QUARANTINE_TABLE}
+            GROUP BY run_id, table_name, records_year, reason
+            ORDER BY run_id DESC, table_name, records_year, reason
+        """)).all()
+    for run_id, table_name, year, reason, total, reingested in rows:
+        print(f"{run_id}\t{table_name}\t{year}\t{reason}\t{total}\t{reingested} re-ingested")
+
+"""
+Write the quarantined, not yet re-ingested rows of a run/table/year to a TSV file with
+the source file's header and a leading quarantine_id column, for fixing by hand.
+"""
+def export_quarantine(engine: 'Engine', run_id: str, table_name: str, year: int, output_path: str) -> int:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        header = connection.execute(text(
+            f"SELECT header FROM {QUARANTINE_HEADER_TABLE} WHERE run_id = :run AND table_name = :table AND records_year = :year"),
+            {'run': run_id, 'table': table_name, 'year': year}).scalar()
+        if header is None:
+            raise ValueError(f"Nothing quarantined for {table_name} ({year}) in run {run_id}")
+        rows = connection.execute(text(f"""
+            SELECT id, raw_line FROM {QUARANTINE_TABLE}
+            WHERE run_id = :run AND table_name = :table AND records_year = :year AND reingested_at IS NULL
+            ORDER BY line_number NULLS LAST, id
+        """), {'run': run_id, 'table': table_name, 'year': year}).all()
+
+    with open(output_path, 'w', encoding=FILE_ENCODING, newline='') as output:
+        output.write(f"quarantine_id\t{header}\n")
+        for quarantine_id, raw_line in rows:
+            output.write(f"{quarantine_id}\t{bytes(raw_line).decode(FILE_ENCODING)}\n")
+    return len(rows)
+
+"""
+Append the rows of a fixed export file to table_name for the year and mark them
+re-ingested, in one transaction. Rows that still have too many fields are left
+in the quarantine. Returns (rows re-ingested, rows still rejected).
+"""
+def reingest_quarantine(engine: 'Engine', table_name: str, year: int, input_path: str) -> Tuple[int, int]:
+    from sqlalchemy import text
+
+    rejected = []
+    frame = pd.read_csv(
+        input_path,
+        sep='\x09',
+        engine='python',
+        encoding=FILE_ENCODING,
+        escapechar='\\',
+        doublequote=False,
+        on_bad_lines=lambda fields: rejected.append(fields) or None,
+        dtype=str)
+    frame = frame[frame['quarantine_id'].notna()]
+    ids = [int(quarantine_id) for quarantine_id in frame['quarantine_id']]
+    frame = frame.drop(columns=['quarantine_id'])
+    frame['records_year'] = year
+
+    # dictionary-encoded columns are written as codes to the table's storage table (see column_encoding.py)
+    encoding = load_table_encoding(engine, table_name)
+    with ColumnEncoder(conninfo(engine), encoding) as encoder:
+        frame = encoder.encode(frame)
+
+    with engine.begin() as connection:
+        frame.to_sql(name=storage_table_name(table_name, encoding), con=connection, if_exists='append', index=False, method='multi', chunksize=500)
+        connection.execute(
+            text(f"UPDATE {QUARANTINE_TABLE} SET reingested_at = now() WHERE id = ANY(:ids) AND table_name = :table"),
+            {'ids': ids, 'table': table_name})
+    return len(ids), len(rejected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and re-ingest quarantined rows.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='count quarantined rows per run, table, year and reason')
+    export = commands.add_parser('export', help='write quarantined rows to a TSV file for fixing')
+    export.add_argument('--run', required=True)
+    export.add_argument('--table', required=True)
+    export.add_argument('--year', type=int, required=True)
+    export.add_argument('output')
+    reingest = commands.add_parser('reingest', help='load a fixed export file and mark its rows re-ingested')
+    reingest.add_argument('--table', required=True)
+    reingest.add_argument('--year', type=int, required=True)
+    reingest.add_argument('input')
+    parser.add_argument('--config', help='ingest config file (see config.py)')
+    args = parser.parse_args()
+
+    config.configure_logging(config.configure(args.config))
+    engine = config.get_engine()
+
+    if args.command == 'list':
+        list_quarantine(engine)
+    elif args.command == 'export':
+        count = export_quarantine(engine, args.run, args.table, args.year, args.output)
+        logger.info(f"Exported {count} quarantined rows to {args.output}")
+    else:
+        loaded, still_rejected = reingest_quarantine(engine, args.table, args.year, args.input)
+        logger.info(f"Re-ingested {loaded} rows into {args.table}; {still_rejected} rows still rejected.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from column_encoding import load_table_encoding, storage_table_name
+from shared_definitions import SEARCH_FIELDS, SEARCH_TEXT_CONFIG
+
+logger = logging.getLogger('ingest')
+
+"""
+Trigram and full-text indexes on the owner-name and address columns.
+
+For every column in SEARCH_COLUMNS two GIN indexes are built:
+- <table>_<column>_trgm on (column gin_trgm_ops), which serves ILIKE '%...%'
+  and similarity() lookups, including the ad-hoc ILIKE queries users write;
+- <table>_<column>_tsv on to_tsvector(SEARCH_TEXT_CONFIG, coalesce(column, '')),
+  which serves word matches in any order ("JOHN SMITH" finds "SMITH JOHN A").
+
+The web app's search endpoint (web/dbqueryapp/search.py) uses exactly these
+expressions; both read SEARCH_FIELDS and SEARCH_TEXT_CONFIG from
+shared/definitions.py, and SEARCH_COLUMNS groups the searched columns by table.
+
+A table with dictionary-encoded columns is a view (see column_encoding.py), so
+its indexes are built on its storage table; the searched columns are never
+encoded and the planner reaches them through the view.
+
+Indexes are built CONCURRENTLY so the web app can keep reading while they
+build. Once an index exists PostgreSQL maintains it as later years are loaded;
+an index left invalid by an interrupted build is dropped and rebuilt.
+"""
+SEARCH_COLUMNS = {table: [c for _, t, c in SEARCH_FIELDS if t == table] for _, table, _ in SEARCH_FIELDS}
+
+"""
+Returns {index_name: is_valid} for the existing indexes on table_name.
+"""
+def _existing_indexes(connection, table_name: str):
+    rows = connection.execute(text("""
+        SELECT c.relname, i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE t.relname = :table AND t.relnamespace = current_schema()::regnamespace
+    """), {'table': table_name})
+    return {name: valid for name, valid in rows}
+
+"""
+Returns the (index_name, definition) pairs to build for one column.
+"""
+def search_index_definitions(table_name: str, column: str):
+    return [
+        (f"{table_name}_{column}_trgm", f"USING gin ({column} gin_trgm_ops)"),
+        (f"{table_name}_{column}_tsv",
+         f"USING gin (to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce({column}, '')))"),
+    ]
+
+"""
+Create the pg_trgm extension (if needed) and every missing search index.
+
+Run at the end of an ingest, after the tables are loaded. A failure for one
+table (e.g. it has not been loaded yet) is logged and does not prevent the
+remaining indexes from being built.
+"""
+def create_search_indexes(engine: Engine):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        try:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except SQLAlchemyError as e:
+            logger.error(f"Error creating the pg_trgm extension; search indexes skipped: {e}")
+            return
+
+        for table_name, columns in SEARCH_COLUMNS.items():
+            try:
+                storage_table = storage_table_name(table_name, load_table_encoding(engine, table_name))
+                existing = _existing_indexes(connection, storage_table)
+                built = False
+                for column in columns:
+                    for index_name, definition in search_index_definitions(table_name, column):
+                        if existing.get(index_name):
+                            continue
+                        if index_name in existing:
+                            logger.warning(f"Dropping invalid search index {index_name}")
+                            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+                        logger.info(f"Creating search index {index_name}")
+                        connection.execute(text(f"CREATE INDEX CONCURRENTLY {index_name} ON {storage_table} {definition}"))
+                        built = True
+                if built:
+                    connection.execute(text(f"ANALYZE {storage_table}"))
+            except SQLAlchemyError as e:
+                logger.error(f"Error creating search indexes for {table_name}: {e}")
@@ -0,0 +1,15 @@
+import os
+import sys
+
+"""
+The definitions shared with the web app (shared/definitions.py at the repository root).
+
+The ingest runs from its own folder, so the repository root is put on sys.path before
+the shared module is imported. Ingest modules import the definitions from here.
+"""
+_REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPOSITORY_ROOT not in sys.path:
+    sys.path.append(_REPOSITORY_ROOT)
+
+from shared.definitions import (COLUMN_STATS_TABLE, DATA_GENERATION_TABLE, PREDEFINED_QUERY_SUMMARY_TABLES,
+                                SEARCH_FIELDS, SEARCH_TEXT_CONFIG, TABLE_KEYS_TABLE)
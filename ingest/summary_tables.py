@@ -0,0 +1,96 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from shared_definitions import PREDEFINED_QUERY_SUMMARY_TABLES
+
+logger = logging.getLogger('ingest')
+
+"""
+Materialized views backing the web app's predefined queries.
+
+Each entry maps a materialized view name to its defining query and an optional
+list of columns forming a unique index. The names are those the web app serves
+its predefined queries from (PREDEFINED_QUERY_SUMMARY_TABLES in
+shared/definitions.py) and the queries must stay in sync with the corresponding
+DEFAULT_SQL_QUERIES entries.
+
+A view with a unique index is refreshed CONCURRENTLY so readers are never
+blocked while a refresh runs. To change a definition, drop the view and it will
+be recreated on the next ingest run.
+"""
+SUMMARY_TABLES = {
+    PREDEFINED_QUERY_SUMMARY_TABLES['get_avg_bldg_and_land_val_by_state_class']: {
+        'sql': """
+            SELECT
+              state_class,
+              AVG(CAST(bld_val AS NUMERIC)) AS avg_building_value,
+              AVG(CAST(land_val AS NUMERIC)) AS avg_land_value
+            FROM
+              real_acct
+            GROUP BY
+              state_class
+        """,
+        'unique_key': ['state_class'],
+    },
+    PREDEFINED_QUERY_SUMMARY_TABLES['get_first_100_unique_owners_for_residential']: {
+        'sql': """
+            SELECT
+              b.acct,
+              COUNT(DISTINCT o.name) AS distinct_owner_count,
+              STRING_AGG(DISTINCT o.name, ', ') AS owner_names
+            FROM
+              building_res b
+              JOIN ownership_history o ON b.acct = o.acct
+            WHERE
+              b.acct IN (
+                SELECT
+                  acct
+                FROM
+                  building_res
+                LIMIT
+                  100
+              )
+            GROUP BY
+              b.acct
+        """,
+        'unique_key': ['acct'],
+    },
+}
+
+"""
+Returns True if the materialized view already exists and has been populated.
+"""
+def _summary_table_state(connection, view_name: str):
+    row = connection.execute(
+        text("SELECT ispopulated FROM pg_matviews WHERE schemaname = current_schema() AND matviewname = :name"),
+        {'name': view_name},
+    ).first()
+    return None if row is None else bool(row[0])
+
+"""
+Create (if missing) and refresh every materialized view in SUMMARY_TABLES.
+
+Run at the end of an ingest so the predefined web queries read precomputed
+results. A failure for one view (e.g. a source table that has not been loaded
+yet) is logged and does not prevent the remaining views from refreshing.
+"""
+def refresh_summary_tables(engine: Engine):
+    for view_name, definition in SUMMARY_TABLES.items():
+        try:
+            with engine.begin() as connection:
+                populated = _summary_table_state(connection, view_name)
+                if populated is None:
+                    logger.info(f"Creating summary table {view_name}")
+                    connection.execute(text(f"CREATE MATERIALIZED VIEW {view_name} AS {definition['sql']} WITH NO DATA"))
+                    if definition.get('unique_key'):
+                        columns = ', '.join(definition['unique_key'])
+                        connection.execute(text(f"CREATE UNIQUE INDEX {view_name}_key ON {view_name} ({columns})"))
+
+                concurrently = 'CONCURRENTLY ' if populated and definition.get('unique_key') else ''
+                logger.info(f"Refreshing summary table {view_name}")
+                connection.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{view_name}"))
+        except SQLAlchemyError as e:
+            logger.error(f"Error refreshing summary table {view_name}: {e}")
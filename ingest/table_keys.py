@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from shared_definitions import TABLE_KEYS_TABLE
+
+logger = logging.getLogger('ingest')
+
+"""
+The key columns of each table, as suggested by the codebook (pdataCodebook.pdf).
+
+The loader indexes every table on its suggested key plus records_year (acct
+plus records_year when the codebook has none, see
+database.prepare_dataframe_for_db), but only the ingest reads the codebook.
+The keys are recorded in TABLE_KEYS_TABLE on every load so the web app's
+schema catalog can describe them without the PDF. A table whose codebook entry
+is not trusted (database.invalid_tables) is not recorded and falls back to acct.
+"""
+
+"""
+Record {table: key columns} (records_year excluded). Tables already recorded keep their
+row unless given again. A failure is logged and does not fail the load.
+"""
+def record_table_keys(engine: Engine, keys: Dict[str, List[str]]):
+    if not keys:
+        return
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {TABLE_KEYS_TABLE} (
+                    table_name TEXT PRIMARY KEY,
+                    key_columns TEXT[] NOT NULL,
+                    recorded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            connection.execute(text(f"""
+                INSERT INTO {TABLE_KEYS_TABLE} (table_name, key_columns) VALUES (:table, :columns)
+                ON CONFLICT (table_name) DO UPDATE SET key_columns = EXCLUDED.key_columns, recorded_at = now()
+            """), [{'table': table, 'columns': columns} for table, columns in sorted(keys.items())])
+    except SQLAlchemyError as e:
+        logger.error(f"Error recording table keys in {TABLE_KEYS_TABLE}: {e}")
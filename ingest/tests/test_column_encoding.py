@@ -0,0 +1,66 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from column_encoding import ColumnEncoder, choose_encoded_columns
+from config import Settings
+
+SETTINGS = Settings(encoding_min_sample_rows=100, encoding_max_distinct=10, encoded_columns='owners.name, deeds.kind')
+
+
+class ChooseEncodedColumnsTests(TestCase):
+
+    def setUp(self):
+        patcher = patch('column_encoding.get_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_low_cardinality_text_columns_within_thresholds(self):
+        stats = {'state_class': (10, False), 'site_addr_1': (11, False), 'land_val': (5, True), 'empty': (0, False)}
+        self.assertEqual(choose_encoded_columns('real_acct', 100, stats), ['state_class'])
+
+    def test_too_small_a_sample_encodes_nothing(self):
+        self.assertEqual(choose_encoded_columns('real_acct', 99, {'state_class': (3, False)}), [])
+
+    def test_forced_columns_encoded_whatever_the_sample(self):
+        stats = {'name': (5000, False), 'acct': (5000, True), 'state_class': (3, False)}
+        self.assertEqual(choose_encoded_columns('owners', 1, stats, excluded=['name']), ['name'])
+
+    def test_excluded_columns_and_records_year_are_left_as_text(self):
+        stats = {'state_class': (3, False), 'nbhd': (3, False), 'records_year': (1, False)}
+        self.assertEqual(choose_encoded_columns('real_acct', 100, stats, excluded=['nbhd']), ['state_class'])
+
+
+class ColumnEncoderTests(TestCase):
+
+    def setUp(self):
+        self.encoder = ColumnEncoder('', {'state_class': 'real_acct__state_class_codes'})
+        self.dictionary = {'A1': 1, 'B2': 2, 'F1': 3}
+        self.lookups = []
+
+        def lookup(dictionary_table, values):
+            self.lookups.append(sorted(values))
+            return {value: self.dictionary[value] for value in values}
+
+        patcher = patch.object(self.encoder, '_lookup', side_effect=lookup)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_codes_are_looked_up_once_per_value(self):
+        first = self.encoder.encode(pd.DataFrame({'state_class': ['A1', 'B2', 'A1'], 'acct': ['1', '2', '3']}))
+        second = self.encoder.encode(pd.DataFrame({'state_class': ['B2', 'F1', 'A1'], 'acct': ['4', '5', '6']}))
+
+        self.assertEqual(list(first['state_class']), [1, 2, 1])
+        self.assertEqual(list(second['state_class']), [2, 3, 1])
+        self.assertEqual(list(second['acct']), ['4', '5', '6'])
+        self.assertEqual(self.lookups, [['A1', 'B2'], ['F1']])
+
+    def test_missing_values_stay_null(self):
+        frame = pd.DataFrame({'state_class': ['A1', np.nan, None]})
+        encoded = self.encoder.encode(frame)
+
+        self.assertEqual(list(encoded['state_class']), [1, None, None])
+        self.assertEqual(self.lookups, [['A1']])
+        self.assertEqual(frame['state_class'].iloc[0], 'A1')  # the caller's frame is not modified
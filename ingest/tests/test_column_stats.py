@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from column_stats import ColumnStats, TableStats
+
+
+def _stats(values) -> ColumnStats:
+    stats = ColumnStats()
+    stats.update(pd.Series(values, dtype=object))
+    return stats
+
+
+class ColumnStatsMergeTests(TestCase):
+
+    def test_split_merges_to_the_whole(self):
+        values = [str(i) for i in range(20000)]
+        whole = _stats(values)
+        split = _stats(values[:7000])
+        split.merge(_stats(values[7000:]))
+
+        np.testing.assert_array_equal(split.registers, whole.registers)
+        self.assertEqual(split.distinct_estimate(), whole.distinct_estimate())
+        self.assertAlmostEqual(whole.distinct_estimate(), 20000, delta=20000 * 0.05)
+        self.assertEqual((split.row_count, split.min_value, split.max_value), (20000, '0', '9999'))
+        self.assertEqual((split.numeric_min, split.numeric_max), (0.0, 19999.0))
+
+    def test_overlapping_parts_count_shared_values_once(self):
+        values = [f'ACCT{i:05d}' for i in range(3000)]
+        merged = _stats(values[:2000])
+        merged.merge(_stats(values[1000:]))
+        np.testing.assert_array_equal(merged.registers, _stats(values).registers)
+        self.assertEqual(merged.row_count, 4000)
+
+    def test_small_counts_are_close_to_exact(self):
+        self.assertAlmostEqual(_stats([str(i % 100) for i in range(5000)]).distinct_estimate(), 100, delta=2)
+
+    def test_nulls_and_text_in_one_part(self):
+        numeric = _stats(['1', '2', None])
+        numeric.merge(_stats([None, None]))
+        self.assertTrue(numeric.is_numeric)
+        self.assertEqual((numeric.null_count, numeric.numeric_max), (3, 2.0))
+        numeric.merge(_stats(['A1']))
+        self.assertFalse(numeric.is_numeric)
+        self.assertIsNone(numeric.numeric_max)
+
+
+class TableStatsTests(TestCase):
+
+    def test_ranges_merge_to_the_whole_member(self):
+        frame = pd.DataFrame({'acct': [f'{i:07d}' for i in range(9000)],
+                              'state_class': ['A1', 'B2', None] * 3000,
+                              'records_year': '2025'})
+        whole = TableStats()
+        whole.add(frame)
+        ranges = TableStats()
+        for start in range(0, 9000, 2500):
+            part = TableStats()
+            part.add(frame.iloc[start:start + 2500])
+            # parts travel through the database between queue tasks
+            ranges.merge(TableStats.from_rows(part.to_rows()))
+
+        self.assertEqual(list(ranges.columns()), ['acct', 'state_class'])
+        for name, stats in whole.columns().items():
+            merged = ranges.columns()[name].to_row()
+            self.assertEqual(merged, stats.to_row(), name)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from parallel_load import _next_record_start, range_line_numbers, split_byte_ranges
+
+
+class NextRecordStartTests(TestCase):
+
+    def test_escaped_newline_is_part_of_the_field(self):
+        data = b'1\tfoo\\\nbar\tz\n2\tq\tr\n'
+        self.assertEqual(_next_record_start(data, 0, len(data), 2), data.index(b'2\t'))
+
+    def test_escaped_backslash_before_newline_ends_the_record(self):
+        data = b'x\\\\\n2\tq\tr\n'
+        self.assertEqual(_next_record_start(data, 0, len(data), 2), data.index(b'2\t'))
+
+    def test_newline_in_quoted_field_is_skipped_by_field_count(self):
+        data = b'1\t"a\nb"\tc\n2\tq\tr\n'
+        self.assertEqual(_next_record_start(data, 0, len(data), 2), data.index(b'2\t'))
+
+    def test_end_when_no_record_follows(self):
+        data = b'1\tq\tr\npartial'
+        self.assertEqual(_next_record_start(data, 0, len(data), 2), len(data))
+
+
+class SplitByteRangesTests(TestCase):
+
+    def _file(self, data: bytes) -> str:
+        file = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+        file.write(data)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_ranges_cover_the_body_and_start_at_records(self):
+        rows = []
+        for i in range(500):
+            if i % 7 == 0:
+                rows.append(f'{i}\tline\\\nbreak\t"q\nx"\n')  # escaped newline and a quoted newline
+            else:
+                rows.append(f'{i}\tname {i}\tvalue\n')
+        header = b'acct\tname\tnote\n'
+        data = header + ''.join(rows).encode()
+        path = self._file(data)
+
+        for range_bytes in (1, 50, 333, 4096, len(data)):
+            ranges = split_byte_ranges(path, range_bytes)
+            self.assertEqual(ranges[0][0], len(header))
+            self.assertEqual(ranges[-1][1], len(data))
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+            starts = {len(header) + len(''.join(rows[:i]).encode()) for i in range(len(rows))}
+            self.assertTrue(all(start in starts for start, _ in ranges), range_bytes)
+
+    def test_line_numbers_of_each_range(self):
+        data = b'a\tb\n' + b''.join(b'%d\tx\n' % i for i in range(100))
+        path = self._file(data)
+        ranges = split_byte_ranges(path, 100)
+        self.assertGreater(len(ranges), 1)
+        numbers = range_line_numbers(path, ranges)
+        self.assertEqual(numbers[0], 2)
+        for (start, _), number in zip(ranges, numbers):
+            self.assertEqual(data[:start].count(b'\n') + 1, number)
+
+    def test_empty_and_header_only_files(self):
+        self.assertEqual(split_byte_ranges(self._file(b'')), [])
+        self.assertEqual(split_byte_ranges(self._file(b'a\tb\n')), [])
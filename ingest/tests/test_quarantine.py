@@ -0,0 +1,70 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas as pd
+
+import quarantine
+from quarantine import (REASON_PARSE_ERROR_RECONSTRUCTED, REASON_TOO_MANY_FIELDS, QuarantineError,
+                        QuarantineWriter, QuarantiningReader, count_fields)
+
+
+def _writer() -> QuarantineWriter:
+    return QuarantineWriter('', 'run', 'real_acct', 2025)
+
+
+class CountFieldsTests(TestCase):
+
+    def test_escaped_tabs_are_not_separators(self):
+        self.assertEqual(count_fields(''), 1)
+        self.assertEqual(count_fields('a\tb\tc'), 3)
+        self.assertEqual(count_fields('a\\\tb'), 1)
+        self.assertEqual(count_fields('a\\\\\tb'), 2)
+
+
+class QuarantiningReaderTests(TestCase):
+
+    def test_records_with_extra_fields_are_diverted_with_their_line_numbers(self):
+        lines = ['acct\tname\n', '1\tx\n', '2\ty\tEXTRA\n', '3\t"q\tr"\n', '4\tline\\\n', 'cont\n', '5\tz\tEXTRA\n']
+        writer = _writer()
+        records = list(QuarantiningReader(lines, writer))
+
+        self.assertEqual(records, ['acct\tname\n', '1\tx\n', '3\t"q\tr"\n', '4\tline\\\ncont\n'])
+        self.assertEqual(writer.header, 'acct\tname')
+        self.assertEqual(writer.counts, {REASON_TOO_MANY_FIELDS: 2})
+        self.assertEqual([(line, raw) for line, raw, _ in writer._pending], [(3, b'2\ty\tEXTRA'), (7, b'5\tz\tEXTRA')])
+
+    def test_range_without_header(self):
+        writer = _writer()
+        reader = QuarantiningReader(['1\tx\n', '2\ty\tz\n'], writer, expected_fields=2, first_line_number=10)
+        self.assertEqual(list(reader), ['1\tx\n'])
+        self.assertEqual(writer._pending[0][0], 11)
+
+    def test_pandas_reads_the_remaining_records(self):
+        writer = _writer()
+        lines = ['acct\tname\n', '1\tx\n', '2\ty\tEXTRA\n', '3\tline\\\n', 'break\n']
+        frame = pd.read_csv(QuarantiningReader(lines, writer), sep='\t', engine='python', escapechar='\\',
+                            doublequote=False, on_bad_lines=writer.bad_line, dtype=str)
+        self.assertEqual(list(frame['acct']), ['1', '3'])
+        self.assertEqual(frame['name'][1], 'line\nbreak')
+
+
+class QuarantineWriterTests(TestCase):
+
+    def test_pandas_rejects_are_labelled_reconstructed(self):
+        writer = _writer()
+        writer.bad_line(['1', 'x', 'y'])
+        self.assertEqual(writer._pending, [(None, b'1\tx\ty', REASON_PARSE_ERROR_RECONSTRUCTED)])
+
+    def test_write_error_fails_instead_of_dropping_rows(self):
+        writer = _writer()
+        writer.add(3, b'2\ty\tEXTRA', REASON_TOO_MANY_FIELDS)
+        with patch.object(quarantine.psycopg, 'connect', side_effect=OSError('down')):
+            with self.assertRaises(QuarantineError):
+                writer.flush()
+
+    def test_write_error_does_not_mask_the_load_error(self):
+        with patch.object(quarantine.psycopg, 'connect', side_effect=OSError('down')):
+            with self.assertRaises(ValueError):
+                with _writer() as writer:
+                    writer.add(3, b'2\ty\tEXTRA', REASON_TOO_MANY_FIELDS)
+                    raise ValueError('parse failed')
@@ -0,0 +1,132 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger('ingest')
+
+"""
+Year-over-year changes of each account's appraised values.
+
+For every records year of real_acct that has an earlier year loaded, one row
+per account present in both years is stored in VALUE_DELTA_TABLE with the
+prior and current value, the change and the percent change of each column in
+VALUE_DELTA_COLUMNS. "Consecutive" means the latest loaded year before it, so
+a gap in the loaded years compares across the gap (prior_year says which).
+
+A year's rows are rebuilt with one DELETE and one INSERT ... SELECT joining
+the two years, in one transaction, so readers see either the old or the new
+deltas. Trend questions ("which accounts' appraised value rose more than
+20%") then read the indexes below instead of self-joining real_acct:
+- the primary key (acct, records_year) serves one account's history;
+- <table>_<column>_pct on (records_year, <column>_pct) serves threshold and
+  top-N queries on each column's percent change within a year.
+
+The percent change is NULL when the prior value is 0 or missing. Values that
+are not plain numbers are treated as missing.
+"""
+VALUE_DELTA_TABLE = 'real_acct_value_deltas'
+VALUE_DELTA_SOURCE = 'real_acct'
+VALUE_DELTA_COLUMNS = ['land_val', 'bld_val', 'tot_appr_val']
+
+NUMERIC_PATTERN = r'^\s*-?[0-9]+(\.[0-9]+)?\s*$'
+
+
+def _numeric(expression: str) -> str:
+    return f"CASE WHEN {expression} ~ '{NUMERIC_PATTERN}' THEN CAST({expression} AS NUMERIC) END"
+
+
+def _ensure_table(connection: Connection):
+    value_columns = ',\n'.join(
+        f"{column}_prior NUMERIC, {column} NUMERIC, {column}_change NUMERIC, {column}_pct NUMERIC"
+        for column in VALUE_DELTA_COLUMNS)
+    connection.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {VALUE_DELTA_TABLE} (
+            acct TEXT NOT NULL,
+            records_year INTEGER NOT NULL,
+            prior_year INTEGER NOT NULL,
+            {value_columns},
+            PRIMARY KEY (acct, records_year)
+        )
+    """))
+    for column in VALUE_DELTA_COLUMNS:
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {VALUE_DELTA_TABLE}_{column}_pct "
+            f"ON {VALUE_DELTA_TABLE} (records_year, {column}_pct)"))
+
+"""
+The INSERT ... SELECT computing the deltas of :year against :prior_year. An account
+with several rows in a year contributes one of them.
+"""
+def _delta_insert_sql() -> str:
+    selected = ',\n'.join(
+        f"p.{column}, c.{column}, c.{column} - p.{column}, "
+        f"round((c.{column} - p.{column}) * 100 / NULLIF(p.{column}, 0), 2)"
+        for column in VALUE_DELTA_COLUMNS)
+    inserted = ', '.join(
+        f"{column}_prior, {column}, {column}_change, {column}_pct" for column in VALUE_DELTA_COLUMNS)
+    parsed = ', '.join(f"{_numeric(column)} AS {column}" for column in VALUE_DELTA_COLUMNS)
+    return f"""
+        INSERT INTO {VALUE_DELTA_TABLE} (acct, records_year, prior_year, {inserted})
+        SELECT c.acct, :year, :prior_year,
+            {selected}
+        FROM
+            (SELECT DISTINCT ON (acct) acct, {parsed}
+             FROM {VALUE_DELTA_SOURCE} WHERE records_year = :year ORDER BY acct) c
+            JOIN (SELECT DISTINCT ON (acct) acct, {parsed}
+                  FROM {VALUE_DELTA_SOURCE} WHERE records_year = :prior_year ORDER BY acct) p
+            ON p.acct = c.acct
+    """
+
+"""
+Returns [(year, prior year)] for the loaded years of the source table that have an earlier one.
+"""
+def _year_pairs(connection: Connection) -> List[Tuple[int, int]]:
+    years = sorted(connection.execute(
+        text(f"SELECT DISTINCT records_year FROM {VALUE_DELTA_SOURCE}")).scalars())
+    return list(zip(years[1:], years[:-1]))
+
+"""
+Rebuild the deltas of one year against its prior year. Returns the number of accounts stored.
+"""
+def build_value_deltas(engine: Engine, year: int, prior_year: int) -> int:
+    with engine.begin() as connection:
+        _ensure_table(connection)
+        connection.execute(text(f"DELETE FROM {VALUE_DELTA_TABLE} WHERE records_year = :year"), {'year': year})
+        rows = connection.execute(text(_delta_insert_sql()), {'year': year, 'prior_year': prior_year}).rowcount
+    logger.info(f"Stored {rows} value deltas for {year} against {prior_year} in {VALUE_DELTA_TABLE}")
+    return rows
+
+"""
+Bring VALUE_DELTA_TABLE up to date after a load. Rebuilt are the deltas of every year
+in changed_years, of the year following each of them (its prior year changed too), and
+of every loaded year whose deltas are missing or were computed against another prior
+year (e.g. after an earlier year was loaded for the first time). Deltas of years no
+longer in the source are removed.
+
+Run by database.refresh; a failure (e.g. real_acct has not been loaded yet) is logged
+and leaves the existing deltas in place. Returns {year: accounts stored} for the
+rebuilt years.
+"""
+def refresh_value_deltas(engine: Engine, changed_years: Iterable[int] = ()) -> Dict[int, int]:
+    changed_years = set(changed_years)
+    rebuilt = {}
+    try:
+        with engine.begin() as connection:
+            _ensure_table(connection)
+            pairs = _year_pairs(connection)
+            stored = dict(connection.execute(text(
+                f"SELECT DISTINCT records_year, prior_year FROM {VALUE_DELTA_TABLE}")).all())
+            stale = set(stored) - {year for year, _ in pairs}
+            if stale:
+                connection.execute(text(f"DELETE FROM {VALUE_DELTA_TABLE} WHERE records_year = ANY(:years)"),
+                                   {'years': sorted(stale)})
+
+        for year, prior_year in pairs:
+            if year in changed_years or prior_year in changed_years or stored.get(year) != prior_year:
+                rebuilt[year] = build_value_deltas(engine, year, prior_year)
+    except SQLAlchemyError as e:
+        logger.error(f"Error refreshing {VALUE_DELTA_TABLE}: {e}")
+    return rebuilt
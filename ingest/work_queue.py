@@ -0,0 +1,522 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+import config
+from member_checksums import load_member_checksums, upsert_member_checksum
+from column_encoding import EncodingOverflow, load_table_encoding, storage_table_name, widen_encoded_column
+from column_stats import delete_stats_parts, merge_stats_parts, store_stats_part, store_table_stats
+from parallel_load import copy_range, range_line_numbers, read_columns, read_header_line, split_byte_ranges
+from parquet_snapshots import discard_staged_parts, publish_staged_parts, remove_stale_parts
+from quarantine import conninfo
+
+logger = logging.getLogger('ingest')
+
+"""
+PostgreSQL-backed work queue for loading members with worker processes on any number of hosts.
+
+The coordinator (`python cli.py enqueue`) extracts a year's changed members into
+queue_dir (see config.py), creates their tables and cuts each member into
+newline-aligned byte ranges (see parallel_load.py). Each member becomes a row of
+QUEUE_MEMBER_TABLE and each range a task in QUEUE_TASK_TABLE. Workers
+(`python cli.py worker`, on any host that reaches the database and can read
+queue_dir) then loop:
+- claim the oldest available task with SELECT ... FOR UPDATE SKIP LOCKED, so
+  concurrent workers never get the same task or wait on each other, under a
+  lease of queue_lease_seconds that is renewed while the task runs;
+- a range task recreates the member's staging table for the range, COPYs the
+  range into it and marks itself done in one transaction, which only commits
+  while the worker still holds the lease, so a retried range never loads twice;
+- the worker finishing a member's last range queues its merge task, which moves
+  the staging tables into the target table, drops them and records the
+  member's checksum (see member_checksums.py) and column statistics (merged
+  from the ranges', see column_stats.py) in one transaction, so a member is
+  still all-or-nothing.
+
+A failed task is retried after an exponential backoff starting at
+queue_retry_backoff_seconds, and a task whose lease expired (its worker died or
+hung) is claimed again. After queue_max_attempts attempts the task and its
+member are marked failed. Rows rejected by a range that is retried may be
+quarantined twice. A range that overflows a dictionary's codes widens them (see
+column_encoding.py) before it is retried. Each range task stages its Parquet snapshot part under the
+member's name (see parquet_snapshots.py) and the merge task publishes them all
+once its transaction commits; for a load across hosts parquet_snapshot_dir must
+therefore be on shared storage too, since the parts are written by the hosts
+that ran the ranges and renamed by the one that runs the merge.
+
+On one box: `python cli.py worker --processes 4` in one shell and
+`python cli.py enqueue --wait` in another; `python cli.py queue` shows progress.
+The queue_* settings (lease, attempts, backoff, polling) are in config.py.
+"""
+QUEUE_MEMBER_TABLE = 'ingest_queue_members'
+QUEUE_TASK_TABLE = 'ingest_queue_tasks'
+
+TASK_RANGE = 'range'
+TASK_MERGE = 'merge'
+
+
+class LeaseLost(Exception):
+    """The task's lease expired and it was claimed by another worker; this worker's work is discarded."""
+
+
+def ensure_queue_tables(engine: Engine):
+    with engine.begin() as connection:
+        # coordinator and workers may start at the same time
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': QUEUE_TASK_TABLE})
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {QUEUE_MEMBER_TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                records_year INTEGER NOT NULL,
+                member TEXT NOT NULL,
+                zip_file TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                crc32 BIGINT NOT NULL,
+                file_size BIGINT NOT NULL,
+                ranges INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'loading',
+                rows_loaded BIGINT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                finished_at TIMESTAMPTZ
+            )
+        """))
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {QUEUE_TASK_TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                member_id BIGINT NOT NULL REFERENCES {QUEUE_MEMBER_TABLE} (id) ON DELETE CASCADE,
+                kind TEXT NOT NULL,
+                range_index INTEGER,
+                start_byte BIGINT,
+                end_byte BIGINT,
+                first_line BIGINT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                lease_token TEXT,
+                leased_by TEXT,
+                lease_expires_at TIMESTAMPTZ,
+                rows_loaded BIGINT,
+                last_error TEXT,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        connection.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {QUEUE_TASK_TABLE}_open ON {QUEUE_TASK_TABLE} (id)
+            WHERE state IN ('pending', 'running')
+        """))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {QUEUE_TASK_TABLE}_member ON {QUEUE_TASK_TABLE} (member_id)"))
+
+
+def stage_table_name(table_name: str, member_id: int, index: int) -> str:
+    suffix = f"__q{member_id}_{index}"
+    return table_name[:63 - len(suffix)] + suffix
+
+
+def snapshot_staging(member_id: int) -> str:
+    return f"q{member_id}"
+
+"""
+Coordinator: queue every changed member of the year in records_folder (see database.load).
+Members that still have a load in progress are skipped. Returns the queued member ids.
+"""
+def enqueue_directory(records_folder: str, run_id: str) -> List[int]:
+    # the coordinator needs the loader's helpers (codebook, unzip, table creation); workers do not
+    import database
+
+    engine = config.get_engine()
+    ensure_queue_tables(engine)
+    year = int(os.path.basename(os.path.normpath(records_folder)))
+    database.load_primary_keys(records_folder)
+
+    drop_failed_stage_tables(engine, year)
+    with engine.connect() as connection:
+        in_progress = set(connection.execute(text(
+            f"SELECT member FROM {QUEUE_MEMBER_TABLE} WHERE records_year = :year AND state = 'loading'"),
+            {'year': year}).scalars())
+
+    # one directory per run, so files still being read by an earlier run are never overwritten
+    run_dir = os.path.join(config.queue_dir_path(), str(year), run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    known_checksums = load_member_checksums(engine, year)
+    member_ids = []
+    for zip_file in sorted(f for f in os.listdir(records_folder) if f.endswith('.zip')):
+        members, checksums = database.unzip(os.path.join(records_folder, zip_file), known_checksums.get(zip_file), run_dir)
+        for member in members:
+            file_path = os.path.join(run_dir, member)
+            if member in in_progress or not member.endswith('.txt'):
+                if member in in_progress:
+                    logger.warning(f"{member} ({year}) is still loading from an earlier run; not queued again")
+                os.remove(file_path)
+                continue
+            member_ids.append(enqueue_member(engine, run_id, year, zip_file, member, file_path, checksums[member]))
+    return member_ids
+
+"""
+Drop the staging tables, range statistics and staged snapshot parts left behind by the year's failed members.
+"""
+def drop_failed_stage_tables(engine: Engine, year: int):
+    with engine.begin() as connection:
+        failed = connection.execute(text(
+            f"SELECT id, table_name, ranges FROM {QUEUE_MEMBER_TABLE} WHERE records_year = :year AND state = 'failed'"),
+            {'year': year}).all()
+        for member_id, table_name, ranges in failed:
+            for index in range(ranges):
+                connection.execute(text(f'DROP TABLE IF EXISTS "{stage_table_name(table_name, member_id, index)}"'))
+            discard_staged_parts(table_name, year, snapshot_staging(member_id))
+        delete_stats_parts(connection, [member_id for member_id, _, _ in failed])
+
+"""
+Coordinator: create the member's table, split it into ranges and queue one task per range
+(a merge task straight away if the member has no rows). Returns the member id.
+"""
+def enqueue_member(engine: Engine, run_id: str, year: int, zip_file: str, member: str, file_path: str,
+                   checksum: Tuple[int, int]) -> int:
+    import database
+
+    table_name = database.getTableName(file_path)
+    cleaned_file = database.clean_file_remove_nulls(file_path)
+    os.remove(file_path)
+    database.create_table_from_header(cleaned_file, table_name, year, database.member_encoding(cleaned_file, table_name))
+    ranges = split_byte_ranges(cleaned_file)
+    line_numbers = range_line_numbers(cleaned_file, ranges) if ranges else []
+    crc32, file_size = checksum
+
+    with engine.begin() as connection:
+        member_id = connection.execute(text(f"""
+            INSERT INTO {QUEUE_MEMBER_TABLE}
+                (run_id, records_year, member, zip_file, table_name, file_path, crc32, file_size, ranges)
+            VALUES (:run_id, :year, :member, :zip_file, :table_name, :file_path, :crc32, :file_size, :ranges)
+            RETURNING id
+        """), {'run_id': run_id, 'year': year, 'member': member, 'zip_file': zip_file, 'table_name': table_name,
+               'file_path': cleaned_file, 'crc32': crc32, 'file_size': file_size,
+               'ranges': len(ranges)}).scalar_one()
+        if ranges:
+            connection.execute(text(f"""
+                INSERT INTO {QUEUE_TASK_TABLE} (member_id, kind, range_index, start_byte, end_byte, first_line)
+                VALUES (:member_id, '{TASK_RANGE}', :index, :start, :end, :first_line)
+            """), [{'member_id': member_id, 'index': index, 'start': start, 'end': end, 'first_line': line_number}
+                   for index, ((start, end), line_number) in enumerate(zip(ranges, line_numbers))])
+        else:
+            _queue_merge(connection, member_id)
+
+    logger.info(f"Queued {member} ({year}) as {len(ranges)} range tasks")
+    return member_id
+
+
+def _queue_merge(connection: Connection, member_id: int):
+    connection.execute(text(f"INSERT INTO {QUEUE_TASK_TABLE} (member_id, kind) VALUES (:member_id, '{TASK_MERGE}')"),
+                       {'member_id': member_id})
+
+"""
+Worker: claim the next available task under a new lease, or return None. Merge tasks go
+first so members finish before new ones start. Running tasks whose lease expired after
+their last attempt are marked failed (with their member) on the way.
+"""
+def claim_task(engine: Engine, worker_id: str) -> Optional[Dict[str, Any]]:
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            WITH exhausted AS (
+                UPDATE {QUEUE_TASK_TABLE}
+                SET state = 'failed', lease_token = NULL, updated_at = now(),
+                    last_error = coalesce(last_error || '; ', '') || 'lease expired'
+                WHERE id IN (
+                    SELECT id FROM {QUEUE_TASK_TABLE}
+                    WHERE state = 'running' AND lease_expires_at < now() AND attempts >= :max_attempts
+                    FOR UPDATE SKIP LOCKED)
+                RETURNING member_id
+            )
+            UPDATE {QUEUE_MEMBER_TABLE} SET state = 'failed', finished_at = now()
+            WHERE id IN (SELECT member_id FROM exhausted) AND state = 'loading'
+        """), {'max_attempts': config.get_settings().queue_max_attempts})
+
+        task = connection.execute(text(f"""
+            UPDATE {QUEUE_TASK_TABLE} AS t
+            SET state = 'running', attempts = t.attempts + 1, lease_token = :token, leased_by = :worker,
+                lease_expires_at = now() + make_interval(secs => :lease), updated_at = now()
+            FROM {QUEUE_MEMBER_TABLE} AS m
+            WHERE m.id = t.member_id AND t.id = (
+                SELECT c.id
+                FROM {QUEUE_TASK_TABLE} AS c JOIN {QUEUE_MEMBER_TABLE} AS cm ON cm.id = c.member_id
+                WHERE cm.state = 'loading'
+                  AND ((c.state = 'pending' AND c.available_at <= now())
+                       OR (c.state = 'running' AND c.lease_expires_at < now()))
+                ORDER BY c.kind = '{TASK_MERGE}' DESC, c.id
+                LIMIT 1
+                FOR UPDATE OF c SKIP LOCKED
+            )
+            RETURNING t.id, t.kind, t.range_index, t.start_byte, t.end_byte, t.first_line, t.attempts,
+                      t.lease_token, m.id AS member_id, m.run_id, m.records_year, m.member, m.table_name,
+                      m.file_path, m.zip_file, m.crc32, m.file_size, m.ranges
+        """), {'token': uuid.uuid4().hex, 'worker': worker_id,
+              'lease': config.get_settings().queue_lease_seconds}).mappings().first()
+    return dict(task) if task else None
+
+"""
+Mark the task done within the caller's transaction; raises LeaseLost (rolling the
+transaction back) if another worker has taken the task over.
+"""
+def _complete_task(connection: Connection, task: Dict[str, Any], rows: int):
+    result = connection.execute(text(f"""
+        UPDATE {QUEUE_TASK_TABLE}
+        SET state = 'done', rows_loaded = :rows, lease_token = NULL, lease_expires_at = NULL, updated_at = now()
+        WHERE id = :id AND lease_token = :token AND state = 'running'
+    """), {'rows': rows, 'id': task['id'], 'token': task['lease_token']})
+    if result.rowcount != 1:
+        raise LeaseLost(f"Lost the lease on task {task['id']} ({task['member']} {task['kind']})")
+
+
+def run_range_task(engine: Engine, task: Dict[str, Any]) -> int:
+    file_path, table_name, year = task['file_path'], task['table_name'], task['records_year']
+    stage_table = stage_table_name(table_name, task['member_id'], task['range_index'])
+    columns = read_columns(file_path)
+    header = read_header_line(file_path)
+    encoding = load_table_encoding(engine, table_name)
+
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS "{stage_table}"'))
+        connection.execute(text(
+            f'CREATE UNLOGGED TABLE "{stage_table}" (LIKE "{storage_table_name(table_name, encoding)}" INCLUDING DEFAULTS)'))
+        # the psycopg connection under SQLAlchemy's, so the COPY is part of this transaction
+        rows, quarantined, stats = copy_range(
+            connection.connection.driver_connection, file_path, task['start_byte'], task['end_byte'],
+            task['first_line'], header, columns, table_name, stage_table, year, conninfo(engine),
+            task['run_id'], task['range_index'], snapshot_staging(task['member_id']), encoding)
+        store_stats_part(connection, task['member_id'], task['range_index'], stats)
+        _complete_task(connection, task, rows)
+
+        # serialize the workers finishing this member's ranges so exactly one sees none left
+        connection.execute(text(f"SELECT id FROM {QUEUE_MEMBER_TABLE} WHERE id = :id FOR UPDATE"),
+                           {'id': task['member_id']})
+        remaining = connection.execute(text(f"""
+            SELECT count(*) FROM {QUEUE_TASK_TABLE}
+            WHERE member_id = :id AND kind = '{TASK_RANGE}' AND state <> 'done'
+        """), {'id': task['member_id']}).scalar_one()
+        if remaining == 0:
+            _queue_merge(connection, task['member_id'])
+
+    if quarantined:
+        logger.warning(f"Quarantined {sum(quarantined.values())} {table_name} rows from range {task['range_index']}")
+    return rows
+
+
+def run_merge_task(engine: Engine, task: Dict[str, Any]) -> int:
+    table_name, year = task['table_name'], task['records_year']
+    storage_table = storage_table_name(table_name, load_table_encoding(engine, table_name))
+    rows = 0
+    with engine.begin() as connection:
+        # the member replaces the rows an earlier load of it wrote for the year
+        connection.execute(text(f'DELETE FROM "{storage_table}" WHERE records_year = :year'), {'year': year})
+        if task['ranges']:
+            column_list = ', '.join(f'"{column}"' for column in read_columns(task['file_path']) + ['records_year'])
+        for index in range(task['ranges']):
+            stage_table = stage_table_name(table_name, task['member_id'], index)
+            rows += connection.execute(text(
+                f'INSERT INTO "{storage_table}" ({column_list}) SELECT {column_list} FROM "{stage_table}"')).rowcount
+            connection.execute(text(f'DROP TABLE "{stage_table}"'))
+        store_table_stats(connection, table_name, year, merge_stats_parts(connection, task['member_id']))
+        _complete_task(connection, task, rows)
+        connection.execute(text(f"""
+            UPDATE {QUEUE_MEMBER_TABLE} SET state = 'merged', rows_loaded = :rows, finished_at = now() WHERE id = :id
+        """), {'rows': rows, 'id': task['member_id']})
+        upsert_member_checksum(connection, year, task['zip_file'], task['member'], (task['crc32'], task['file_size']))
+
+    publish_staged_parts(table_name, year, snapshot_staging(task['member_id']), task['ranges'])
+    remove_stale_parts(table_name, year, task['ranges'])
+    try:
+        os.remove(task['file_path'])
+    except OSError as e:
+        logger.warning(f"Could not remove {task['file_path']}: {e}")
+    try:
+        # the run's directory, once its last member has merged
+        os.rmdir(os.path.dirname(task['file_path']))
+    except OSError:
+        pass
+    return rows
+
+"""
+Record a failed attempt: the task is retried after a backoff, or marked failed (with its
+member) after queue_max_attempts attempts. Returns the task's new state, or None if the
+lease had already been lost.
+"""
+def fail_task(engine: Engine, task: Dict[str, Any], error: str) -> Optional[str]:
+    settings = config.get_settings()
+    with engine.begin() as connection:
+        state = connection.execute(text(f"""
+            UPDATE {QUEUE_TASK_TABLE}
+            SET state = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+                available_at = now() + make_interval(secs => :backoff * power(2, attempts - 1)),
+                lease_token = NULL, lease_expires_at = NULL, last_error = :error, updated_at = now()
+            WHERE id = :id AND lease_token = :token
+            RETURNING state
+        """), {'max_attempts': settings.queue_max_attempts, 'backoff': settings.queue_retry_backoff_seconds,
+               'error': error[:2000], 'id': task['id'], 'token': task['lease_token']}).scalar_one_or_none()
+        if state == 'failed':
+            connection.execute(text(f"""
+                UPDATE {QUEUE_MEMBER_TABLE} SET state = 'failed', finished_at = now() WHERE id = :id AND state = 'loading'
+            """), {'id': task['member_id']})
+    return state
+
+"""
+Renews a task's lease every third of queue_lease_seconds while the task runs (a context
+manager around the task). Stops once the lease is lost; the task then fails to complete.
+"""
+class LeaseRenewer(threading.Thread):
+
+    def __init__(self, engine: Engine, task: Dict[str, Any]):
+        super().__init__(name=f"lease-{task['id']}", daemon=True)
+        self.engine = engine
+        self.task = task
+        self._stop_renewing = threading.Event()
+
+    def run(self):
+        lease_seconds = config.get_settings().queue_lease_seconds
+        while not self._stop_renewing.wait(lease_seconds / 3):
+            try:
+                with self.engine.begin() as connection:
+                    renewed = connection.execute(text(f"""
+                        UPDATE {QUEUE_TASK_TABLE} SET lease_expires_at = now() + make_interval(secs => :lease)
+                        WHERE id = :id AND lease_token = :token AND state = 'running'
+                    """), {'lease': lease_seconds, 'id': self.task['id'],
+                           'token': self.task['lease_token']}).rowcount
+            except Exception as e:
+                logger.warning(f"Could not renew the lease on task {self.task['id']}: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Lost the lease on task {self.task['id']}")
+                return
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop_renewing.set()
+        self.join()
+        return False
+
+
+def run_task(engine: Engine, task: Dict[str, Any]):
+    label = f"{task['member']} ({task['records_year']}) {task['kind']}"
+    if task['kind'] == TASK_RANGE:
+        label += f" {task['range_index'] + 1}/{task['ranges']}"
+    try:
+        with LeaseRenewer(engine, task):
+            if task['kind'] == TASK_MERGE:
+                rows = run_merge_task(engine, task)
+            else:
+                rows = run_range_task(engine, task)
+        logger.info(f"{label}: {rows} rows")
+    except LeaseLost as e:
+        logger.warning(f"{label}: {e}; discarded")
+    except Exception as e:
+        if isinstance(e, EncodingOverflow):
+            # the range has rolled back; its retry writes the widened codes
+            widen_encoded_column(engine, e.dictionary_table)
+        state = fail_task(engine, task, str(e))
+        outcome = 'giving up' if state == 'failed' else 'will retry'
+        logger.error(f"{label} failed on attempt {task['attempts']}: {e} ({outcome})")
+
+
+def _has_open_tasks(engine: Engine) -> bool:
+    with engine.connect() as connection:
+        return connection.execute(text(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {QUEUE_TASK_TABLE} AS t JOIN {QUEUE_MEMBER_TABLE} AS m ON m.id = t.member_id
+                WHERE m.state = 'loading' AND t.state IN ('pending', 'running'))
+        """)).scalar_one()
+
+"""
+Worker loop: claim and run tasks until stopped or, with exit_when_idle, until no member is
+left loading. Returns the number of tasks run.
+"""
+def run_worker(worker_id: Optional[str] = None, exit_when_idle: bool = False) -> int:
+    engine = config.get_engine()
+    ensure_queue_tables(engine)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker_id} started")
+    tasks_run = 0
+    while True:
+        task = claim_task(engine, worker_id)
+        if task is None:
+            if exit_when_idle and not _has_open_tasks(engine):
+                logger.info(f"Worker {worker_id} idle after {tasks_run} tasks; exiting")
+                return tasks_run
+            time.sleep(config.get_settings().queue_poll_seconds)
+            continue
+        run_task(engine, task)
+        tasks_run += 1
+
+
+def _worker_process(config_file: Optional[str], exit_when_idle: bool):
+    config.configure_logging(config.configure(config_file))
+    run_worker(exit_when_idle=exit_when_idle)
+
+"""
+Run `processes` workers on this host, each in its own (spawned) process. Returns the number
+of processes that exited with an error.
+"""
+def run_local_workers(processes: int, config_file: Optional[str] = None, exit_when_idle: bool = False) -> int:
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=_worker_process, args=(config_file, exit_when_idle), name=f"ingest-worker-{index}")
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(1 for worker in workers if worker.exitcode != 0)
+
+"""
+Coordinator: wait until no member of the run is loading. Returns (merged, failed) member counts.
+"""
+def wait_for_run(engine: Engine, run_id: str) -> Tuple[int, int]:
+    last = None
+    while True:
+        with engine.connect() as connection:
+            counts = Counter(dict(connection.execute(text(
+                f"SELECT state, count(*) FROM {QUEUE_MEMBER_TABLE} WHERE run_id = :run GROUP BY state"),
+                {'run': run_id}).all()))
+        if counts != last:
+            logger.info(f"Run {run_id}: " + ', '.join(f"{state}: {count}" for state, count in sorted(counts.items())))
+            last = counts
+        if not counts['loading']:
+            return counts['merged'], counts['failed']
+        time.sleep(config.get_settings().queue_poll_seconds)
+
+"""
+Log the members of the most recent runs with their task progress.
+"""
+def queue_status(engine: Engine, runs: int = 5):
+    ensure_queue_tables(engine)
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT m.run_id, m.records_year, m.member, m.state, m.rows_loaded,
+                   count(t.id) FILTER (WHERE t.kind = '{TASK_RANGE}' AND t.state = 'done') AS ranges_done,
+                   m.ranges,
+                   count(t.id) FILTER (WHERE t.state = 'running') AS running,
+                   max(t.attempts) AS attempts,
+                   max(t.last_error) AS last_error
+            FROM {QUEUE_MEMBER_TABLE} AS m LEFT JOIN {QUEUE_TASK_TABLE} AS t ON t.member_id = m.id
+            WHERE m.run_id IN (
+                SELECT run_id FROM {QUEUE_MEMBER_TABLE} GROUP BY run_id ORDER BY max(created_at) DESC LIMIT :runs)
+            GROUP BY m.id
+            ORDER BY m.run_id, m.records_year, m.member
+        """), {'runs': runs}).mappings().all()
+    for row in rows:
+        line = (f"{row['run_id']}\t{row['records_year']}\t{row['member']}\t{row['state']}\t"
+                f"ranges {row['ranges_done']}/{row['ranges']}\trunning {row['running']}\trows {row['rows_loaded'] or 0}")
+        if row['last_error']:
+            line += f"\tattempts {row['attempts']}\tlast error: {row['last_error']}"
+        print(line)
@@ -0,0 +1,43 @@
+"""
+Definitions shared by the ingest (ingest/) and the web app (web/dbqueryapp/).
+
+The ingest writes tables and indexes that the web app reads, so both import their
+names from here rather than keeping copies in sync. The module uses the standard
+library only; each side puts the repository root on sys.path to import it (see
+ingest/shared_definitions.py and web/dbqueryapp/__init__.py).
+
+Definitions:
+- DATA_GENERATION_TABLE: The single-row counter bumped after every load; the web app keys its result cache on it.
+- COLUMN_STATS_TABLE: The per-column statistics of each loaded table and records year.
+- TABLE_KEYS_TABLE: The codebook key columns of each table.
+- PREDEFINED_QUERY_SUMMARY_TABLES: Maps predefined query keys to the materialized views that precompute them.
+- SEARCH_FIELDS, SEARCH_TEXT_CONFIG: The owner-name and address columns searched by the web app and indexed by the ingest.
+"""
+
+# Bumped at the end of each successful load (see ingest/data_generation.py) and read by
+# web/dbqueryapp/result_cache.py.
+DATA_GENERATION_TABLE = 'ingest_data_generation'
+
+# Stored while loading (see ingest/column_stats.py) and served by web/dbqueryapp/table_stats.py.
+COLUMN_STATS_TABLE = 'ingest_column_stats'
+
+# Recorded on every load (see ingest/table_keys.py) and read by web/dbqueryapp/schema_catalog.py.
+TABLE_KEYS_TABLE = 'ingest_table_keys'
+
+# Materialized views refreshed at the end of each ingest run (see ingest/summary_tables.py,
+# which defines their queries).
+PREDEFINED_QUERY_SUMMARY_TABLES = {
+    'get_avg_bldg_and_land_val_by_state_class': 'summary_avg_bldg_and_land_val_by_state_class',
+    'get_first_100_unique_owners_for_residential': 'summary_first_100_unique_owners_for_residential',
+}
+
+# Columns searched by the owner/address search endpoint, as (field label, table, column).
+# Each has trigram and full-text indexes built by ingest (see ingest/search_indexes.py) with
+# the SEARCH_TEXT_CONFIG text search configuration, which the search must use as well.
+SEARCH_FIELDS = (
+    ('owner_name', 'owners', 'name'),
+    ('previous_owner_name', 'ownership_history', 'name'),
+    ('mailing_name', 'real_acct', 'mailto'),
+    ('site_address', 'real_acct', 'site_addr_1'),
+)
+SEARCH_TEXT_CONFIG = 'simple'  # no stemming or stop words: names and addresses are not prose
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The definitions shared with the ingest live in shared/definitions.py at the repository root.
+_REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPOSITORY_ROOT not in sys.path:
+    sys.path.append(_REPOSITORY_ROOT)
@@ -1,3 +1,37 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
+
+from .models import QueryTelemetry
+from .telemetry import fingerprint_percentiles
+
+TELEMETRY_STATS_WINDOWS = {'1': 1, '7': 7, '30': 30}
+
+
+@admin.register(QueryTelemetry)
+class QueryTelemetryAdmin(admin.ModelAdmin):
+    """Raw telemetry rows, with per-fingerprint latency percentiles above the list."""
+    list_display = ('created_at', 'source', 'backend', 'fingerprint', 'total_ms', 'execute_ms', 'row_count', 'bytes_serialized', 'error')
+    list_filter = ('source', 'backend')
+    search_fields = ('fingerprint', 'normalized_sql')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
-# Register your models here.
+    def changelist_view(self, request, extra_context=None):
+        # ?days= is consumed here so the changelist does not treat it as a field lookup.
+        request.GET = request.GET.copy()
+        days = TELEMETRY_STATS_WINDOWS.get(request.GET.pop('days', ['7'])[-1], 7)
+        extra_context = {
+            **(extra_context or {}),
+            'stats_days': days,
+            'stats_windows': sorted(TELEMETRY_STATS_WINDOWS.values()),
+            'fingerprint_stats': fingerprint_percentiles(since=timezone.now() - timedelta(days=days)),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
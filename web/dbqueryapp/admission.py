@@ -0,0 +1,198 @@
+"""
+Admission control for query execution.
+
+`controller.admit(owner, priority)` bounds how many queries this worker process
+runs at once, both in total (`QUERY_ADMISSION_MAX_CONCURRENT`) and per owner
+(`QUERY_ADMISSION_MAX_PER_OWNER`, an owner being a user or session). Requests
+over the limits wait in a priority queue for at most `QUERY_ADMISSION_TIMEOUT`
+seconds; predefined queries are admitted ahead of ad-hoc SQL. A request that
+times out, or finds the queue full, raises `AdmissionRejected`, which
+`errors.map_exception_to_response` turns into a 429 (the owner's own limit) or
+503 (server busy).
+
+Limits are per process: size `QUERY_ADMISSION_MAX_CONCURRENT` as the database's
+query budget divided by the number of WSGI worker processes.
+
+Provided helpers:
+- `PRIORITY_PREDEFINED` / `PRIORITY_ADHOC` — lower values are admitted first.
+- `AdmissionController` — `admit()` context manager, `acquire()`/`release()` for
+  streaming responses that hold a slot beyond the view, and `stats()`.
+- `controller` — the process-wide controller used by the views.
+"""
+import bisect
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger("DjangoApp Admission")
+
+QUERY_ADMISSION_ENABLED = getattr(settings, 'QUERY_ADMISSION_ENABLED', True)
+QUERY_ADMISSION_MAX_CONCURRENT = getattr(settings, 'QUERY_ADMISSION_MAX_CONCURRENT', 8)
+QUERY_ADMISSION_MAX_PER_OWNER = getattr(settings, 'QUERY_ADMISSION_MAX_PER_OWNER', 2)
+QUERY_ADMISSION_MAX_QUEUE = getattr(settings, 'QUERY_ADMISSION_MAX_QUEUE', 50)
+QUERY_ADMISSION_TIMEOUT = getattr(settings, 'QUERY_ADMISSION_TIMEOUT', 10.0)
+
+PRIORITY_PREDEFINED = 0
+PRIORITY_ADHOC = 1
+PRIORITY_NAMES = {PRIORITY_PREDEFINED: 'predefined', PRIORITY_ADHOC: 'adhoc'}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a query cannot be admitted; `owner_limited` is True when the owner's own cap was the blocker."""
+
+    def __init__(self, message: str, owner_limited: bool = False, retry_after: int = 1):
+        super().__init__(message)
+        self.owner_limited = owner_limited
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global and per-owner concurrency caps with a priority-ordered, time-limited wait queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = QUERY_ADMISSION_MAX_CONCURRENT,
+        max_per_owner: int = QUERY_ADMISSION_MAX_PER_OWNER,
+        max_queue: int = QUERY_ADMISSION_MAX_QUEUE,
+        timeout: float = QUERY_ADMISSION_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_owner = max_per_owner
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._running = 0
+        self._per_owner: Counter = Counter()
+        self._waiting: List[tuple] = []  # sorted (priority, sequence, owner)
+        self._sequence = itertools.count()
+        self._admitted: Counter = Counter()
+        self._rejected: Counter = Counter()
+        self._wait_ms: Counter = Counter()
+        self._max_wait_ms = 0.0
+
+    def _owner_has_room(self, owner: Optional[str]) -> bool:
+        return owner is None or self._per_owner[owner] < self.max_per_owner
+
+    def _next_eligible(self) -> Optional[tuple]:
+        """The highest-priority waiter whose owner is under its cap (so one busy owner cannot block others)."""
+        for entry in self._waiting:
+            if self._owner_has_room(entry[2]):
+                return entry
+        return None
+
+    def acquire(self, owner: Optional[str] = None, priority: int = PRIORITY_ADHOC, timeout: Optional[float] = None) -> float:
+        """Block until a slot is available and return the wait in milliseconds.
+
+        Raises:
+            AdmissionRejected: if the queue is full or `timeout` (default `self.timeout`) elapses.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            started = self._clock()
+            if not self._waiting and self._running < self.max_concurrent and self._owner_has_room(owner):
+                return self._admit(owner, priority, started)
+
+            if len(self._waiting) >= self.max_queue:
+                self._rejected['queue_full'] += 1
+                raise AdmissionRejected("Too many queries are queued; please try again shortly.")
+
+            entry = (priority, next(self._sequence), owner)
+            bisect.insort(self._waiting, entry)
+            deadline = started + timeout
+            try:
+                while True:
+                    if self._running < self.max_concurrent and self._next_eligible() is entry:
+                        self._waiting.remove(entry)
+                        return self._admit(owner, priority, started)
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._waiting.remove(entry)
+                        owner_limited = not self._owner_has_room(owner)
+                        self._rejected['owner_timeout' if owner_limited else 'timeout'] += 1
+                        # Our departure may make a waiter behind us eligible.
+                        self._cond.notify_all()
+                        if owner_limited:
+                            raise AdmissionRejected("You already have the maximum number of queries running.",
+                                                    owner_limited=True, retry_after=max(1, int(timeout)))
+                        raise AdmissionRejected("The server is busy running other queries; please try again shortly.",
+                                                retry_after=max(1, int(timeout)))
+                    self._cond.wait(remaining)
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    self._cond.notify_all()
+                raise
+
+    def _admit(self, owner: Optional[str], priority: int, started: float) -> float:
+        self._running += 1
+        if owner is not None:
+            self._per_owner[owner] += 1
+        waited_ms = (self._clock() - started) * 1000
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self._admitted[name] += 1
+        self._wait_ms[name] += waited_ms
+        self._max_wait_ms = max(self._max_wait_ms, waited_ms)
+        return waited_ms
+
+    def release(self, owner: Optional[str] = None) -> None:
+        with self._cond:
+            self._running -= 1
+            if owner is not None:
+                self._per_owner[owner] -= 1
+                if self._per_owner[owner] <= 0:
+                    del self._per_owner[owner]
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, owner: Optional[str] = None, priority: int = PRIORITY_ADHOC, timeout: Optional[float] = None):
+        self.acquire(owner, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(owner)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current occupancy and cumulative admission counters for this process."""
+        with self._cond:
+            queued = Counter(PRIORITY_NAMES.get(entry[0], str(entry[0])) for entry in self._waiting)
+            return {
+                'running': self._running,
+                'queued': len(self._waiting),
+                'queued_by_priority': dict(queued),
+                'max_concurrent': self.max_concurrent,
+                'max_per_owner': self.max_per_owner,
+                'admitted': dict(self._admitted),
+                'rejected': dict(self._rejected),
+                'avg_wait_ms': {
+                    name: self._wait_ms[name] / count for name, count in self._admitted.items() if count
+                },
+                'max_wait_ms': self._max_wait_ms,
+            }
+
+
+class _NoAdmission:
+    """Stand-in used when admission control is disabled."""
+
+    def acquire(self, owner=None, priority=PRIORITY_ADHOC, timeout=None) -> float:
+        return 0.0
+
+    def release(self, owner=None) -> None:
+        pass
+
+    @contextmanager
+    def admit(self, owner=None, priority=PRIORITY_ADHOC, timeout=None):
+        yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': False}
+
+
+controller = AdmissionController() if QUERY_ADMISSION_ENABLED else _NoAdmission()
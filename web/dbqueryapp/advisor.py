@@ -0,0 +1,339 @@
+"""
+Offline index advisor driven by recorded query telemetry.
+
+Reads the per-fingerprint history written by `telemetry` and, for each
+normalized statement, uses sqlglot's scope tree to find the columns each table
+is filtered, joined and grouped on. Candidates are weighted by how often the
+fingerprint ran times its average latency, so a frequent slow query outweighs
+a one-off. Candidates already covered by an existing index (same leading
+columns) are dropped.
+
+Each remaining candidate can be checked against the recorded statements:
+- with the `hypopg` extension, by comparing `EXPLAIN (GENERIC_PLAN)` costs
+  before and after creating a hypothetical index (nothing is built);
+- otherwise against a sample database, by creating the index inside a
+  transaction that is rolled back, timing parameter-free statements with
+  `EXPLAIN ANALYZE` and comparing generic-plan costs for the others.
+Each statement is compared only with itself, in a single unit, and the
+candidate's improvement aggregates the per-statement ratios, so planner cost
+units and milliseconds are never added together.
+
+Run it with `manage.py suggest_indexes`.
+
+Provided helpers:
+- `column_usage(sql)` — table -> {'eq', 'range', 'join', 'group'} column lists.
+- `build_candidates(stats)` — `IndexCandidate`s from per-fingerprint stats rows.
+- `load_fingerprint_stats(since=None)` — executions and total latency per fingerprint.
+- `drop_covered(candidates, existing)` / `existing_indexes(cursor, tables)`.
+- `HypoPGValidator` / `SampleDatabaseValidator` — measure a candidate's effect.
+- `materialization_candidates(stats)` — heavy GROUP BY fingerprints with no filters.
+"""
+import json
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Max, Sum
+from sqlglot import exp, parse_one
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.scope import traverse_scope
+
+logger = logging.getLogger("DjangoApp Advisor")
+
+ADVISOR_MAX_INDEX_COLUMNS = getattr(settings, 'ADVISOR_MAX_INDEX_COLUMNS', 3)
+ADVISOR_STATEMENT_TIMEOUT_MS = getattr(settings, 'ADVISOR_STATEMENT_TIMEOUT_MS', 60000)
+
+USAGE_KINDS = ('eq', 'range', 'join', 'group')
+
+
+_COMPARISONS = (exp.EQ, exp.In, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between)
+
+
+def _left_anchored(node: exp.Expression) -> bool:
+    """True for `col LIKE 'abc%'`: a literal pattern with a fixed prefix, which a B-tree can range-scan.
+
+    ILIKE, placeholders and patterns starting with a wildcard cannot use the index.
+    """
+    pattern = node.expression
+    return (isinstance(node, exp.Like) and isinstance(pattern, exp.Literal) and pattern.is_string
+            and pattern.this[:1] not in ('', '%', '_'))
+
+
+def _clause_kind(column: exp.Column, scope_expression: exp.Expression) -> Optional[str]:
+    """Classify where a column appears within its own scope, or None if it is not index-relevant."""
+    comparison = None
+    if column.find_ancestor(exp.Select) is not scope_expression:
+        return None  # correlated reference from a nested query
+    child, node = column, column.parent
+    while node is not None and node is not scope_expression:
+        if comparison is None and isinstance(node, (exp.Like, exp.ILike)):
+            if not _left_anchored(node):
+                return None
+            comparison = node
+        if comparison is None and isinstance(node, _COMPARISONS):
+            comparison = node
+        if isinstance(node, exp.Where):
+            return 'eq' if isinstance(comparison, (exp.EQ, exp.In)) else 'range'
+        if isinstance(node, exp.Join):
+            return 'join' if child is node.args.get('on') else None
+        if isinstance(node, exp.Group):
+            return 'group'
+        if isinstance(node, (exp.Having, exp.Order)):
+            return None
+        child, node = node, node.parent
+    return None
+
+
+def column_usage(sql: str) -> Dict[str, Dict[str, List[str]]]:
+    """Return, per base table, the columns used in equality/range filters, join conditions and GROUP BY.
+
+    Unqualified columns are attributed only when the scope reads a single table.
+    """
+    usage: Dict[str, Dict[str, List[str]]] = {}
+    parsed = parse_one(sql, read='postgres')
+    for scope in traverse_scope(parsed):
+        tables = {alias: source.name for alias, source in scope.sources.items() if isinstance(source, exp.Table)}
+        for column in scope.columns:
+            kind = _clause_kind(column, scope.expression)
+            if kind is None:
+                continue
+            if column.table:
+                table = tables.get(column.table)
+            else:
+                table = next(iter(tables.values())) if len(tables) == 1 else None
+            if table is None:
+                continue
+            columns = usage.setdefault(table, {k: [] for k in USAGE_KINDS})[kind]
+            if column.name not in columns:
+                columns.append(column.name)
+    return usage
+
+
+class IndexCandidate:
+    """A proposed B-tree index, the fingerprints that would use it and its measured effect."""
+
+    __slots__ = ('table', 'columns', 'weight', 'statements', 'measurements', 'method')
+
+    def __init__(self, table: str, columns: Sequence[str]):
+        self.table = table
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.weight = 0.0
+        self.statements: Dict[str, str] = {}  # fingerprint -> normalized SQL
+        # fingerprint -> (unit, without index, with index); each statement in one unit ('cost' or 'ms')
+        self.measurements: Dict[str, Tuple[str, float, float]] = {}
+        self.method: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.columns)}"[:63]
+
+    def create_sql(self, concurrently: bool = False) -> str:
+        columns = ', '.join(self.columns)
+        if concurrently:
+            return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} ON {self.table} ({columns})"
+        return f"CREATE INDEX {self.name} ON {self.table} ({columns})"
+
+    @property
+    def improvement(self) -> Optional[float]:
+        """Fractional reduction over the measured statements (0.4 = 40% cheaper).
+
+        One minus the geometric mean of each statement's with/without ratio, so
+        every statement counts the same whatever its unit or magnitude.
+        """
+        ratios = [max(after, 1e-9) / before for _, before, after in self.measurements.values() if before > 0]
+        if not ratios:
+            return None
+        return 1 - math.exp(sum(math.log(ratio) for ratio in ratios) / len(ratios))
+
+
+def _index_columns(table_usage: Dict[str, List[str]]) -> List[Tuple[str, ...]]:
+    """Candidate column lists for one table in one statement: equality columns first, then join, then range."""
+    leading = []
+    for name in table_usage['eq'] + table_usage['join'] + table_usage['range']:
+        if name not in leading:
+            leading.append(name)
+    candidates = []
+    if leading:
+        candidates.append(tuple(leading[:ADVISOR_MAX_INDEX_COLUMNS]))
+    elif table_usage['group']:
+        candidates.append(tuple(table_usage['group'][:ADVISOR_MAX_INDEX_COLUMNS]))
+    return candidates
+
+
+def build_candidates(stats: Iterable[Dict[str, Any]]) -> List[IndexCandidate]:
+    """Build index candidates weighted by executions x average latency (the fingerprint's total ms).
+
+    `stats` rows need `fingerprint`, `normalized_sql` and `total_ms`.
+    """
+    candidates: Dict[Tuple[str, Tuple[str, ...]], IndexCandidate] = {}
+    for row in stats:
+        try:
+            usage = column_usage(row['normalized_sql'])
+        except (SqlglotError, ValueError) as e:
+            logger.debug("Skipping unparseable fingerprint %s: %s", row['fingerprint'], e)
+            continue
+        for table, table_usage in usage.items():
+            for columns in _index_columns(table_usage):
+                candidate = candidates.setdefault((table, columns), IndexCandidate(table, columns))
+                candidate.weight += row['total_ms'] or 0.0
+                candidate.statements[row['fingerprint']] = row['normalized_sql']
+    return sorted(candidates.values(), key=lambda c: c.weight, reverse=True)
+
+
+def materialization_candidates(stats: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fingerprints that aggregate without any filter or join: summary-table (materialized view) candidates."""
+    heavy = []
+    for row in stats:
+        try:
+            usage = column_usage(row['normalized_sql'])
+        except (SqlglotError, ValueError):
+            continue
+        if usage and all(u['group'] and not (u['eq'] or u['range'] or u['join']) for u in usage.values()):
+            heavy.append(row)
+    return sorted(heavy, key=lambda r: r['total_ms'] or 0.0, reverse=True)
+
+
+def load_fingerprint_stats(since=None) -> List[Dict[str, Any]]:
+    """Executions and summed latency per fingerprint from the telemetry table."""
+    from .models import QueryTelemetry
+    from .telemetry import TELEMETRY_DATABASE
+
+    queryset = QueryTelemetry.objects.using(TELEMETRY_DATABASE).filter(error='')
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    return list(
+        queryset.values('fingerprint')
+        .annotate(executions=Count('id'), total_ms=Sum('total_ms'), normalized_sql=Max('normalized_sql'))
+        .order_by('-total_ms')
+    )
+
+
+def existing_indexes(cursor, tables: Sequence[str]) -> Dict[str, List[Tuple[str, ...]]]:
+    """Column lists of the existing indexes on `tables`, in index key order."""
+    cursor.execute("""
+        SELECT t.relname, array_agg(a.attname ORDER BY k.ord)
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord) ON true
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE t.relname = ANY(%s) AND pg_table_is_visible(t.oid)
+        GROUP BY i.indexrelid, t.relname
+    """, [list(tables)])
+    indexes: Dict[str, List[Tuple[str, ...]]] = {}
+    for table, columns in cursor.fetchall():
+        indexes.setdefault(table, []).append(tuple(columns))
+    return indexes
+
+
+def drop_covered(candidates: Iterable[IndexCandidate], existing: Dict[str, List[Tuple[str, ...]]]) -> List[IndexCandidate]:
+    """Remove candidates whose columns are a leading prefix of an existing index."""
+    kept = []
+    for candidate in candidates:
+        covered = any(index[:len(candidate.columns)] == candidate.columns for index in existing.get(candidate.table, []))
+        if not covered:
+            kept.append(candidate)
+    return kept
+
+
+def to_generic_sql(normalized_sql: str) -> Tuple[str, bool]:
+    """Number the fingerprint's placeholders ($1, $2, ...) for `EXPLAIN (GENERIC_PLAN)`.
+
+    Returns (sql, has_parameters).
+    """
+    count = 0
+
+    def number(node):
+        nonlocal count
+        if isinstance(node, exp.Placeholder):
+            count += 1
+            return exp.Parameter(this=exp.Literal.number(count))
+        return node
+
+    sql = parse_one(normalized_sql, read='postgres').transform(number).sql(dialect='postgres')
+    return sql, count > 0
+
+
+def _plan(cursor, options: str, sql: str) -> Dict[str, Any]:
+    cursor.execute(f"EXPLAIN ({options}, FORMAT JSON) {sql}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def explain_cost(cursor, sql: str) -> float:
+    """Planner total cost of a (possibly parameterized) statement."""
+    return _plan(cursor, 'GENERIC_PLAN', sql)['Plan']['Total Cost']
+
+
+def explain_analyze_ms(cursor, sql: str) -> float:
+    """Measured execution time of a parameter-free statement."""
+    return _plan(cursor, 'ANALYZE', sql)['Execution Time']
+
+
+class HypoPGValidator:
+    """Compare generic-plan costs with and without a hypothetical index (requires the hypopg extension)."""
+
+    method = 'hypopg'
+
+    def __init__(self, using: str):
+        self.using = using
+
+    @staticmethod
+    def available(using: str) -> bool:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+            return cursor.fetchone() is not None
+
+    def _costs(self, cursor, statements: Dict[str, str]) -> Dict[str, float]:
+        return {fingerprint: explain_cost(cursor, to_generic_sql(sql)[0]) for fingerprint, sql in statements.items()}
+
+    def evaluate(self, candidate: IndexCandidate) -> None:
+        with connections[self.using].cursor() as cursor:
+            before = self._costs(cursor, candidate.statements)
+            cursor.execute("SELECT indexrelid FROM hypopg_create_index(%s)", [candidate.create_sql()])
+            try:
+                after = self._costs(cursor, candidate.statements)
+            finally:
+                cursor.execute("SELECT hypopg_reset()")
+        candidate.measurements = {fp: ('cost', before[fp], after[fp]) for fp in candidate.statements}
+        candidate.method = self.method
+
+
+class SampleDatabaseValidator:
+    """Build the index for real on a sample database inside a transaction that is always rolled back.
+
+    Parameter-free statements are timed with EXPLAIN ANALYZE; parameterized
+    ones are compared on generic-plan cost. The sample database user needs
+    CREATE privileges on the tables.
+    """
+
+    method = 'sample'
+
+    def __init__(self, using: str, statement_timeout_ms: int = ADVISOR_STATEMENT_TIMEOUT_MS):
+        self.using = using
+        self.statement_timeout_ms = statement_timeout_ms
+
+    def _measure(self, cursor, statements: Dict[str, str]) -> Dict[str, Tuple[str, float]]:
+        """fingerprint -> (unit, value); a statement is always measured in the same unit."""
+        measured = {}
+        for fingerprint, sql in statements.items():
+            generic_sql, has_parameters = to_generic_sql(sql)
+            if has_parameters:
+                measured[fingerprint] = ('cost', explain_cost(cursor, generic_sql))
+            else:
+                measured[fingerprint] = ('ms', explain_analyze_ms(cursor, generic_sql))
+        return measured
+
+    def evaluate(self, candidate: IndexCandidate) -> None:
+        with transaction.atomic(using=self.using):
+            with connections[self.using].cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(self.statement_timeout_ms)])
+                before = self._measure(cursor, candidate.statements)
+                cursor.execute(candidate.create_sql())
+                after = self._measure(cursor, candidate.statements)
+            transaction.set_rollback(True, using=self.using)
+        candidate.measurements = {fp: (unit, value, after[fp][1]) for fp, (unit, value) in before.items()}
+        candidate.method = self.method
@@ -0,0 +1,184 @@
+"""
+Embedded DuckDB analytical backend over the Parquet snapshots written by ingest.
+
+Ingest writes every loaded table to `<ANALYTICS_PARQUET_DIR>/<table>/records_year=<year>/*.parquet`
+(see ingest/parquet_snapshots.py). This module exposes each table directory as
+a DuckDB view of the same name, so validated user SQL can run in-process,
+vectorized and multi-threaded, without loading PostgreSQL.
+
+User SQL is validated against the PostgreSQL grammar by `validate_sql_with_sqlglot`
+and then transpiled to DuckDB's dialect. The DuckDB database is in-memory and
+locked down: file access is limited to the snapshot directory and the
+configuration cannot be changed by queries.
+
+Provided helpers:
+- `analytics_available()` — True when duckdb is installed and the snapshot directory exists.
+- `transpile_to_duckdb(sql)` — PostgreSQL SQL (string or parsed expression) to DuckDB SQL.
+- `execute_analytics(sql)` — run a query and return a `QueryResult`.
+- `open_analytics_cursor(sql)` / `analytics_type_codes(description)` — for streaming exports.
+"""
+import glob
+import logging
+import os
+import re
+import threading
+from typing import Any, List, Optional, Sequence, Union
+
+from django.conf import settings
+from sqlglot import transpile
+from sqlglot.expressions import Expression
+
+from .exporters import (
+    PG_BOOL, PG_BYTEA, PG_DATE, PG_FLOAT4, PG_FLOAT8, PG_INT2, PG_INT4, PG_INT8,
+    PG_JSON, PG_NUMERIC, PG_TEXT, PG_TIME, PG_TIMESTAMP, PG_TIMESTAMPTZ, PG_UUID,
+)
+from .results import QueryResult
+
+logger = logging.getLogger("DjangoApp Analytics")
+
+# duckdb is optional; the analytical backend is unavailable without it.
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+ANALYTICS_PARQUET_DIR = getattr(settings, 'ANALYTICS_PARQUET_DIR', None)
+ANALYTICS_THREADS = getattr(settings, 'ANALYTICS_THREADS', None)
+ANALYTICS_MEMORY_LIMIT = getattr(settings, 'ANALYTICS_MEMORY_LIMIT', None)
+
+_TABLE_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# DuckDB type name -> PostgreSQL type OID, so results flow through the same
+# rendering and export code as PostgreSQL results. Unlisted types map to text.
+DUCKDB_TYPE_CODES = {
+    'BOOLEAN': PG_BOOL,
+    'TINYINT': PG_INT2,
+    'SMALLINT': PG_INT2,
+    'INTEGER': PG_INT4,
+    'BIGINT': PG_INT8,
+    'HUGEINT': PG_NUMERIC,
+    'FLOAT': PG_FLOAT4,
+    'DOUBLE': PG_FLOAT8,
+    'DATE': PG_DATE,
+    'TIME': PG_TIME,
+    'TIMESTAMP': PG_TIMESTAMP,
+    'TIMESTAMP WITH TIME ZONE': PG_TIMESTAMPTZ,
+    'UUID': PG_UUID,
+    'BLOB': PG_BYTEA,
+    'JSON': PG_JSON,
+}
+
+_database = None
+_registered_tables = set()
+_database_lock = threading.Lock()
+
+
+def analytics_available() -> bool:
+    return duckdb is not None and bool(ANALYTICS_PARQUET_DIR) and os.path.isdir(ANALYTICS_PARQUET_DIR)
+
+
+def transpile_to_duckdb(sql: Union[str, Expression]) -> str:
+    """Translate PostgreSQL SQL (or an already-parsed expression) to DuckDB SQL."""
+    if isinstance(sql, Expression):
+        return sql.sql(dialect='duckdb')
+    return transpile(sql, read='postgres', write='duckdb')[0]
+
+
+def _snapshot_tables(base_dir: str) -> List[str]:
+    tables = []
+    for name in sorted(os.listdir(base_dir)):
+        if os.path.isdir(os.path.join(base_dir, name)) and _TABLE_NAME_RE.match(name):
+            tables.append(name)
+    return tables
+
+
+def _has_parquet_files(pattern: str) -> bool:
+    # read_parquet fails when its glob matches nothing, e.g. a table whose only load was aborted
+    return next(glob.iglob(pattern), None) is not None
+
+
+def _connect():
+    base_dir = os.path.abspath(ANALYTICS_PARQUET_DIR)
+    config = {}
+    if ANALYTICS_THREADS:
+        config['threads'] = ANALYTICS_THREADS
+    if ANALYTICS_MEMORY_LIMIT:
+        config['memory_limit'] = ANALYTICS_MEMORY_LIMIT
+    database = duckdb.connect(':memory:', config=config)
+    database.execute("SET allowed_directories = $dirs", {'dirs': [base_dir + os.sep]})
+    database.execute("SET enable_external_access = false")
+    database.execute("SET lock_configuration = true")
+    return database
+
+
+def _get_database():
+    """
+    Return the process-wide DuckDB database, registering views for new snapshot tables.
+
+    A table directory without Parquet files yet is skipped until it has some, and a table
+    whose view cannot be created is logged and skipped, so it cannot fail queries on the others.
+    """
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = _connect()
+            _registered_tables.clear()
+
+        base_dir = os.path.abspath(ANALYTICS_PARQUET_DIR)
+        for table in _snapshot_tables(base_dir):
+            if table in _registered_tables:
+                continue
+            # The glob is evaluated per query, so re-ingested years are picked up without re-registering.
+            pattern = os.path.join(base_dir, table, '*', '*.parquet')
+            if not _has_parquet_files(pattern):
+                continue
+            quoted_pattern = pattern.replace("'", "''")
+            try:
+                _database.execute(
+                    f"CREATE OR REPLACE VIEW \"{table}\" AS "
+                    f"SELECT * FROM read_parquet('{quoted_pattern}', hive_partitioning = true, union_by_name = true)"
+                )
+            except duckdb.Error as e:
+                logger.warning("Skipping analytics view for %s: %s", table, e)
+                continue
+            _registered_tables.add(table)
+            logger.debug("Registered analytics view for %s", table)
+        return _database
+
+
+def analytics_type_codes(description: Optional[Sequence[Any]]) -> List[int]:
+    """Map a DuckDB cursor description to PostgreSQL type OIDs."""
+    codes = []
+    for column in description or []:
+        type_name = str(column[1]).upper()
+        if type_name.startswith('DECIMAL'):
+            codes.append(PG_NUMERIC)
+        else:
+            codes.append(DUCKDB_TYPE_CODES.get(type_name, PG_TEXT))
+    return codes
+
+
+def open_analytics_cursor(sql: Union[str, Expression]):
+    """Execute validated PostgreSQL SQL on DuckDB and return the open cursor (caller closes it)."""
+    # Each cursor is its own connection to the shared database, so concurrent requests do not interfere.
+    cursor = _get_database().cursor()
+    try:
+        cursor.execute(transpile_to_duckdb(sql))
+    except Exception:
+        cursor.close()
+        raise
+    return cursor
+
+
+def execute_analytics(sql: Union[str, Expression]) -> QueryResult:
+    """Run validated PostgreSQL SQL on the Parquet snapshots and return the full result."""
+    cursor = open_analytics_cursor(sql)
+    try:
+        description = cursor.description or []
+        return QueryResult(
+            columns=[col[0] for col in description],
+            rows=cursor.fetchall(),
+            type_codes=analytics_type_codes(description),
+        )
+    finally:
+        cursor.close()
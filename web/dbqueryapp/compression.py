@@ -0,0 +1,127 @@
+"""
+On-the-fly compression of streamed exports.
+
+`compress_stream` wraps an exporter's chunk generator and compresses it
+incrementally. Compression runs on a helper thread: the request thread keeps
+fetching rows from the server-side cursor and formatting them (the cursor's
+connection is thread-local, so fetching must stay there) while the previous
+chunks are being compressed. Memory stays bounded by
+`EXPORT_COMPRESSION_QUEUE_SIZE` pending chunks.
+
+Provided helpers:
+- `COMPRESSION_METHODS` — method -> (content type, file extension suffix).
+- `compression_available(method)` — False when the optional backend is missing.
+- `compress_stream(chunks, method, level=None)` — compressed byte chunks.
+
+gzip uses the standard library; zstd requires the optional `zstandard` package.
+"""
+import logging
+import queue
+import threading
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger("DjangoApp Compression")
+
+# zstandard is optional; zstd-compressed exports are unavailable without it.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_COMPRESSION_QUEUE_SIZE = getattr(settings, 'EXPORT_COMPRESSION_QUEUE_SIZE', 4)
+GZIP_LEVEL = getattr(settings, 'EXPORT_GZIP_LEVEL', 6)
+ZSTD_LEVEL = getattr(settings, 'EXPORT_ZSTD_LEVEL', 3)
+
+# method -> (content type, file extension suffix)
+COMPRESSION_METHODS = {
+    'gzip': ('application/gzip', 'gz'),
+    'zstd': ('application/zstd', 'zst'),
+}
+
+_END = object()
+
+
+def compression_available(method: str) -> bool:
+    if method == 'zstd':
+        return zstandard is not None
+    return method in COMPRESSION_METHODS
+
+
+def _new_compressor(method: str, level: Optional[int] = None):
+    """Return an object with `compress(bytes)` and `flush()` for `method`."""
+    if method == 'gzip':
+        # wbits=31 selects the gzip container rather than raw zlib.
+        return zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+    if method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL if level is None else level).compressobj()
+    raise ValueError(f"Unsupported compression method: {method}")
+
+
+def _compress_worker(compressor, inbox: queue.Queue, outbox: queue.Queue) -> None:
+    try:
+        while True:
+            chunk = inbox.get()
+            if chunk is _END:
+                outbox.put(compressor.flush())
+                break
+            data = compressor.compress(chunk)
+            if data:
+                outbox.put(data)
+    except Exception as e:
+        logger.exception("Export compression failed: %s", e)
+        outbox.put(e)
+        # Keep consuming so a producer blocked on a full inbox can reach its _END.
+        while inbox.get() is not _END:
+            pass
+    finally:
+        outbox.put(_END)
+
+
+def compress_stream(chunks: Iterable[bytes], method: str, level: Optional[int] = None) -> Iterator[bytes]:
+    """Compress `chunks` with `method` on a helper thread, yielding compressed output as it is ready."""
+    compressor = _new_compressor(method, level)
+    inbox: queue.Queue = queue.Queue(maxsize=EXPORT_COMPRESSION_QUEUE_SIZE)
+    outbox: queue.Queue = queue.Queue()
+    worker = threading.Thread(
+        target=_compress_worker, args=(compressor, inbox, outbox), name='export-compress', daemon=True,
+    )
+    worker.start()
+
+    def take(block: bool):
+        item = outbox.get(block=block)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    ended = False
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            inbox.put(chunk)
+            # Hand over whatever is already compressed without waiting for the worker.
+            while True:
+                try:
+                    item = take(block=False)
+                except queue.Empty:
+                    break
+                yield item
+
+        inbox.put(_END)
+        while True:
+            item = take(block=True)
+            if item is _END:
+                ended = True
+                break
+            if item:
+                yield item
+    finally:
+        if not ended:
+            # Client went away or the producer failed: let the worker finish and exit.
+            inbox.put(_END)
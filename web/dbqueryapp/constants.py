@@ -3,15 +3,36 @@ This module contains constants used across the DBQueryApp.
 
 Constants:
 - DEFAULT_SQL_QUERIES: A dictionary of predefined, read-only SQL queries for the application.
+- PREDEFINED_QUERY_SUMMARY_TABLES: Maps predefined query keys to the materialized views that precompute them.
+- SEARCH_FIELDS, SEARCH_TEXT_CONFIG: The owner-name and address columns searched by the `search` endpoint.
+- PROFILE_TABLES: The per-account HCAD tables assembled into account profiles by the `account_profiles` endpoint.
+- COLUMN_STATS_TABLE: The ingest table of per-column statistics served by the `table_stats` endpoint.
+- TABLE_KEYS_TABLE: The ingest table of each table's codebook key columns, read by the schema catalog.
+- DATA_GENERATION_TABLE: The ingest's data generation counter, which keys the result caches.
 - DISALLOWED_OPERATIONS: A tuple of SQL operations (e.g., INSERT, UPDATE) that are restricted to ensure read-only query execution.
 - ALLOWED_SQL_KEYWORDS: A tuple of allowed SQL keywords (e.g., SELECT, WITH) to enforce safe query validation.
 
+PREDEFINED_QUERY_SUMMARY_TABLES, SEARCH_FIELDS, SEARCH_TEXT_CONFIG and the ingest table names are
+defined in shared/definitions.py, which the ingest imports as well.
+
 Purpose:
 - DEFAULT_SQL_QUERIES provides a whitelist of safe, pre-approved SQL queries for execution in the application.
 - DISALLOWED_OPERATIONS and ALLOWED_SQL_KEYWORDS are used in SQL validation to ensure that only read-only queries are executed.
 """
 from sqlglot.expressions import Insert, Update, Delete, Drop, Alter, Create, TruncateTable, Merge, Grant, Revoke, Replace
 
+# Names shared with the ingest (see shared/definitions.py). Predefined queries listed in
+# PREDEFINED_QUERY_SUMMARY_TABLES are served from the view; the live SQL below is the
+# fallback when the view has not been created yet.
+from shared.definitions import (
+    COLUMN_STATS_TABLE,
+    DATA_GENERATION_TABLE,
+    PREDEFINED_QUERY_SUMMARY_TABLES,
+    SEARCH_FIELDS,
+    SEARCH_TEXT_CONFIG,
+    TABLE_KEYS_TABLE,
+)
+
 DEFAULT_SQL_QUERIES = {
     'get_first_100_real_acct': """
         SELECT
@@ -51,12 +72,69 @@ DEFAULT_SQL_QUERIES = {
         GROUP BY
           b.acct
     """,
+    # reads the year-over-year deltas precomputed by ingest (see ingest/value_deltas.py)
+    'get_top_100_appraised_value_increases': """
+        SELECT
+          acct,
+          prior_year,
+          records_year,
+          tot_appr_val_prior,
+          tot_appr_val,
+          tot_appr_val_pct
+        FROM
+          real_acct_value_deltas
+        WHERE
+          records_year = (
+            SELECT
+              MAX(records_year)
+            FROM
+              real_acct_value_deltas
+          )
+          AND tot_appr_val_pct > 20
+        ORDER BY
+          tot_appr_val_pct DESC
+        LIMIT
+          100
+    """,
 }
 
+# Tables fetched for each account by the batch profile endpoint (see profiles.py), in response order.
+# Every table is keyed by acct and records_year; tables that have not been loaded are skipped.
+PROFILE_TABLES = (
+    'real_acct',
+    'owners',
+    'ownership_history',
+    'deeds',
+    'building_res',
+    'building_other',
+    'structural_elem1',
+    'structural_elem2',
+    'fixtures',
+    'exterior',
+    'extra_features',
+    'land',
+    'jur_value',
+)
+
 # Constants for SQL validation
 
 # Disallow DML/DDL keywords to keep execution read-only
 DISALLOWED_OPERATIONS = (Insert, Update, Delete, Drop, Alter, Create, TruncateTable, Merge, Grant, Revoke, Replace)
 
 # Allowed SQL query types
-ALLOWED_SQL_KEYWORDS = ("SELECT", "WITH")
\ No newline at end of file
+ALLOWED_SQL_KEYWORDS = ("SELECT", "WITH")
+# Where a query execution recorded by telemetry came from (QueryTelemetry.source)
+TELEMETRY_SOURCE_CUSTOM = 'custom'
+TELEMETRY_SOURCE_PREDEFINED = 'predefined'
+TELEMETRY_SOURCE_JOB = 'job'
+TELEMETRY_SOURCE_EXPORT = 'export'
+TELEMETRY_SOURCE_SEARCH = 'search'
+TELEMETRY_SOURCE_PROFILE = 'profile'
+TELEMETRY_SOURCE_CHOICES = [
+    (TELEMETRY_SOURCE_CUSTOM, 'Custom SQL'),
+    (TELEMETRY_SOURCE_PREDEFINED, 'Predefined query'),
+    (TELEMETRY_SOURCE_JOB, 'Background job'),
+    (TELEMETRY_SOURCE_EXPORT, 'Export'),
+    (TELEMETRY_SOURCE_SEARCH, 'Search'),
+    (TELEMETRY_SOURCE_PROFILE, 'Account profiles'),
+]
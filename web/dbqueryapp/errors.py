@@ -18,6 +18,8 @@ from django.db import (
 )
 from django.core.exceptions import SuspiciousOperation
 
+from .admission import AdmissionRejected
+
 # Try to import psycopg driver-specific errors when available
 _pg = None
 try:
@@ -25,6 +27,13 @@ try:
 except Exception:
     _pg = None
 
+# duckdb is optional (analytical backend, see analytics.py)
+_duckdb = None
+try:
+    import duckdb as _duckdb
+except Exception:
+    _duckdb = None
+
 logger = logging.getLogger("DjangoApp Errors")
 
 
@@ -33,6 +42,10 @@ def map_exception_to_response(e: Exception) -> Tuple[int, str, str]:
 
     log_level is one of: 'ERROR' or 'WARNING'.
     """
+    # Admission control: the owner's own concurrency cap (429) or a busy server (503)
+    if isinstance(e, AdmissionRejected):
+        return (429 if e.owner_limited else 503), str(e), 'WARNING'
+
     # Psycopg-specific mappings if available
     if _pg is not None:
         if isinstance(e, getattr(_pg, 'SyntaxError', ())):
@@ -46,6 +59,20 @@ def map_exception_to_response(e: Exception) -> Tuple[int, str, str]:
         if isinstance(e, getattr(_pg, 'IntegrityError', ())):
             return 409, "Database constraint violation.", 'WARNING'
 
+    # DuckDB (analytical backend) mappings if available
+    if _duckdb is not None and isinstance(e, _duckdb.Error):
+        if isinstance(e, _duckdb.ParserException):
+            return 400, "SQL syntax error.", 'WARNING'
+        if isinstance(e, _duckdb.CatalogException):
+            return 400, "Referenced table does not exist in the analytics snapshots.", 'WARNING'
+        if isinstance(e, _duckdb.BinderException):
+            return 400, "Referenced column does not exist.", 'WARNING'
+        if isinstance(e, _duckdb.PermissionException):
+            return 403, "Permission denied to execute this query.", 'WARNING'
+        if isinstance(e, _duckdb.OutOfMemoryException):
+            return 503, "Query exceeded the analytics memory limit; please narrow it.", 'WARNING'
+        return 500, "Analytics engine error while executing query.", 'ERROR'
+
     # Django DB exceptions
     if isinstance(e, ProgrammingError):
         return 400, "SQL syntax error or invalid SQL referenced.", 'WARNING'
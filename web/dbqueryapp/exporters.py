@@ -0,0 +1,382 @@
+"""
+Streaming exporters for query results.
+
+`export_results` opens a server-side (named) cursor and passes its rows to one
+of the exporters below in batches of `EXPORT_BATCH_SIZE`. Each exporter is a
+generator of `bytes` chunks suitable for a `StreamingHttpResponse`, so memory
+use is bounded by one batch regardless of the size of the extract.
+
+Exporters share the signature `(columns, type_codes, batches, description=None)` where
+`type_codes` are the PostgreSQL type OIDs from `cursor.description`,
+`batches` is an iterable of row lists and the optional `description` is the
+full cursor description (used for NUMERIC precision and scale).
+
+Provided exporters:
+- `stream_csv` / `stream_json` — text formats.
+- `stream_sql` — multi-row INSERT statements in batches, or a `COPY ... FROM stdin` block.
+- `stream_parquet` / `stream_arrow` — Parquet and Arrow IPC (file format),
+  written batch by batch with column types mapped from the cursor description.
+  These require the optional `pyarrow` package.
+"""
+import csv
+import json
+import logging
+from io import StringIO
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger("DjangoApp Exporters")
+
+# pyarrow is optional; Parquet/Arrow exports are unavailable without it.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_BATCH_SIZE = getattr(settings, 'EXPORT_BATCH_SIZE', 10000)
+
+Batches = Iterable[Sequence[Sequence[Any]]]
+
+# PostgreSQL type OIDs (pg_type.oid) used for type mapping.
+PG_BOOL = 16
+PG_BYTEA = 17
+PG_INT8 = 20
+PG_INT2 = 21
+PG_INT4 = 23
+PG_TEXT = 25
+PG_OID = 26
+PG_JSON = 114
+PG_FLOAT4 = 700
+PG_FLOAT8 = 701
+PG_DATE = 1082
+PG_TIME = 1083
+PG_TIMESTAMP = 1114
+PG_TIMESTAMPTZ = 1184
+PG_NUMERIC = 1700
+PG_UUID = 2950
+PG_JSONB = 3802
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+def iter_cursor_batches(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Sequence[Any]]]:
+    """Yield lists of rows from `cursor` until it is exhausted."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def stream_csv(columns: Sequence[str], type_codes: Sequence[Any], batches: Batches, description=None) -> Iterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_json(columns: Sequence[str], type_codes: Sequence[Any], batches: Batches, description=None) -> Iterator[bytes]:
+    """Stream a JSON array of row objects, matching the previous non-streaming output."""
+    encoder = DjangoJSONEncoder()
+    separator = ''
+    yield b'['
+    for rows in batches:
+        parts = []
+        for row in rows:
+            parts.append(separator + encoder.encode(dict(zip(columns, row))))
+            separator = ', '
+        yield ''.join(parts).encode('utf-8')
+    yield b']'
+
+
+def _arrow_column_spec(type_code: Any, precision: Optional[int] = None, scale: Optional[int] = None):
+    """Return (arrow_type, converter) for a PostgreSQL type OID.
+
+    `converter` is applied to non-NULL values before building the Arrow array,
+    or is None when the driver's Python values are accepted as-is. Unknown types
+    are exported as strings. NUMERIC without a declared precision (e.g. AVG())
+    is exported as float64.
+    """
+    if type_code == PG_BOOL:
+        return pa.bool_(), None
+    if type_code == PG_INT2:
+        return pa.int16(), None
+    if type_code == PG_INT4:
+        return pa.int32(), None
+    if type_code in (PG_INT8, PG_OID):
+        return pa.int64(), None
+    if type_code == PG_FLOAT4:
+        return pa.float32(), None
+    if type_code == PG_FLOAT8:
+        return pa.float64(), None
+    if type_code == PG_NUMERIC:
+        if precision and scale is not None and precision <= 38:
+            return pa.decimal128(precision, scale), None
+        return pa.float64(), float
+    if type_code == PG_DATE:
+        return pa.date32(), None
+    if type_code == PG_TIME:
+        return pa.time64('us'), None
+    if type_code == PG_TIMESTAMP:
+        return pa.timestamp('us'), None
+    if type_code == PG_TIMESTAMPTZ:
+        return pa.timestamp('us', tz='UTC'), None
+    if type_code == PG_BYTEA:
+        return pa.binary(), bytes
+    if type_code in (PG_JSON, PG_JSONB):
+        return pa.string(), lambda v: json.dumps(v, cls=DjangoJSONEncoder)
+    if type_code == PG_UUID:
+        return pa.string(), str
+    return pa.string(), lambda v: v if isinstance(v, str) else str(v)
+
+
+def arrow_schema(columns: Sequence[str], type_codes: Sequence[Any], description: Optional[Sequence[Any]] = None):
+    """Build the Arrow schema and per-column converters for a result set."""
+    fields = []
+    converters: List[Optional[Callable[[Any], Any]]] = []
+    for index, (name, type_code) in enumerate(zip(columns, type_codes)):
+        precision = scale = None
+        if description is not None:
+            precision, scale = description[index][4], description[index][5]
+        arrow_type, converter = _arrow_column_spec(type_code, precision, scale)
+        fields.append(pa.field(name, arrow_type))
+        converters.append(converter)
+    return pa.schema(fields), converters
+
+
+def _record_batch(schema, converters, rows: Sequence[Sequence[Any]]):
+    """Convert a batch of row tuples into an Arrow RecordBatch, one column at a time."""
+    arrays = []
+    for index, (field, values) in enumerate(zip(schema, zip(*rows))):
+        converter = converters[index]
+        if converter is not None:
+            values = [None if v is None else converter(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator.
+
+    `tell()` reports the total number of bytes written so far, which Parquet and
+    Arrow writers rely on for the offsets stored in their footers, even though the
+    buffered bytes are drained after every batch.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _stream_arrow_writer(open_writer, columns, type_codes, batches, description=None) -> Iterator[bytes]:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow exports.")
+
+    schema, converters = arrow_schema(columns, type_codes, description)
+    sink = _StreamSink()
+    writer = open_writer(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        for rows in batches:
+            writer.write_batch(_record_batch(schema, converters, rows))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def stream_parquet(columns: Sequence[str], type_codes: Sequence[Any], batches: Batches, description=None) -> Iterator[bytes]:
+    """Stream a Parquet file with one row group per batch."""
+    return _stream_arrow_writer(lambda sink, schema: pq.ParquetWriter(sink, schema, compression='snappy'),
+                                columns, type_codes, batches, description)
+
+
+def stream_arrow(columns: Sequence[str], type_codes: Sequence[Any], batches: Batches, description=None) -> Iterator[bytes]:
+    """Stream an Arrow IPC file (readable with `pyarrow.ipc.open_file` or `pandas.read_feather`)."""
+    return _stream_arrow_writer(lambda sink, schema: pa.ipc.new_file(sink, schema),
+                                columns, type_codes, batches, description)
+
+
+SQL_EXPORT_MODES = ('insert', 'copy')
+SQL_EXPORT_ROWS_PER_STATEMENT = getattr(settings, 'SQL_EXPORT_ROWS_PER_STATEMENT', 1000)
+
+NUMERIC_TYPE_CODES = (PG_INT2, PG_INT4, PG_INT8, PG_OID, PG_FLOAT4, PG_FLOAT8, PG_NUMERIC)
+
+
+def _quote_sql_text(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_number(value) -> str:
+    text = str(value)
+    # NaN/Infinity are only valid as quoted literals.
+    return text if text not in ('nan', 'inf', '-inf', 'NaN', 'Infinity', '-Infinity') else _quote_sql_text(text)
+
+
+def sql_literal_formatter(type_code: Any) -> Callable[[Any], str]:
+    """Return a function rendering a non-NULL value of a PostgreSQL type as a SQL literal."""
+    if type_code in NUMERIC_TYPE_CODES:
+        return _sql_number
+    if type_code == PG_BOOL:
+        return lambda v: 'TRUE' if v else 'FALSE'
+    if type_code == PG_BYTEA:
+        return lambda v: "'\\x" + bytes(v).hex() + "'"
+    if type_code in (PG_JSON, PG_JSONB):
+        return lambda v: _quote_sql_text(json.dumps(v, cls=DjangoJSONEncoder))
+    if type_code in (PG_DATE, PG_TIME, PG_TIMESTAMP, PG_TIMESTAMPTZ):
+        return lambda v: _quote_sql_text(v.isoformat())
+    return _quote_sql_text
+
+
+def infer_type_codes(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[Any]:
+    """Guess type codes from the first non-NULL value of each column.
+
+    Used when rows do not come from a cursor (e.g. a list of row dicts), so the
+    type check runs once per column rather than once per cell. Only numbers and
+    booleans are distinguished; everything else is exported as quoted text.
+    """
+    type_codes: List[Any] = [None] * len(columns)
+    for index in range(len(columns)):
+        for row in rows:
+            value = row[index]
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                type_codes[index] = PG_BOOL
+            elif isinstance(value, int):
+                type_codes[index] = PG_INT8
+            elif isinstance(value, float):
+                type_codes[index] = PG_FLOAT8
+            break
+    return type_codes
+
+
+def format_sql_values(formatters: Sequence[Callable[[Any], str]], rows: Sequence[Sequence[Any]]) -> List[str]:
+    """Render rows as `  (v1, v2, ...)` VALUES tuples using per-column formatters."""
+    return [
+        '  (' + ', '.join('NULL' if v is None else fmt(v) for fmt, v in zip(formatters, row)) + ')'
+        for row in rows
+    ]
+
+
+def _copy_text_value(value, formatter) -> str:
+    text = formatter(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy_value_formatter(type_code: Any) -> Callable[[Any], str]:
+    """Return a function rendering a non-NULL value in COPY text format (before escaping)."""
+    if type_code == PG_BOOL:
+        return lambda v: 't' if v else 'f'
+    if type_code == PG_BYTEA:
+        return lambda v: '\\x' + bytes(v).hex()
+    if type_code in (PG_JSON, PG_JSONB):
+        return lambda v: json.dumps(v, cls=DjangoJSONEncoder)
+    if type_code in (PG_DATE, PG_TIME, PG_TIMESTAMP, PG_TIMESTAMPTZ):
+        return lambda v: v.isoformat()
+    return str
+
+
+def stream_sql(
+    columns: Sequence[str],
+    type_codes: Sequence[Any],
+    batches: Batches,
+    description=None,
+    table_name: str = 'result_table',
+    rows_per_statement: int = SQL_EXPORT_ROWS_PER_STATEMENT,
+    mode: str = 'insert',
+) -> Iterator[bytes]:
+    """Stream a SQL script that recreates the rows in `table_name`.
+
+    In `insert` mode rows are emitted as multi-row INSERT statements of at most
+    `rows_per_statement` rows each, so the script stays loadable by PostgreSQL
+    regardless of result size. In `copy` mode a single `COPY ... FROM stdin`
+    block in PostgreSQL text format is emitted (load it with psql).
+    Values are rendered by column type rather than by inspecting every cell.
+    """
+    if not columns:
+        return
+    column_list = ', '.join(columns)
+
+    if mode == 'copy':
+        formatters = [_copy_value_formatter(code) for code in type_codes]
+        yield f"COPY {table_name} ({column_list}) FROM stdin;\n".encode('utf-8')
+        for rows in batches:
+            lines = [
+                '\t'.join('\\N' if v is None else _copy_text_value(v, fmt) for fmt, v in zip(formatters, row))
+                for row in rows
+            ]
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+        yield b"\\.\n"
+        return
+
+    formatters = [sql_literal_formatter(code) for code in type_codes]
+    header = f"INSERT INTO {table_name} ({column_list}) VALUES\n"
+    pending: List[str] = []  # values carried over so statements can span cursor batches
+    for rows in batches:
+        pending.extend(format_sql_values(formatters, rows))
+        full = len(pending) - len(pending) % rows_per_statement
+        if full:
+            yield ''.join(
+                header + ',\n'.join(pending[i:i + rows_per_statement]) + ';\n'
+                for i in range(0, full, rows_per_statement)
+            ).encode('utf-8')
+            # the buffer is trimmed once per batch, not once per statement
+            del pending[:full]
+    if pending:
+        yield (header + ',\n'.join(pending) + ';\n').encode('utf-8')
+
+
+# format -> (content type, file extension, exporter, needs pyarrow)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    'csv': ('text/csv', 'csv', stream_csv, False),
+    'json': ('application/json', 'json', stream_json, False),
+    'sql': ('text/plain', 'sql', stream_sql, False),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', stream_parquet, True),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow', stream_arrow, True),
+}
@@ -4,6 +4,15 @@ QUERY_CHOICES = [
     ('get_first_100_real_acct', 'First 100 real accounts from the real_acct table.'),
     ('get_avg_bldg_and_land_val_by_state_class', ' Average building and land value by stateclass.'),
     ('get_first_100_unique_owners_for_residential', ' Get residential account unique owner history.'),
+    ('get_top_100_appraised_value_increases', ' Largest appraised value increases (over 20%) in the latest year.'),
+]
+
+
+BACKEND_POSTGRES = 'postgres'
+BACKEND_ANALYTICS = 'analytics'
+BACKEND_CHOICES = [
+    (BACKEND_POSTGRES, 'PostgreSQL (live data)'),
+    (BACKEND_ANALYTICS, 'DuckDB analytics (Parquet snapshots of ingested data)'),
 ]
 
 
@@ -23,3 +32,15 @@ class CustomSQLForm(forms.Form):
             'style': 'width:100%; padding:8px; border-radius:6px; border:1px solid #ddd;'
         })
     )
+    run_async = forms.BooleanField(
+        required=False,
+        label='Run in background',
+        help_text='Return immediately and poll for results (use for long-running reports).'
+    )
+    backend = forms.ChoiceField(
+        choices=BACKEND_CHOICES,
+        required=False,
+        initial=BACKEND_POSTGRES,
+        label='Engine',
+        help_text='Use the analytics engine for large scans and aggregates; it reads the last ingest snapshot.'
+    )
@@ -0,0 +1,202 @@
+"""
+Background execution of long-running read-only SQL queries.
+
+Submitting a query returns a job id immediately; the query itself runs on a
+bounded `ThreadPoolExecutor`. Each worker thread uses its own Django database
+connection (Django connections are thread-local) on a read replica chosen by
+`routers.run_on_read_database`, so a slow aggregate no longer ties up the WSGI
+worker that accepted the request.
+
+Job records live in the configured Django cache (Redis in production) so any
+web worker can answer status polls or cancel a job:
+
+- `submit_query_job(sql, owner)` — queue already-validated SQL, return the job id.
+- `get_job(job_id)` — current job record (status, first page of rows, error).
+- `cancel_query_job(job_id)` — flag the job and cancel the backend query with
+  `pg_cancel_backend`.
+
+Only SQL that has passed `validate_sql_with_sqlglot` should be submitted here.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .constants import TELEMETRY_SOURCE_JOB
+from .errors import map_exception_to_response
+from .routers import run_on_read_database
+from .telemetry import QueryTimings, record_query
+from .utils import generate_unique_query_key
+
+logger = logging.getLogger("DjangoApp Query Jobs")
+
+QUERY_JOB_MAX_WORKERS = getattr(settings, 'QUERY_JOB_MAX_WORKERS', 4)
+QUERY_JOB_PAGE_SIZE = getattr(settings, 'QUERY_JOB_PAGE_SIZE', 100)
+QUERY_JOB_TTL = getattr(settings, 'QUERY_JOB_TTL', 60 * 60)
+# Rows fetched per batch while counting the rows after the first page.
+QUERY_JOB_COUNT_BATCH_SIZE = getattr(settings, 'QUERY_JOB_COUNT_BATCH_SIZE', 10000)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Lazily create the process-wide executor so importing the module is cheap."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=QUERY_JOB_MAX_WORKERS, thread_name_prefix='query-job')
+        return _executor
+
+
+def _job_key(job_id: str) -> str:
+    return f"query_job:{job_id}"
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"query_job:{job_id}:cancel"
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the stored job record or None if it is unknown or expired."""
+    return cache.get(_job_key(job_id))
+
+
+def _update_job(job_id: str, **fields) -> Dict[str, Any]:
+    """Merge `fields` into the job record. Only the worker thread writes records."""
+    job = get_job(job_id) or {'job_id': job_id}
+    job.update(fields)
+    cache.set(_job_key(job_id), job, timeout=QUERY_JOB_TTL)
+    return job
+
+
+def is_cancel_requested(job_id: str) -> bool:
+    return bool(cache.get(_cancel_key(job_id)))
+
+
+def submit_query_job(sql: str, owner: Optional[str] = None) -> str:
+    """Queue a validated read-only SQL statement and return its job id.
+
+    `owner` is an opaque identifier (the session key) used by the views to make
+    sure only the submitting session can poll or cancel the job.
+    """
+    job_id = generate_unique_query_key()
+    _update_job(
+        job_id,
+        sql=sql,
+        owner=owner,
+        status=JOB_PENDING,
+        submitted_at=time.time(),
+        db_alias=None,
+        backend_pid=None,
+        columns=None,
+        rows=None,
+        row_count=None,
+        error=None,
+    )
+    _get_executor().submit(_run_job, job_id, sql)
+    logger.debug("Submitted query job %s", job_id)
+    return job_id
+
+
+def _run_job(job_id: str, sql: str) -> None:
+    """Execute a job on the worker thread's own connection and record the outcome."""
+    if is_cancel_requested(job_id):
+        _update_job(job_id, status=JOB_CANCELLED, finished_at=time.time())
+        return
+
+    def execute(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            backend_pid = cursor.fetchone()[0]
+            # The alias is recorded so a cancel reaches the server running the query.
+            _update_job(job_id, status=JOB_RUNNING, db_alias=conn.alias, backend_pid=backend_pid, started_at=time.time())
+
+            # A cancel may have arrived before the backend pid was published.
+            if is_cancel_requested(job_id):
+                return None
+
+        # A server-side cursor: only the first page is kept, and the rest of the result is
+        # counted one batch at a time instead of being held in the worker.
+        with conn.chunked_cursor() as cursor:
+            cursor.execute(sql)
+            columns = [col[0] for col in cursor.description]
+            page = cursor.fetchmany(QUERY_JOB_PAGE_SIZE)
+            row_count = len(page)
+            while True:
+                batch = cursor.fetchmany(QUERY_JOB_COUNT_BATCH_SIZE)
+                if not batch:
+                    break
+                row_count += len(batch)
+            return columns, page, row_count
+
+    timings = QueryTimings()
+    try:
+        with timings.phase('execute_ms'):
+            outcome = run_on_read_database(execute)
+        if outcome is None:
+            _update_job(job_id, status=JOB_CANCELLED, finished_at=time.time())
+            return
+
+        columns, page, row_count = outcome
+        record_query(TELEMETRY_SOURCE_JOB, sql, timings, row_count=row_count)
+        _update_job(
+            job_id,
+            status=JOB_DONE,
+            columns=columns,
+            rows=[list(row) for row in page],
+            row_count=row_count,
+            finished_at=time.time(),
+        )
+    except Exception as e:
+        if is_cancel_requested(job_id):
+            logger.info("Query job %s cancelled.", job_id)
+            _update_job(job_id, status=JOB_CANCELLED, finished_at=time.time())
+        else:
+            status, msg, level = map_exception_to_response(e)
+            if level == 'ERROR':
+                logger.exception("Error executing query job %s: %s", job_id, e)
+            else:
+                logger.warning("Query job %s warning: %s", job_id, e)
+            _update_job(job_id, status=JOB_FAILED, error=msg, finished_at=time.time())
+            record_query(TELEMETRY_SOURCE_JOB, sql, timings, error=msg)
+    finally:
+        # Release this worker thread's connections (or return them to the pool).
+        connections.close_all()
+
+
+def cancel_query_job(job_id: str) -> bool:
+    """Request cancellation of a job.
+
+    Sets the cancel flag (honoured by jobs that have not started yet) and, if
+    the query is already running, calls `pg_cancel_backend` on its backend pid.
+
+    Returns:
+        bool: True if the job exists and was not already finished.
+    """
+    job = get_job(job_id)
+    if job is None or job.get('status') in FINISHED_STATES:
+        return False
+
+    cache.set(_cancel_key(job_id), True, timeout=QUERY_JOB_TTL)
+
+    backend_pid = job.get('backend_pid')
+    if backend_pid:
+        try:
+            with connections[job['db_alias']].cursor() as cursor:
+                cursor.execute("SELECT pg_cancel_backend(%s)", [backend_pid])
+        except Exception as e:
+            logger.warning("Failed to cancel backend %s for query job %s: %s", backend_pid, job_id, e)
+    return True
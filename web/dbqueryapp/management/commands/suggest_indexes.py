@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from ...advisor import (
+    HypoPGValidator,
+    SampleDatabaseValidator,
+    build_candidates,
+    drop_covered,
+    existing_indexes,
+    load_fingerprint_stats,
+    materialization_candidates,
+)
+
+
+class Command(BaseCommand):
+    help = "Suggest indexes for the ingested tables from recorded query telemetry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Telemetry window in days (default 7).")
+        parser.add_argument('--limit', type=int, default=10, help="Number of candidates to evaluate (default 10).")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias used to read existing indexes and to validate candidates.")
+        parser.add_argument('--validate', choices=['auto', 'hypopg', 'sample', 'none'], default='auto',
+                            help="auto: hypopg if installed, else none. 'sample' builds each index on --database "
+                                 "inside a rolled-back transaction, so point it at a sample copy.")
+        parser.add_argument('--min-improvement', type=float, default=0.1,
+                            help="Minimum fractional reduction (geometric mean over the statements) to recommend a validated index (default 0.1).")
+        parser.add_argument('--output', help="Write the recommended CREATE INDEX statements to this file.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        stats = load_fingerprint_stats(since=timezone.now() - timedelta(days=options['days']))
+        if not stats:
+            self.stdout.write("No query telemetry recorded in this window.")
+            return
+
+        candidates = build_candidates(stats)
+        with connections[using].cursor() as cursor:
+            candidates = drop_covered(candidates, existing_indexes(cursor, sorted({c.table for c in candidates})))
+        candidates = candidates[:options['limit']]
+
+        validator = self._validator(options['validate'], using)
+        recommended = []
+        for candidate in candidates:
+            if validator is not None:
+                try:
+                    validator.evaluate(candidate)
+                except DatabaseError as e:
+                    self.stderr.write(f"Could not evaluate {candidate.name}: {e}")
+                    continue
+                if candidate.improvement is None or candidate.improvement < options['min_improvement']:
+                    self._report(candidate, accepted=False)
+                    continue
+            self._report(candidate, accepted=True)
+            recommended.append(candidate)
+
+        for row in materialization_candidates(stats)[:options['limit']]:
+            self.stdout.write(
+                f"-- summary table candidate ({row['executions']} runs, {row['total_ms']:.0f} ms total): "
+                f"{row['normalized_sql']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                for candidate in recommended:
+                    f.write(f"-- weight {candidate.weight:.0f} ms, fingerprints: {', '.join(candidate.statements)}\n")
+                    f.write(candidate.create_sql(concurrently=True) + ";\n")
+            self.stdout.write(f"Wrote {len(recommended)} statement(s) to {options['output']}")
+
+    def _validator(self, mode, using):
+        if mode == 'none':
+            return None
+        if mode == 'sample':
+            return SampleDatabaseValidator(using)
+        if HypoPGValidator.available(using):
+            return HypoPGValidator(using)
+        if mode == 'hypopg':
+            raise CommandError(f"The hypopg extension is not installed on database '{using}'.")
+        self.stderr.write("hypopg is not installed; listing unvalidated candidates (use --validate sample to benchmark).")
+        return None
+
+    def _report(self, candidate, accepted):
+        line = f"{candidate.create_sql(concurrently=True)};  -- weight {candidate.weight:.0f} ms"
+        if candidate.improvement is not None:
+            line += f", {candidate.method} {candidate.improvement:.0%} better over {len(candidate.measurements)} statement(s)"
+        self.stdout.write(line if accepted else f"-- rejected: {line}")
@@ -0,0 +1,46 @@
+"""
+Operational metrics for the query app, served as JSON by the `metrics` view.
+
+Provided helpers:
+- `get_pool_metrics()` — psycopg connection pool statistics per database alias,
+  including how long requests waited for a connection.
+- `get_admission_metrics()` — running and queued queries and admission wait times
+  for this process (see `admission`).
+"""
+import logging
+from typing import Any, Dict
+
+from django.db import connections
+
+from . import admission
+
+logger = logging.getLogger("DjangoApp Metrics")
+
+
+def get_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return pool statistics keyed by database alias.
+
+    Aliases without a connection pool are omitted. Counters are cumulative for
+    the lifetime of the process (`pool.get_stats()` does not reset them);
+    `avg_wait_ms` is derived from `requests_wait_ms / requests_num`.
+    """
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for alias in connections:
+        try:
+            pool = getattr(connections[alias], 'pool', None)
+        except Exception as e:
+            logger.warning("Could not access connection pool for %s: %s", alias, e)
+            continue
+        if pool is None:
+            continue
+
+        stats = dict(pool.get_stats())
+        requests = stats.get('requests_num', 0)
+        stats['avg_wait_ms'] = stats.get('requests_wait_ms', 0) / requests if requests else 0.0
+        metrics[alias] = stats
+    return metrics
+
+
+def get_admission_metrics() -> Dict[str, Any]:
+    """Return the admission controller's queue depth, counters and wait times."""
+    return admission.controller.stats()
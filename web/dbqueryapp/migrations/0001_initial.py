@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryTelemetry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(choices=[('custom', 'Custom SQL'), ('predefined', 'Predefined query'), ('job', 'Background job'), ('export', 'Export')], max_length=16)),
+                ('backend', models.CharField(default='postgres', max_length=16)),
+                ('fingerprint', models.CharField(max_length=16)),
+                ('normalized_sql', models.TextField()),
+                ('parse_ms', models.FloatField(blank=True, null=True)),
+                ('validate_ms', models.FloatField(blank=True, null=True)),
+                ('execute_ms', models.FloatField(blank=True, null=True)),
+                ('render_ms', models.FloatField(blank=True, null=True)),
+                ('total_ms', models.FloatField()),
+                ('row_count', models.IntegerField(blank=True, null=True)),
+                ('bytes_serialized', models.BigIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+            ],
+            options={
+                'verbose_name': 'query telemetry',
+                'verbose_name_plural': 'query telemetry',
+                'indexes': [models.Index(fields=['fingerprint', 'created_at'], name='querytelemetry_fp_created'), models.Index(fields=['created_at'], name='querytelemetry_created')],
+            },
+        ),
+    ]
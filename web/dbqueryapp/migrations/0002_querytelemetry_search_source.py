@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbqueryapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='querytelemetry',
+            name='source',
+            field=models.CharField(choices=[('custom', 'Custom SQL'), ('predefined', 'Predefined query'), ('job', 'Background job'), ('export', 'Export'), ('search', 'Search')], max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dbqueryapp', '0002_querytelemetry_search_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='querytelemetry',
+            name='source',
+            field=models.CharField(choices=[('custom', 'Custom SQL'), ('predefined', 'Predefined query'), ('job', 'Background job'), ('export', 'Export'), ('search', 'Search'), ('profile', 'Account profiles')], max_length=16),
+        ),
+    ]
@@ -1,3 +1,35 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from .constants import TELEMETRY_SOURCE_CHOICES
+
+
+class QueryTelemetry(models.Model):
+    """One query execution: normalized fingerprint, per-phase timings and result size.
+
+    Rows are written in batches by `telemetry.TelemetryBuffer`, never on the request path.
+    """
+    created_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=16, choices=TELEMETRY_SOURCE_CHOICES)
+    backend = models.CharField(max_length=16, default='postgres')
+    fingerprint = models.CharField(max_length=16)
+    normalized_sql = models.TextField()
+    parse_ms = models.FloatField(null=True, blank=True)
+    validate_ms = models.FloatField(null=True, blank=True)
+    execute_ms = models.FloatField(null=True, blank=True)
+    render_ms = models.FloatField(null=True, blank=True)
+    total_ms = models.FloatField()
+    row_count = models.IntegerField(null=True, blank=True)
+    bytes_serialized = models.BigIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        verbose_name = 'query telemetry'
+        verbose_name_plural = 'query telemetry'
+        indexes = [
+            models.Index(fields=['fingerprint', 'created_at'], name='querytelemetry_fp_created'),
+            models.Index(fields=['created_at'], name='querytelemetry_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.fingerprint} {self.total_ms:.1f} ms"
@@ -0,0 +1,169 @@
+"""
+Batch account profiles: every HCAD table's rows for a set of accounts in one round trip.
+
+`get_account_profiles(accounts, year)` returns, per account, the rows of each
+table in `PROFILE_TABLES` for that records year. Accounts already profiled for
+the current ingest data generation come from the Django cache (one key per
+account, year and generation); the rest are fetched together with one
+`acct = ANY(%s)` query per table, sent as a single psycopg pipeline so the
+whole batch costs one network round trip.
+
+Tables that have not been loaded are skipped. Which tables exist is checked
+once per data generation and process.
+
+Provided helpers:
+- `parse_account_numbers(values)` — split, de-duplicate and validate account numbers.
+- `fetch_profiles(accounts, year)` — query the read database for the given accounts.
+- `get_account_profiles(accounts, year, loader)` — cached profiles as JSON-ready dicts.
+"""
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import PROFILE_TABLES
+from .result_cache import get_data_generation, run_on_read_database_at
+
+logger = logging.getLogger("DjangoApp Profiles")
+
+PROFILE_MAX_ACCOUNTS = getattr(settings, 'PROFILE_MAX_ACCOUNTS', 100)
+PROFILE_CACHE_TTL = getattr(settings, 'PROFILE_CACHE_TTL', 60 * 60 * 24)
+
+_ACCOUNT_RE = re.compile(r'^[0-9A-Za-z]{1,20}$')
+# Columns every profile table shares; they are implied by the profile so not repeated per row.
+_KEY_COLUMNS = ('acct', 'records_year')
+
+_tables_lock = threading.Lock()
+_existing_tables: Tuple[Optional[int], Tuple[str, ...]] = (None, ())
+
+
+class ProfileError(ValueError):
+    """Invalid profile request parameters; the message is safe to show to the user."""
+
+
+def parse_account_numbers(values: Iterable[str]) -> List[str]:
+    """Accept repeated and/or comma-separated account numbers, keeping first-seen order."""
+    accounts = []
+    for value in values:
+        for account in value.split(','):
+            account = account.strip()
+            if not account:
+                continue
+            if not _ACCOUNT_RE.match(account):
+                raise ProfileError(f"Invalid account number: {account[:20]!r}")
+            if account not in accounts:
+                accounts.append(account)
+    if not accounts:
+        raise ProfileError("At least one account number ('acct') is required.")
+    if len(accounts) > PROFILE_MAX_ACCOUNTS:
+        raise ProfileError(f"At most {PROFILE_MAX_ACCOUNTS} accounts can be requested at once.")
+    return accounts
+
+
+def _profile_tables(conn, generation: int) -> Tuple[str, ...]:
+    """The `PROFILE_TABLES` that exist, memoized per data generation."""
+    global _existing_tables
+    with _tables_lock:
+        if _existing_tables[0] == generation:
+            return _existing_tables[1]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT t FROM unnest(%s::text[]) WITH ORDINALITY AS u(t, n) WHERE to_regclass(t) IS NOT NULL ORDER BY n",
+            [list(PROFILE_TABLES)],
+        )
+        tables = tuple(row[0] for row in cursor.fetchall())
+    with _tables_lock:
+        _existing_tables = (generation, tables)
+    return tables
+
+
+def reset_profile_tables_memo() -> None:
+    """Forget which tables exist so the next fetch re-checks (used by tests)."""
+    global _existing_tables
+    with _tables_lock:
+        _existing_tables = (None, ())
+
+
+def _run_batch(raw_connection, statements: Sequence[Tuple[str, Sequence[Any]]]):
+    """Execute every statement and return (description, rows) for each, pipelined when supported."""
+    cursors = []
+    pipeline = getattr(raw_connection, 'pipeline', None)
+    if pipeline is not None:
+        with pipeline():
+            for sql, params in statements:
+                cursor = raw_connection.cursor()
+                cursor.execute(sql, params)
+                cursors.append(cursor)
+    else:
+        # psycopg2 has no pipeline mode; fall back to one round trip per table.
+        for sql, params in statements:
+            cursor = raw_connection.cursor()
+            cursor.execute(sql, params)
+            cursors.append(cursor)
+
+    results = []
+    for cursor in cursors:
+        try:
+            results.append((cursor.description or [], cursor.fetchall()))
+        finally:
+            cursor.close()
+    return results
+
+
+def fetch_profiles(accounts: Sequence[str], year: int, generation: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Query every existing profile table for `accounts` and assemble one profile per account."""
+    profiles = {account: {'acct': account, 'year': year, 'tables': {}} for account in accounts}
+
+    def fetch(conn):
+        tables = _profile_tables(conn, generation)
+        # ingest stores every column, records_year included, as text
+        params = [list(accounts), str(year)]
+        statements = [
+            (f'SELECT * FROM "{table}" WHERE acct = ANY(%s) AND records_year = %s', params) for table in tables
+        ]
+        conn.ensure_connection()
+        return tables, _run_batch(conn.connection, statements)
+
+    tables, results = run_on_read_database_at(fetch, generation)
+    for table, (description, rows) in zip(tables, results):
+        columns = [col[0] for col in description]
+        acct_index = columns.index('acct')
+        keep = [i for i, name in enumerate(columns) if name not in _KEY_COLUMNS]
+        for row in rows:
+            profile = profiles.get(row[acct_index])
+            if profile is not None:
+                profile['tables'].setdefault(table, []).append({columns[i]: row[i] for i in keep})
+
+    for profile in profiles.values():
+        profile['found'] = bool(profile['tables'])
+    return profiles
+
+
+def profile_cache_key(account: str, year: int, generation: int) -> str:
+    return f"account_profile:{generation}:{year}:{account}"
+
+
+def get_account_profiles(
+    accounts: Sequence[str],
+    year: int,
+    loader: Callable[[Sequence[str], int, int], Dict[str, Dict[str, Any]]] = fetch_profiles,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Return (profiles in request order, number served from the cache).
+
+    `loader(missing_accounts, year, generation)` fetches the accounts not in the cache.
+    """
+    generation = get_data_generation()
+    keys = {account: profile_cache_key(account, year, generation) for account in accounts}
+    cached = cache.get_many(list(keys.values()))
+    profiles = {account: cached[key] for account, key in keys.items() if key in cached}
+
+    missing = [account for account in accounts if account not in profiles]
+    if missing:
+        fetched = loader(missing, year, generation)
+        cache.set_many({keys[account]: fetched[account] for account in missing}, timeout=PROFILE_CACHE_TTL)
+        profiles.update(fetched)
+
+    return [profiles[account] for account in accounts], len(accounts) - len(missing)
@@ -0,0 +1,158 @@
+"""
+Shared, cross-user result cache for predefined queries.
+
+Predefined queries (`DEFAULT_SQL_QUERIES`) are a fixed whitelist and the
+underlying data only changes when the ingest job runs. Results are therefore
+cached in the configured Django cache (Redis) under a key made of the query key
+and the current data generation. The ingest bumps the generation counter in
+the `ingest_data_generation` table at the end of every successful load, which
+invalidates all cached results at once without having to delete keys.
+
+Provided helpers:
+- `get_data_generation()` — Current data generation, memoized per process for
+  `DATA_GENERATION_CHECK_INTERVAL` seconds.
+- `run_on_read_database_at(fn, generation)` — Run `fn(connection)` on a read
+  database that has replayed `generation`, else on the primary.
+- `encode_result(value)` / `decode_result(blob)` — Compressed binary encoding
+  (pickle + zlib) used for cached values.
+- `get_cached_predefined_result(query_key, loader)` — Return the cached
+  `(sql, result, error)` for a predefined query, running `loader` once on a miss.
+"""
+import logging
+import pickle
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from .constants import DATA_GENERATION_TABLE
+from .routers import run_on_read_database
+
+logger = logging.getLogger("DjangoApp Result Cache")
+
+T = TypeVar('T')
+
+DATA_GENERATION_CHECK_INTERVAL = getattr(settings, 'DATA_GENERATION_CHECK_INTERVAL', 5)
+PREDEFINED_RESULT_CACHE_TTL = getattr(settings, 'PREDEFINED_RESULT_CACHE_TTL', 60 * 60 * 24)
+PREDEFINED_RESULT_LOCK_TIMEOUT = getattr(settings, 'PREDEFINED_RESULT_LOCK_TIMEOUT', 30)
+RESULT_COMPRESSION_LEVEL = 6
+
+_generation_lock = threading.Lock()
+_generation_value = 0
+_generation_checked_at: Optional[float] = None
+
+
+def read_data_generation(conn) -> int:
+    """Read the generation recorded on `conn`'s database (0 before the first ingest)."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [DATA_GENERATION_TABLE])
+        if cursor.fetchone()[0] is None:
+            return 0
+        cursor.execute(f"SELECT generation FROM {DATA_GENERATION_TABLE} WHERE id = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def get_data_generation() -> int:
+    """Return the current ingest data generation (0 if no ingest has recorded one yet)."""
+    global _generation_value, _generation_checked_at
+    with _generation_lock:
+        now = time.monotonic()
+        if _generation_checked_at is not None and now - _generation_checked_at < DATA_GENERATION_CHECK_INTERVAL:
+            return _generation_value
+
+        try:
+            _generation_value = read_data_generation(connection)
+        except Exception as e:
+            logger.debug("Could not read data generation, assuming %s: %s", _generation_value, e)
+
+        _generation_checked_at = now
+        return _generation_value
+
+
+def reset_data_generation_memo() -> None:
+    """Forget the memoized generation so the next call re-reads it (used by tests)."""
+    global _generation_value, _generation_checked_at
+    with _generation_lock:
+        _generation_value = 0
+        _generation_checked_at = None
+
+
+def run_on_read_database_at(fn: Callable[..., T], generation: int) -> T:
+    """Run `fn(connection)` on a read database that has replayed `generation`.
+
+    Cache keys use the generation read on the primary, while a replica may
+    trail it by up to REPLICA_MAX_LAG_SECONDS; loading from a replica that has
+    not replayed the latest ingest would store old rows under the new key. Such
+    a load runs on the primary instead. The generation is bumped after the
+    load commits, so a replica that has it has the loaded rows as well.
+    """
+    def fetch(conn):
+        if conn.alias != DEFAULT_DB_ALIAS and read_data_generation(conn) < generation:
+            return False, None
+        return True, fn(conn)
+
+    replayed, value = run_on_read_database(fetch)
+    if replayed:
+        return value
+    logger.info("Read replica has not replayed data generation %s yet; loading from the primary.", generation)
+    return fn(connections[DEFAULT_DB_ALIAS])
+
+
+def encode_result(value: Any) -> bytes:
+    """Serialize and compress a cached value."""
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), RESULT_COMPRESSION_LEVEL)
+
+
+def decode_result(blob: bytes) -> Any:
+    """Inverse of `encode_result`. Only used on values this module wrote to the cache."""
+    return pickle.loads(zlib.decompress(blob))
+
+
+def predefined_result_key(query_key: str, generation: int) -> str:
+    return f"predefined_result:{generation}:{query_key}"
+
+
+def get_cached_predefined_result(
+    query_key: str,
+    loader: Callable[[str, int], Tuple[Optional[str], Any, Optional[str]]],
+) -> Tuple[Optional[str], Any, Optional[str]]:
+    """Return `(sql, result, error)` for a predefined query from the shared cache.
+
+    On a miss a short-lived lock makes a single request run `loader(query_key, generation)`
+    while concurrent requests for the same key wait for its result, so many
+    users selecting the same dropdown item cost one database query. Errors are
+    never cached.
+    """
+    generation = get_data_generation()
+    key = predefined_result_key(query_key, generation)
+    lock_key = f"{key}:lock"
+
+    blob = cache.get(key)
+    if blob is not None:
+        return decode_result(blob)
+
+    have_lock = cache.add(lock_key, 1, timeout=PREDEFINED_RESULT_LOCK_TIMEOUT)
+    if not have_lock:
+        deadline = time.monotonic() + PREDEFINED_RESULT_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            blob = cache.get(key)
+            if blob is not None:
+                return decode_result(blob)
+            if cache.get(lock_key) is None:
+                break
+        logger.debug("Gave up waiting for cached result of %s; loading directly.", query_key)
+
+    try:
+        sql, result, error = loader(query_key, generation)
+        if error is None and result is not None:
+            cache.set(key, encode_result((sql, result, error)), timeout=PREDEFINED_RESULT_CACHE_TTL)
+        return sql, result, error
+    finally:
+        if have_lock:
+            cache.delete(lock_key)
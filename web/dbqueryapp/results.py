@@ -0,0 +1,136 @@
+"""
+Compact container for query results.
+
+`QueryResult` stores the column names (and cursor type codes) once plus the row
+tuples returned by the database driver, instead of building a dict per row.
+The template, the session store and the exporters all consume it directly.
+
+Conversion of non-JSON-native values (Decimal, dates, times, UUIDs, ...) is done
+column by column: the converter is chosen once per column from its first
+non-NULL value and then applied to the whole column, so scalar columns need no
+per-cell type dispatch. Array and json columns (lists and dicts) are walked
+recursively, since the values nested in them may need converting too.
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+def _isoformat(value) -> str:
+    return value.isoformat()
+
+
+def _scalar_converter(value: Any) -> Optional[Callable[[Any], Any]]:
+    """Return the converter for a non-NULL scalar value, or None if it is already serializable."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return _isoformat
+    if isinstance(value, (Decimal, datetime.timedelta, uuid.UUID)):
+        return str
+    if isinstance(value, memoryview):
+        return lambda v: bytes(v).hex()
+    if isinstance(value, bytes):
+        return bytes.hex
+    return None
+
+
+def _convert_nested(value: Any) -> Any:
+    """Convert a value of an array or json column, walking into its lists and dicts."""
+    if isinstance(value, dict):
+        return {key: _convert_nested(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_convert_nested(item) for item in value]
+    if value is None:
+        return None
+    converter = _scalar_converter(value)
+    return value if converter is None else converter(value)
+
+
+def _converter_for(values: Sequence[Any]) -> Optional[Callable[[Any], Any]]:
+    """Return the serialization converter for a column, or None if values are already serializable."""
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, dict)):
+            return _convert_nested
+        return _scalar_converter(value)
+    return None
+
+
+class QueryResult:
+    """Column names, optional cursor type codes and row tuples of a query result."""
+
+    __slots__ = ('columns', 'type_codes', 'rows')
+
+    def __init__(self, columns: Sequence[str], rows: Sequence[Sequence[Any]], type_codes: Optional[Sequence[Any]] = None):
+        self.columns: List[str] = list(columns)
+        self.type_codes: Optional[List[Any]] = list(type_codes) if type_codes is not None else None
+        self.rows = rows
+
+    @classmethod
+    def from_cursor(cls, cursor, rows: Optional[Sequence[Sequence[Any]]] = None) -> 'QueryResult':
+        """Build a result from an executed DB-API cursor, fetching all rows unless `rows` is given."""
+        description = cursor.description or []
+        return cls(
+            columns=[col[0] for col in description],
+            rows=cursor.fetchall() if rows is None else rows,
+            type_codes=[col[1] for col in description],
+        )
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> 'QueryResult':
+        """Build a result from a list of row dicts sharing the same keys."""
+        columns = list(records[0].keys()) if records else []
+        return cls(columns, [tuple(record.get(col) for col in columns) for record in records])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __bool__(self) -> bool:
+        return len(self.rows) > 0
+
+    def __iter__(self) -> Iterator[Sequence[Any]]:
+        return iter(self.rows)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, QueryResult):
+            return NotImplemented
+        return self.columns == other.columns and [tuple(r) for r in self.rows] == [tuple(r) for r in other.rows]
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield each row as a dict; only for consumers that need keyed rows (e.g. JSON)."""
+        columns = self.columns
+        for row in self.rows:
+            yield dict(zip(columns, row))
+
+    def to_serializable(self) -> 'QueryResult':
+        """Return a copy whose values are JSON-native, converting whole columns at a time."""
+        if not self.rows:
+            return QueryResult(self.columns, [], self.type_codes)
+
+        column_values: List[Sequence[Any]] = list(zip(*self.rows))
+        changed = False
+        for index, values in enumerate(column_values):
+            converter = _converter_for(values)
+            if converter is not None:
+                column_values[index] = [None if v is None else converter(v) for v in values]
+                changed = True
+
+        rows = list(zip(*column_values)) if changed else self.rows
+        return QueryResult(self.columns, rows, self.type_codes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable representation used for session storage."""
+        serializable = self.to_serializable()
+        return {
+            'columns': serializable.columns,
+            'type_codes': serializable.type_codes,
+            'rows': list(serializable.rows),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional['QueryResult']:
+        if data is None:
+            return None
+        return cls(data.get('columns', []), data.get('rows', []), data.get('type_codes'))
+
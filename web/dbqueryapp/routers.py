@@ -0,0 +1,174 @@
+"""
+Read-replica routing for validated read-only SQL.
+
+User SQL (custom, predefined, background jobs and exports) is sent to one of the
+database aliases listed in `READ_REPLICAS` so it does not compete with ingest
+writes on the primary. Replicas are chosen round-robin, skipping any replica
+whose replication lag exceeds `REPLICA_MAX_LAG_SECONDS` or that failed
+recently. The primary (`default`) is used only when no replica is available.
+
+Provided helpers:
+- `ReplicaSelector` — Round-robin, lag-aware choice between replica aliases.
+- `select_read_database()` — Alias to use for the next read-only query.
+- `run_on_read_database(fn)` — Run `fn(connection)` on a read alias, failing over
+  to the next replica (and finally the primary) when a replica cannot be reached.
+- `ReadReplicaRouter` — Django database router applying the same policy to ORM reads
+  of the models listed in `READ_REPLICA_MODELS`; every other model stays on the primary.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections
+
+logger = logging.getLogger("DjangoApp Routers")
+
+T = TypeVar('T')
+
+READ_REPLICAS: List[str] = list(getattr(settings, 'READ_REPLICAS', []))
+REPLICA_MAX_LAG_SECONDS = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30)
+REPLICA_LAG_CHECK_INTERVAL = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+# "app_label.ModelName" labels whose ORM reads may be served by a replica
+READ_REPLICA_MODELS = frozenset(getattr(settings, 'READ_REPLICA_MODELS', ()))
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+# (or when the server is not a standby at all).
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def probe_replica_lag(alias: str) -> Optional[float]:
+    """Return the replication lag of `alias` in seconds, or None if it is unreachable."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning("Replica %s unavailable: %s", alias, e)
+        return None
+
+
+class ReplicaSelector:
+    """Pick replica aliases round-robin, skipping lagging or unreachable replicas.
+
+    Lag probes are cached for `check_interval` seconds per replica so routing
+    adds at most one cheap query per replica per interval.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[str],
+        max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+        check_interval: float = REPLICA_LAG_CHECK_INTERVAL,
+        lag_probe: Callable[[str], Optional[float]] = probe_replica_lag,
+        clock: Callable[[], float] = time.monotonic,
+        primary: str = DEFAULT_DB_ALIAS,
+    ):
+        self.replicas = list(replicas)
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self.clock = clock
+        self.primary = primary
+        self._next = 0
+        self._lock = threading.Lock()
+        self._health: Dict[str, Tuple[float, Optional[float]]] = {}
+
+    def _lag(self, alias: str) -> Optional[float]:
+        now = self.clock()
+        with self._lock:
+            cached = self._health.get(alias)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[1]
+
+        lag = self.lag_probe(alias)
+        with self._lock:
+            self._health[alias] = (now, lag)
+        return lag
+
+    def is_available(self, alias: str) -> bool:
+        lag = self._lag(alias)
+        return lag is not None and lag <= self.max_lag_seconds
+
+    def mark_failed(self, alias: str) -> None:
+        """Skip `alias` until its next lag check is due."""
+        with self._lock:
+            self._health[alias] = (self.clock(), None)
+
+    def select(self, exclude: Sequence[str] = ()) -> str:
+        """Return the next available replica alias, or the primary if none is available."""
+        if not self.replicas:
+            return self.primary
+
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+
+        for offset in range(len(self.replicas)):
+            alias = self.replicas[(start + offset) % len(self.replicas)]
+            if alias not in exclude and self.is_available(alias):
+                return alias
+
+        logger.debug("No read replica available; using primary.")
+        return self.primary
+
+
+_selector = ReplicaSelector(READ_REPLICAS)
+
+
+def select_read_database() -> str:
+    """Alias of the database that should serve the next read-only query."""
+    return _selector.select()
+
+
+def run_on_read_database(fn: Callable[..., T]) -> T:
+    """Run `fn(connection)` on a read alias with failover.
+
+    If a replica cannot be connected to, it is marked failed and the next
+    available replica (finally the primary) is tried. Errors raised by `fn`
+    itself (syntax errors, cancelled queries, ...) propagate unchanged so a
+    query is never executed twice.
+    """
+    tried: List[str] = []
+    while True:
+        alias = _selector.select(exclude=tried)
+        conn = connections[alias]
+        try:
+            conn.ensure_connection()
+        except (OperationalError, InterfaceError) as e:
+            if alias == _selector.primary:
+                raise
+            logger.warning("Could not connect to replica %s, failing over: %s", alias, e)
+            _selector.mark_failed(alias)
+            tried.append(alias)
+            continue
+        return fn(conn)
+
+
+class ReadReplicaRouter:
+    """Route ORM reads of `READ_REPLICA_MODELS` to replicas; everything else uses the primary.
+
+    Replicas lag the primary, so a model is only read from them when it opts in
+    (a read-your-writes model such as a session or a job row must not).
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label in READ_REPLICA_MODELS:
+            return select_read_database()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
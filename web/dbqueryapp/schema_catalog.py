@@ -0,0 +1,325 @@
+"""
+Compact, cached description of the loaded HCAD tables for clients and the LLM agent.
+
+The catalog lists every table ingest has loaded (tables with a `records_year`
+column, ingest's own bookkeeping tables excluded) with:
+- its key columns, as suggested by the codebook and recorded by ingest in
+  `TABLE_KEYS_TABLE` (`acct` when the codebook has none), plus `records_year`;
+- the records years and row count profiled by ingest (`COLUMN_STATS_TABLE`);
+- per column: type, whether it is a key, the distinct estimate and null ratio
+  of the latest profiled year and a few sample values from the first rows.
+
+Building it reads `information_schema` and the ingest metadata once per data
+generation. The result is kept in the Django cache, shared by every process,
+and memoized per process, so serving it costs a dictionary lookup; text
+renderings are memoized per generation as well. A new ingest generation
+invalidates both.
+
+`render_catalog_text` renders the catalog for a prompt within a token budget
+(estimated as `SCHEMA_CATALOG_CHARS_PER_TOKEN` characters per token): the most
+detailed of three levels that fits (columns with statistics and samples,
+columns with types, column names only), dropping the last tables if even
+the names do not fit.
+
+Provided helpers:
+- `parse_table_names(values)` — split and validate the optional `table` filter.
+- `fetch_catalog(generation)` — build the catalog from a read database.
+- `get_schema_catalog(loader)` — the cached catalog as a JSON-ready dict.
+- `filter_catalog(catalog, tables)` — the catalog restricted to some tables.
+- `render_catalog_text(catalog, max_tokens)` / `get_catalog_text(max_tokens, tables, loader)`.
+"""
+import logging
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import COLUMN_STATS_TABLE, TABLE_KEYS_TABLE
+from .result_cache import get_data_generation, run_on_read_database_at
+
+logger = logging.getLogger("DjangoApp SchemaCatalog")
+
+SCHEMA_CATALOG_CACHE_TTL = getattr(settings, 'SCHEMA_CATALOG_CACHE_TTL', 60 * 60 * 24)
+SCHEMA_CATALOG_SAMPLE_ROWS = getattr(settings, 'SCHEMA_CATALOG_SAMPLE_ROWS', 50)
+SCHEMA_CATALOG_SAMPLE_VALUES = getattr(settings, 'SCHEMA_CATALOG_SAMPLE_VALUES', 3)
+SCHEMA_CATALOG_TEXT_TOKENS = getattr(settings, 'SCHEMA_CATALOG_TEXT_TOKENS', 2000)
+SCHEMA_CATALOG_MAX_TEXT_TOKENS = getattr(settings, 'SCHEMA_CATALOG_MAX_TEXT_TOKENS', 32000)
+SCHEMA_CATALOG_CHARS_PER_TOKEN = 4
+# Sample values are cut to this many characters.
+SAMPLE_VALUE_LENGTH = 40
+# Text renderings memoized per generation and process before the memo is cleared.
+TEXT_MEMO_SIZE = 128
+
+_TABLE_RE = re.compile(r'^[A-Za-z0-9_]{1,63}$')
+
+# Columns of every loaded relation in the current schema that has a records_year column,
+# ingest's bookkeeping (ingest_*) and dictionary (<table>__<column>_codes) tables excluded.
+COLUMNS_SQL = """
+    SELECT c.table_name, c.column_name, c.data_type
+    FROM information_schema.columns c
+    WHERE c.table_schema = current_schema()
+      AND left(c.table_name, 7) <> 'ingest_' AND strpos(c.table_name, '__') = 0
+      AND EXISTS (SELECT 1 FROM information_schema.columns y
+                  WHERE y.table_schema = c.table_schema AND y.table_name = c.table_name
+                    AND y.column_name = 'records_year')
+    ORDER BY c.table_name, c.ordinal_position
+"""
+# Latest profiled statistics of each column, and the rows of each profiled year.
+COLUMN_STATS_SQL = f"""
+    SELECT DISTINCT ON (table_name, column_name) table_name, column_name, row_count, null_count, distinct_estimate
+    FROM {COLUMN_STATS_TABLE}
+    ORDER BY table_name, column_name, records_year DESC
+"""
+YEAR_ROWS_SQL = f"""
+    SELECT table_name, records_year, max(row_count) FROM {COLUMN_STATS_TABLE}
+    GROUP BY table_name, records_year ORDER BY table_name, records_year
+"""
+
+_memo_lock = threading.Lock()
+_catalog_memo: Tuple[Optional[int], Optional[Dict[str, Any]]] = (None, None)
+_text_memo: Dict[Tuple[int, int, Tuple[str, ...]], str] = {}
+
+
+class CatalogError(ValueError):
+    """Invalid catalog request parameters; the message is safe to show to the user."""
+
+
+def parse_table_names(values: Iterable[str]) -> Tuple[str, ...]:
+    """Accept repeated and/or comma-separated table names, keeping first-seen order; () means all."""
+    tables: List[str] = []
+    for value in values:
+        for table in value.split(','):
+            table = table.strip()
+            if not table:
+                continue
+            if not _TABLE_RE.match(table):
+                raise CatalogError(f"Invalid table name: {table[:63]!r}")
+            if table not in tables:
+                tables.append(table)
+    return tuple(tables)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sample_values(description, rows) -> Dict[str, List[str]]:
+    """Up to SCHEMA_CATALOG_SAMPLE_VALUES distinct non-empty values per column, in row order."""
+    samples: Dict[str, List[str]] = {}
+    for index, column in enumerate(col[0] for col in description):
+        values: List[str] = []
+        for row in rows:
+            value = row[index]
+            if value is None or value == '':
+                continue
+            value = str(value)[:SAMPLE_VALUE_LENGTH]
+            if value not in values:
+                values.append(value)
+                if len(values) == SCHEMA_CATALOG_SAMPLE_VALUES:
+                    break
+        samples[column] = values
+    return samples
+
+
+def _regclass_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    return cursor.fetchone()[0] is not None
+
+
+def fetch_catalog(generation: int = 0) -> Dict[str, Any]:
+    """Read tables, columns, keys, profiled statistics and sample values from a read database."""
+
+    def fetch(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(COLUMNS_SQL)
+            columns = cursor.fetchall()
+            keys, stats, years = [], [], []
+            if _regclass_exists(cursor, TABLE_KEYS_TABLE):
+                cursor.execute(f"SELECT table_name, key_columns FROM {TABLE_KEYS_TABLE}")
+                keys = cursor.fetchall()
+            if _regclass_exists(cursor, COLUMN_STATS_TABLE):
+                cursor.execute(COLUMN_STATS_SQL)
+                stats = cursor.fetchall()
+                cursor.execute(YEAR_ROWS_SQL)
+                years = cursor.fetchall()
+
+            relations: Dict[str, List[Tuple[str, str]]] = {}
+            for table, column, data_type in columns:
+                relations.setdefault(table, []).append((column, data_type))
+            samples = {}
+            for relation in relations:
+                cursor.execute(f"SELECT * FROM {_quote(relation)} LIMIT {int(SCHEMA_CATALOG_SAMPLE_ROWS)}")
+                samples[relation] = _sample_values(cursor.description or [], cursor.fetchall())
+        return relations, keys, stats, years, samples
+
+    relations, keys, stats, years, samples = run_on_read_database_at(fetch, generation)
+    return build_catalog(relations, dict(keys), stats, years, samples)
+
+
+def build_catalog(
+    relations: Dict[str, List[Tuple[str, str]]],
+    keys: Dict[str, Sequence[str]],
+    stats: Sequence[Tuple[str, str, int, int, int]],
+    years: Sequence[Tuple[str, int, int]],
+    samples: Dict[str, Dict[str, List[str]]],
+) -> Dict[str, Any]:
+    """Assemble the catalog from the rows `fetch_catalog` read."""
+    column_stats = {(table, column): (rows, nulls, distinct) for table, column, rows, nulls, distinct in stats}
+    table_years: Dict[str, List[Tuple[int, int]]] = {}
+    for table, year, rows in years:
+        table_years.setdefault(table, []).append((year, rows))
+
+    tables = []
+    for name in sorted(relations):
+        columns = relations[name]
+        column_names = [column for column, _ in columns]
+        if name in keys:
+            key_columns, key_source = list(keys[name]), 'codebook'
+        else:
+            key_columns, key_source = (['acct'] if 'acct' in column_names else []), 'default'
+        key_columns.append('records_year')
+
+        described = []
+        for column, data_type in columns:
+            rows, nulls, distinct = column_stats.get((name, column), (None, None, None))
+            described.append({
+                'name': column,
+                'type': data_type,
+                'key': column in key_columns,
+                'distinct_estimate': distinct,
+                'null_ratio': round(nulls / rows, 4) if rows else None,
+                'samples': samples.get(name, {}).get(column, []),
+            })
+        profiled = table_years.get(name, [])
+        tables.append({
+            'name': name,
+            'keys': key_columns,
+            'key_source': key_source,
+            'years': [year for year, _ in profiled],
+            'row_count': profiled[-1][1] if profiled else None,
+            'columns': described,
+        })
+    return {'tables': tables}
+
+
+def catalog_cache_key(generation: int) -> str:
+    return f"schema_catalog:{generation}"
+
+
+def get_schema_catalog(loader: Callable[[int], Dict[str, Any]] = fetch_catalog) -> Dict[str, Any]:
+    """Return the catalog of the current data generation, built by `loader(generation)` on a miss.
+
+    The returned dict is shared; callers must not modify it.
+    """
+    global _catalog_memo, _text_memo
+    generation = get_data_generation()
+    with _memo_lock:
+        if _catalog_memo[0] == generation:
+            return _catalog_memo[1]
+
+    catalog = cache.get(catalog_cache_key(generation))
+    if catalog is None:
+        catalog = loader(generation)
+        catalog['generation'] = generation
+        cache.set(catalog_cache_key(generation), catalog, timeout=SCHEMA_CATALOG_CACHE_TTL)
+    with _memo_lock:
+        if _catalog_memo[0] != generation:
+            _catalog_memo, _text_memo = (generation, catalog), {}
+    return catalog
+
+
+def reset_schema_catalog_memo() -> None:
+    """Forget the memoized catalog and renderings so the next call re-reads them (used by tests)."""
+    global _catalog_memo, _text_memo
+    with _memo_lock:
+        _catalog_memo, _text_memo = (None, None), {}
+
+
+def filter_catalog(catalog: Dict[str, Any], tables: Sequence[str] = ()) -> Dict[str, Any]:
+    """The catalog with only the named tables (all when `tables` is empty), in catalog order."""
+    if not tables:
+        return catalog
+    return {**catalog, 'tables': [table for table in catalog['tables'] if table['name'] in tables]}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / SCHEMA_CATALOG_CHARS_PER_TOKEN)
+
+
+def _table_heading(table: Dict[str, Any]) -> str:
+    heading = f"{table['name']} key({', '.join(table['keys'])})"
+    if table['years']:
+        first, last = table['years'][0], table['years'][-1]
+        heading += f" years {first}" if first == last else f" years {first}-{last}"
+    if table['row_count'] is not None:
+        heading += f" ~{table['row_count']} rows/year"
+    return heading
+
+
+def _column_line(column: Dict[str, Any], detailed: bool) -> str:
+    line = f"  {column['name']} {column['type']}{' key' if column['key'] else ''}"
+    if not detailed:
+        return line
+    facts = []
+    if column['distinct_estimate'] is not None:
+        facts.append(f"~{column['distinct_estimate']} distinct")
+    if column['null_ratio']:
+        facts.append(f"{column['null_ratio']:.1%} null")
+    if column['samples']:
+        facts.append('e.g. ' + ' | '.join(column['samples']))
+    return line + (': ' + '; '.join(facts) if facts else '')
+
+
+def _render_table(table: Dict[str, Any], level: int) -> str:
+    if level == 0:
+        return f"{_table_heading(table)}: {', '.join(column['name'] for column in table['columns'])}"
+    lines = [_table_heading(table)] + [_column_line(column, level == 2) for column in table['columns']]
+    return '\n'.join(lines)
+
+
+def render_catalog_text(catalog: Dict[str, Any], max_tokens: int = SCHEMA_CATALOG_TEXT_TOKENS) -> str:
+    """Render the catalog as plain text of at most `max_tokens` estimated tokens."""
+    header = (f"-- HCAD PostgreSQL tables (data generation {catalog.get('generation', 0)}). "
+              "Each table holds every records_year; tables with encoded columns are views that read them as text.")
+    tables = catalog['tables']
+    for level in (2, 1):
+        text = '\n'.join([header] + [_render_table(table, level) for table in tables])
+        if estimate_tokens(text) <= max_tokens:
+            return text
+
+    lines = [header]
+    for index, table in enumerate(tables):
+        line = _render_table(table, 0)
+        remaining = len(tables) - index - 1
+        # room is kept for the note on the tables left out
+        note = [f"-- {remaining} more tables omitted"] if remaining else []
+        if estimate_tokens('\n'.join(lines + [line] + note)) > max_tokens:
+            lines.append(f"-- {remaining + 1} more tables omitted")
+            break
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def get_catalog_text(
+    max_tokens: int = SCHEMA_CATALOG_TEXT_TOKENS,
+    tables: Sequence[str] = (),
+    loader: Callable[[int], Dict[str, Any]] = fetch_catalog,
+) -> str:
+    """Return the rendering of the current catalog, memoized per generation, budget and tables."""
+    catalog = get_schema_catalog(loader)
+    key = (catalog['generation'], max_tokens, tuple(tables))
+    with _memo_lock:
+        text = _text_memo.get(key)
+    if text is not None:
+        return text
+
+    text = render_catalog_text(filter_catalog(catalog, tables), max_tokens)
+    with _memo_lock:
+        if _catalog_memo[0] == catalog['generation']:
+            if len(_text_memo) >= TEXT_MEMO_SIZE:
+                _text_memo.clear()
+            _text_memo[key] = text
+    return text
@@ -0,0 +1,159 @@
+"""
+Ranked owner-name and address search.
+
+Looks a free-text term up in the columns listed in `SEARCH_FIELDS` (current and
+previous owner names, mailing name, site address) and returns matching
+accounts, best match first. A row matches when the column contains the term
+(`ILIKE '%term%'`, served by the ingest-built trigram index) or contains all of
+its words in any order (full-text match, served by the tsvector index). The
+score is the trigram similarity of the column to the term plus its full-text
+rank; an account's score is that of its best matching row.
+
+Pages are fetched with LIMIT/OFFSET plus one extra row to tell whether a next
+page exists, so no full count is computed. Pages are cached in the Django cache
+under the current ingest data generation, like predefined query results.
+
+Provided helpers:
+- `normalize_search_term(term)` — collapse whitespace and enforce the length limits.
+- `search_sql(with_year)` — the parameterized search statement.
+- `fetch_search_page(term, year, page, page_size, generation)` — run one page on a read database.
+- `search_accounts(term, year, page, page_size, loader)` — cached page as a JSON-ready dict.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import SEARCH_FIELDS, SEARCH_TEXT_CONFIG
+from .result_cache import get_data_generation, run_on_read_database_at
+
+logger = logging.getLogger("DjangoApp Search")
+
+SEARCH_PAGE_SIZE = getattr(settings, 'SEARCH_PAGE_SIZE', 25)
+SEARCH_MAX_PAGE_SIZE = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 100)
+SEARCH_MAX_PAGE = getattr(settings, 'SEARCH_MAX_PAGE', 40)
+SEARCH_MIN_TERM_LENGTH = getattr(settings, 'SEARCH_MIN_TERM_LENGTH', 3)
+SEARCH_MAX_TERM_LENGTH = getattr(settings, 'SEARCH_MAX_TERM_LENGTH', 200)
+SEARCH_CACHE_TTL = getattr(settings, 'SEARCH_CACHE_TTL', 60 * 60)
+
+
+class SearchError(ValueError):
+    """Invalid search parameters; the message is safe to show to the user."""
+
+
+def normalize_search_term(term: Optional[str]) -> str:
+    """Collapse whitespace and check the term is long enough to use the trigram index."""
+    term = ' '.join((term or '').split())
+    if len(term) < SEARCH_MIN_TERM_LENGTH:
+        raise SearchError(f"Search terms must be at least {SEARCH_MIN_TERM_LENGTH} characters.")
+    if len(term) > SEARCH_MAX_TERM_LENGTH:
+        raise SearchError(f"Search terms must be at most {SEARCH_MAX_TERM_LENGTH} characters.")
+    return term
+
+
+def like_pattern(term: str) -> str:
+    """`%term%` with LIKE wildcards in the term escaped (backslash is the default escape)."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _field_sql(field: str, table: str, column: str, with_year: bool) -> str:
+    # The tsvector expression must match the index built by ingest/search_indexes.py exactly.
+    document = f"to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce({column}, ''))"
+    year_filter = " AND records_year = %(year)s" if with_year else ""
+    return f"""
+        SELECT acct, records_year, '{field}' AS field, {column} AS value,
+               similarity({column}, %(term)s) + ts_rank({document}, query) AS score
+        FROM {table}, websearch_to_tsquery('{SEARCH_TEXT_CONFIG}', %(term)s) AS query
+        WHERE ({column} ILIKE %(pattern)s OR {document} @@ query){year_filter}"""
+
+
+def search_sql(with_year: bool = False) -> str:
+    """The search statement; parameters are `term`, `pattern`, `limit`, `offset` and optionally `year`."""
+    matches = "\n        UNION ALL".join(
+        _field_sql(field, table, column, with_year) for field, table, column in SEARCH_FIELDS
+    )
+    return f"""
+        WITH matches AS ({matches}
+        )
+        SELECT acct,
+               MAX(score) AS score,
+               MAX(records_year) AS records_year,
+               jsonb_agg(DISTINCT jsonb_build_object('field', field, 'value', value)) AS matches
+        FROM matches
+        GROUP BY acct
+        ORDER BY score DESC, acct
+        LIMIT %(limit)s OFFSET %(offset)s
+    """
+
+
+def fetch_search_page(term: str, year: Optional[int], page: int, page_size: int, generation: int = 0) -> Dict[str, Any]:
+    """Run one page of the search on a read database that has `generation`, as a JSON-ready dict."""
+    params = {
+        'term': term,
+        'pattern': like_pattern(term),
+        # one extra row tells whether there is a next page
+        'limit': page_size + 1,
+        'offset': (page - 1) * page_size,
+    }
+    if year is not None:
+        # ingest stores every column, records_year included, as text
+        params['year'] = str(year)
+    sql = search_sql(with_year=year is not None)
+
+    def fetch(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    rows = run_on_read_database_at(fetch, generation)
+    results = []
+    for acct, score, records_year, matches in rows[:page_size]:
+        if isinstance(matches, str):
+            matches = json.loads(matches)
+        results.append({
+            'acct': acct,
+            'score': round(float(score), 4),
+            'records_year': records_year,
+            'matches': matches,
+        })
+    return {
+        'query': term,
+        'year': year,
+        'page': page,
+        'page_size': page_size,
+        'has_next': len(rows) > page_size,
+        'results': results,
+    }
+
+
+def search_cache_key(term: str, year: Optional[int], page: int, page_size: int, generation: int) -> str:
+    # ILIKE and the 'simple' text search configuration are case-insensitive, so case is folded for the key
+    digest = hashlib.sha1(json.dumps([term.casefold(), year, page, page_size]).encode('utf-8')).hexdigest()
+    return f"search:{generation}:{digest}"
+
+
+def search_accounts(
+    term: str,
+    year: Optional[int] = None,
+    page: int = 1,
+    page_size: int = SEARCH_PAGE_SIZE,
+    loader: Callable[[str, Optional[int], int, int, int], Dict[str, Any]] = fetch_search_page,
+) -> Dict[str, Any]:
+    """Return a page of search results, from the cache when this data generation already served it.
+
+    `loader(term, year, page, page_size, generation)` runs on a miss; the result carries `cached`.
+    """
+    generation = get_data_generation()
+    key = search_cache_key(term, year, page, page_size, generation)
+    payload = cache.get(key)
+    if payload is not None:
+        return {**payload, 'cached': True}
+
+    payload = loader(term, year, page, page_size, generation)
+    payload['generation'] = generation
+    cache.set(key, payload, timeout=SEARCH_CACHE_TTL)
+    return {**payload, 'cached': False}
@@ -0,0 +1,123 @@
+"""
+Per-column statistics of the loaded tables, as profiled by ingest.
+
+Ingest computes the statistics of every column while parsing each member
+(row and null counts, a HyperLogLog distinct estimate, min/max and, for
+all-numeric columns, the numeric range) and stores them per table and records
+year in `COLUMN_STATS_TABLE` (see ingest/column_stats.py), so serving them
+costs one indexed read and no scan of the tables themselves. Values are those
+of the loaded text, before dictionary encoding. Responses are cached in the
+Django cache under the current ingest data generation.
+
+Provided helpers:
+- `parse_table_name(value)` — validate the optional `table` filter.
+- `fetch_table_stats(table, year, generation)` — read the statistics from a read database.
+- `get_table_stats(table, year, loader)` — cached statistics as a JSON-ready dict.
+"""
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import COLUMN_STATS_TABLE
+from .result_cache import get_data_generation, run_on_read_database_at
+
+logger = logging.getLogger("DjangoApp TableStats")
+
+TABLE_STATS_CACHE_TTL = getattr(settings, 'TABLE_STATS_CACHE_TTL', 60 * 60 * 24)
+
+_TABLE_RE = re.compile(r'^[A-Za-z0-9_]{1,63}$')
+
+
+class TableStatsError(ValueError):
+    """Invalid statistics request parameters; the message is safe to show to the user."""
+
+
+def parse_table_name(value: Optional[str]) -> Optional[str]:
+    """Return the table name, or None when no table was given."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    if not _TABLE_RE.match(value):
+        raise TableStatsError(f"Invalid table name: {value[:63]!r}")
+    return value
+
+
+def stats_sql() -> str:
+    return (
+        "SELECT table_name, records_year, column_name, row_count, null_count, distinct_estimate,"
+        " min_value, max_value, max_length, is_numeric, numeric_min, numeric_max, profiled_at"
+        f" FROM {COLUMN_STATS_TABLE}"
+        " WHERE (%(table)s::text IS NULL OR table_name = %(table)s)"
+        " AND (%(year)s::integer IS NULL OR records_year = %(year)s)"
+        " ORDER BY table_name, records_year, ordinal"
+    )
+
+
+def _column(row) -> Dict[str, Any]:
+    (_, _, name, row_count, null_count, distinct, min_value, max_value, max_length,
+     is_numeric, numeric_min, numeric_max, _) = row
+    return {
+        'name': name,
+        'null_count': null_count,
+        'null_ratio': round(null_count / row_count, 4) if row_count else None,
+        'distinct_estimate': distinct,
+        'min': min_value,
+        'max': max_value,
+        'max_length': max_length,
+        'numeric': {'min': numeric_min, 'max': numeric_max} if is_numeric else None,
+    }
+
+
+def fetch_table_stats(table: Optional[str], year: Optional[int], generation: int = 0) -> Dict[str, Any]:
+    """Read the statistics of one table (or all) for one records year (or all) from a read database."""
+
+    def fetch(conn):
+        with conn.cursor() as cursor:
+            # nothing has been profiled until ingest stores its first statistics
+            cursor.execute("SELECT to_regclass(%s)", [COLUMN_STATS_TABLE])
+            if cursor.fetchone()[0] is None:
+                return []
+            cursor.execute(stats_sql(), {'table': table, 'year': year})
+            return cursor.fetchall()
+
+    tables: List[Dict[str, Any]] = []
+    for row in run_on_read_database_at(fetch, generation):
+        table_name, records_year, row_count, profiled_at = row[0], row[1], row[3], row[12]
+        if not tables or (tables[-1]['table'], tables[-1]['year']) != (table_name, records_year):
+            tables.append({
+                'table': table_name,
+                'year': records_year,
+                'row_count': row_count,
+                'profiled_at': profiled_at.isoformat() if profiled_at is not None else None,
+                'columns': [],
+            })
+        tables[-1]['columns'].append(_column(row))
+    return {'table': table, 'year': year, 'tables': tables}
+
+
+def table_stats_cache_key(table: Optional[str], year: Optional[int], generation: int) -> str:
+    return f"table_stats:{generation}:{table or '*'}:{year or '*'}"
+
+
+def get_table_stats(
+    table: Optional[str] = None,
+    year: Optional[int] = None,
+    loader: Callable[[Optional[str], Optional[int], int], Dict[str, Any]] = fetch_table_stats,
+) -> Dict[str, Any]:
+    """Return the statistics, from the cache when this data generation already served them.
+
+    `loader(table, year, generation)` runs on a miss; the result carries `cached`.
+    """
+    generation = get_data_generation()
+    key = table_stats_cache_key(table, year, generation)
+    payload = cache.get(key)
+    if payload is not None:
+        return {**payload, 'cached': True}
+
+    payload = loader(table, year, generation)
+    payload['generation'] = generation
+    cache.set(key, payload, timeout=TABLE_STATS_CACHE_TTL)
+    return {**payload, 'cached': False}
@@ -0,0 +1,213 @@
+"""
+Per-query telemetry: fingerprint, phase timings, rows and bytes.
+
+Every execution (custom SQL, predefined queries, background jobs, exports) is
+recorded as a `QueryTelemetry` row. Recording is cheap on the request path:
+`record_query` only appends to an in-memory buffer. A daemon thread computes
+the fingerprints and writes the buffered records with `bulk_create` every
+`TELEMETRY_FLUSH_INTERVAL` seconds or once `TELEMETRY_BATCH_SIZE` records are
+pending. When the buffer is full the oldest records are dropped rather than
+slowing requests down.
+
+The fingerprint is a hash of the statement normalized through the sqlglot AST
+with every literal replaced by a placeholder, so `WHERE acct = '1'` and
+`WHERE acct = '2'` aggregate together.
+
+Provided helpers:
+- `QueryTimings` — dict of phase durations in ms with a `phase(name)` timer.
+- `fingerprint_sql(sql)` — (fingerprint, normalized_sql) for a SQL string or parsed expression.
+- `record_query(source, sql, ...)` — queue one execution for writing.
+- `fingerprint_percentiles(since=None, limit=50)` — p50/p95/p99 of total latency per fingerprint.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, FloatField, Max
+from sqlglot import exp, parse_one
+from sqlglot.errors import ParseError
+from sqlglot.expressions import Expression
+
+logger = logging.getLogger("DjangoApp Telemetry")
+
+TELEMETRY_ENABLED = getattr(settings, 'TELEMETRY_ENABLED', True)
+TELEMETRY_DATABASE = getattr(settings, 'TELEMETRY_DATABASE', 'default')
+TELEMETRY_BATCH_SIZE = getattr(settings, 'TELEMETRY_BATCH_SIZE', 200)
+TELEMETRY_FLUSH_INTERVAL = getattr(settings, 'TELEMETRY_FLUSH_INTERVAL', 5.0)
+TELEMETRY_MAX_BUFFER = getattr(settings, 'TELEMETRY_MAX_BUFFER', 10000)
+
+PHASES = ('parse_ms', 'validate_ms', 'execute_ms', 'render_ms')
+
+
+class QueryTimings(dict):
+    """Phase name -> elapsed milliseconds."""
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name] = self.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.get(name) or 0.0 for name in PHASES)
+
+
+def _literal_to_placeholder(node):
+    if isinstance(node, exp.Literal):
+        return exp.Placeholder()
+    return node
+
+
+def fingerprint_sql(sql: Union[str, Expression]) -> Tuple[str, str]:
+    """Return (fingerprint, normalized_sql) with literals replaced by placeholders.
+
+    Unparseable SQL falls back to whitespace-normalized text so it still groups.
+    """
+    try:
+        parsed = parse_one(sql, read='postgres') if isinstance(sql, str) else sql
+        normalized = parsed.transform(_literal_to_placeholder).sql(dialect='postgres', normalize=True)
+    except (ParseError, AttributeError, TypeError, ValueError):
+        normalized = ' '.join(str(sql).split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16], normalized
+
+
+class TelemetryBuffer:
+    """Bounded in-memory buffer flushed to the database by a daemon thread.
+
+    `writer` receives a list of pending record dicts; it defaults to building
+    `QueryTelemetry` objects and calling `bulk_create` on `TELEMETRY_DATABASE`.
+    """
+
+    def __init__(self, writer: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 batch_size: int = TELEMETRY_BATCH_SIZE, flush_interval: float = TELEMETRY_FLUSH_INTERVAL,
+                 max_size: int = TELEMETRY_MAX_BUFFER):
+        self.writer = writer or _write_records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._pending = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(record)
+            pending = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='query-telemetry', daemon=True)
+                self._thread.start()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self._pending)
+            self._pending.clear()
+        return records
+
+    def flush(self) -> int:
+        """Write everything pending; returns the number of records handed to the writer."""
+        records = self._take()
+        if records:
+            try:
+                self.writer(records)
+            except Exception as e:
+                logger.warning("Dropping %d telemetry records: %s", len(records), e)
+        return len(records)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def _write_records(records: List[Dict[str, Any]]) -> None:
+    from .models import QueryTelemetry
+
+    objects = []
+    for record in records:
+        sql = record.pop('sql')
+        record['fingerprint'], record['normalized_sql'] = fingerprint_sql(sql)
+        objects.append(QueryTelemetry(**record))
+    try:
+        QueryTelemetry.objects.using(TELEMETRY_DATABASE).bulk_create(objects, batch_size=TELEMETRY_BATCH_SIZE)
+    finally:
+        # Release this thread's connection (or return it to the pool) between flushes.
+        connections[TELEMETRY_DATABASE].close()
+
+
+_buffer = TelemetryBuffer()
+
+
+def record_query(
+    source: str,
+    sql: Union[str, Expression, None],
+    timings: Optional[QueryTimings] = None,
+    row_count: Optional[int] = None,
+    bytes_serialized: Optional[int] = None,
+    backend: str = 'postgres',
+    error: Optional[str] = None,
+) -> None:
+    """Queue one query execution; the fingerprint is computed by the writer thread."""
+    if not TELEMETRY_ENABLED or not sql:
+        return
+    timings = timings or QueryTimings()
+    record = {name: timings.get(name) for name in PHASES}
+    record.update(
+        sql=sql,
+        source=source,
+        backend=backend,
+        total_ms=timings.total_ms,
+        row_count=row_count,
+        bytes_serialized=bytes_serialized,
+        error=(error or '')[:255],
+    )
+    _buffer.add(record)
+
+
+class Percentile(Aggregate):
+    """PostgreSQL `percentile_cont(fraction) WITHIN GROUP (ORDER BY expression)`."""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    output_field = FloatField()
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def fingerprint_percentiles(since=None, limit: int = 50):
+    """Latency percentiles per fingerprint, slowest p95 first."""
+    from .models import QueryTelemetry
+
+    queryset = QueryTelemetry.objects.using(TELEMETRY_DATABASE)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    return list(
+        queryset.values('fingerprint')
+        .annotate(
+            executions=Count('id'),
+            p50_ms=Percentile('total_ms', 0.5),
+            p95_ms=Percentile('total_ms', 0.95),
+            p99_ms=Percentile('total_ms', 0.99),
+            p95_execute_ms=Percentile('execute_ms', 0.95),
+            avg_rows=Avg('row_count'),
+            avg_bytes=Avg('bytes_serialized'),
+            normalized_sql=Max('normalized_sql'),
+            last_seen=Max('created_at'),
+        )
+        .order_by('-p95_ms')[:limit]
+    )
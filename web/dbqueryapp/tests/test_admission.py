@@ -0,0 +1,116 @@
+import threading
+import time
+from unittest import TestCase
+
+from ..admission import PRIORITY_ADHOC, PRIORITY_PREDEFINED, AdmissionController, AdmissionRejected
+from ..errors import map_exception_to_response
+
+
+def _acquire_in_thread(controller, owner, priority, admitted_order, timeout=2.0):
+    def run():
+        try:
+            controller.acquire(owner, priority, timeout=timeout)
+            admitted_order.append(owner)
+        except AdmissionRejected:
+            admitted_order.append(f"rejected:{owner}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for_queue(controller, depth, limit=2.0):
+    deadline = time.monotonic() + limit
+    while controller.stats()['queued'] < depth:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"queue never reached {depth}")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(TestCase):
+
+    def test_admits_immediately_under_limits(self):
+        controller = AdmissionController(max_concurrent=2, max_per_owner=2, max_queue=5, timeout=1)
+        with controller.admit('a'):
+            stats = controller.stats()
+            self.assertEqual(stats['running'], 1)
+            self.assertEqual(stats['admitted'], {'adhoc': 1})
+        self.assertEqual(controller.stats()['running'], 0)
+
+    def test_owner_cap_rejects_with_owner_limited(self):
+        controller = AdmissionController(max_concurrent=5, max_per_owner=1, max_queue=5, timeout=0.05)
+        controller.acquire('a')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('a')
+        self.assertTrue(ctx.exception.owner_limited)
+        # other owners are unaffected
+        controller.acquire('b')
+        self.assertEqual(controller.stats()['running'], 2)
+
+    def test_global_cap_times_out_as_busy(self):
+        controller = AdmissionController(max_concurrent=1, max_per_owner=1, max_queue=5, timeout=0.05)
+        controller.acquire('a')
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('b')
+        self.assertFalse(ctx.exception.owner_limited)
+        self.assertEqual(controller.stats()['rejected'], {'timeout': 1})
+
+    def test_queue_full_rejects_without_waiting(self):
+        controller = AdmissionController(max_concurrent=1, max_per_owner=1, max_queue=1, timeout=2)
+        controller.acquire('a')
+        order = []
+        waiter = _acquire_in_thread(controller, 'b', PRIORITY_ADHOC, order)
+        _wait_for_queue(controller, 1)
+        started = time.monotonic()
+        with self.assertRaises(AdmissionRejected):
+            controller.acquire('c')
+        self.assertLess(time.monotonic() - started, 1)
+        controller.release('a')
+        waiter.join(2)
+        self.assertEqual(order, ['b'])
+
+    def test_predefined_admitted_ahead_of_adhoc(self):
+        controller = AdmissionController(max_concurrent=1, max_per_owner=5, max_queue=5, timeout=2)
+        controller.acquire('holder')
+        order = []
+        adhoc = _acquire_in_thread(controller, 'adhoc', PRIORITY_ADHOC, order)
+        _wait_for_queue(controller, 1)
+        predefined = _acquire_in_thread(controller, 'predefined', PRIORITY_PREDEFINED, order)
+        _wait_for_queue(controller, 2)
+        self.assertEqual(controller.stats()['queued_by_priority'], {'adhoc': 1, 'predefined': 1})
+
+        controller.release('holder')
+        predefined.join(2)
+        self.assertEqual(order, ['predefined'])
+        controller.release('predefined')
+        adhoc.join(2)
+        self.assertEqual(order, ['predefined', 'adhoc'])
+
+    def test_owner_at_cap_does_not_block_other_waiters(self):
+        controller = AdmissionController(max_concurrent=2, max_per_owner=1, max_queue=5, timeout=2)
+        controller.acquire('a')
+        controller.acquire('b')
+        order = []
+        blocked = _acquire_in_thread(controller, 'a', PRIORITY_PREDEFINED, order, timeout=0.5)
+        _wait_for_queue(controller, 1)
+        other = _acquire_in_thread(controller, 'c', PRIORITY_ADHOC, order)
+        _wait_for_queue(controller, 2)
+
+        # a slot frees up but 'a' is still at its cap, so 'c' goes first despite lower priority
+        controller.release('b')
+        other.join(2)
+        self.assertEqual(order, ['c'])
+        blocked.join(2)
+        self.assertEqual(order, ['c', 'rejected:a'])
+        self.assertEqual(controller.stats()['rejected'], {'owner_timeout': 1})
+
+
+class AdmissionErrorMappingTests(TestCase):
+
+    def test_owner_limited_maps_to_429(self):
+        status, _, level = map_exception_to_response(AdmissionRejected("limit", owner_limited=True))
+        self.assertEqual((status, level), (429, 'WARNING'))
+
+    def test_busy_maps_to_503(self):
+        status, msg, _ = map_exception_to_response(AdmissionRejected("busy"))
+        self.assertEqual((status, msg), (503, "busy"))
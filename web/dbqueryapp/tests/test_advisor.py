@@ -0,0 +1,98 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from .. import advisor
+
+
+def _stats(*rows):
+    return [
+        {'fingerprint': f'fp{i}', 'normalized_sql': sql, 'total_ms': total_ms, 'executions': 1}
+        for i, (sql, total_ms) in enumerate(rows)
+    ]
+
+
+class ColumnUsageTests(TestCase):
+
+    def test_filters_joins_and_group_by_resolve_aliases(self):
+        usage = advisor.column_usage(
+            "SELECT r.state_class, COUNT(*) FROM real_acct r JOIN building_res b ON b.acct = r.acct "
+            "WHERE r.records_year = %s AND b.yr_impr > %s GROUP BY r.state_class"
+        )
+        self.assertEqual(usage['real_acct'], {'eq': ['records_year'], 'range': [], 'join': ['acct'], 'group': ['state_class']})
+        self.assertEqual(usage['building_res'], {'eq': [], 'range': ['yr_impr'], 'join': ['acct'], 'group': []})
+
+    def test_subquery_columns_belong_to_their_own_scope(self):
+        usage = advisor.column_usage(
+            "SELECT acct FROM real_acct WHERE site_addr_1 LIKE 'MAIN%' AND acct IN (SELECT acct FROM owners WHERE name = %s)"
+        )
+        self.assertEqual(usage['real_acct']['eq'], ['acct'])
+        self.assertEqual(usage['real_acct']['range'], ['site_addr_1'])
+        self.assertEqual(usage['owners']['eq'], ['name'])
+
+    def test_only_left_anchored_like_uses_an_index(self):
+        for predicate in ("mailto LIKE %s", "mailto LIKE '%SMITH'", "mailto ILIKE 'SMITH%'"):
+            self.assertEqual(advisor.column_usage(f"SELECT acct FROM real_acct WHERE {predicate}"), {}, predicate)
+
+    def test_cte_names_are_not_tables(self):
+        usage = advisor.column_usage("WITH x AS (SELECT acct FROM real_acct WHERE mailto = %s) SELECT * FROM x WHERE acct = %s")
+        self.assertEqual(list(usage), ['real_acct'])
+
+
+class CandidateTests(TestCase):
+
+    def test_candidates_weighted_by_total_latency(self):
+        candidates = advisor.build_candidates(_stats(
+            ("SELECT * FROM real_acct WHERE mailto = %s", 100.0),
+            ("SELECT * FROM real_acct WHERE mailto = %s AND acct > %s", 5000.0),
+            ("SELECT * FROM real_acct WHERE mailto = %s LIMIT %s", 50.0),
+        ))
+        self.assertEqual([(c.table, c.columns, c.weight) for c in candidates], [
+            ('real_acct', ('mailto', 'acct'), 5000.0),
+            ('real_acct', ('mailto',), 150.0),
+        ])
+        self.assertEqual(set(candidates[1].statements), {'fp0', 'fp2'})
+        self.assertEqual(candidates[0].create_sql(concurrently=True),
+                         "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_real_acct_mailto_acct ON real_acct (mailto, acct)")
+
+    def test_existing_index_prefix_covers_candidate(self):
+        candidates = advisor.build_candidates(_stats(
+            ("SELECT * FROM real_acct WHERE acct = %s", 1.0),
+            ("SELECT * FROM real_acct WHERE mailto = %s", 1.0),
+        ))
+        kept = advisor.drop_covered(candidates, {'real_acct': [('acct', 'records_year')]})
+        self.assertEqual([c.columns for c in kept], [('mailto',)])
+
+    def test_group_by_without_filters_is_a_materialization_candidate(self):
+        rows = _stats(
+            ("SELECT state_class, COUNT(*) FROM real_acct GROUP BY state_class", 900.0),
+            ("SELECT state_class, COUNT(*) FROM real_acct WHERE acct = %s GROUP BY state_class", 10.0),
+        )
+        self.assertEqual([r['fingerprint'] for r in advisor.materialization_candidates(rows)], ['fp0'])
+
+
+class ValidationTests(TestCase):
+
+    def test_generic_sql_numbers_placeholders(self):
+        self.assertEqual(
+            advisor.to_generic_sql("SELECT * FROM t WHERE a = %s AND b > %s"),
+            ("SELECT * FROM t WHERE a = $1 AND b > $2", True),
+        )
+        self.assertEqual(advisor.to_generic_sql("SELECT a FROM t")[1], False)
+
+    def test_improvement(self):
+        candidate = advisor.IndexCandidate('real_acct', ['mailto'])
+        self.assertIsNone(candidate.improvement)
+        candidate.measurements = {'fp0': ('cost', 200.0, 50.0)}
+        self.assertEqual(candidate.improvement, 0.75)
+
+    def test_improvement_compares_each_statement_with_itself(self):
+        candidate = advisor.IndexCandidate('real_acct', ['mailto'])
+        # a large cost dropping by half and a few milliseconds dropping to an eighth
+        candidate.measurements = {'fp0': ('cost', 100000.0, 50000.0), 'fp1': ('ms', 8.0, 1.0)}
+        self.assertAlmostEqual(candidate.improvement, 0.75)
+
+    def test_explain_cost_reads_json_plan(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ([{'Plan': {'Total Cost': 42.5}}],)
+        self.assertEqual(advisor.explain_cost(cursor, "SELECT 1"), 42.5)
+        cursor.execute.assert_called_once_with("EXPLAIN (GENERIC_PLAN, FORMAT JSON) SELECT 1")
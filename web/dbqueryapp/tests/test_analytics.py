@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from .. import analytics
+from ..exporters import PG_INT8, PG_NUMERIC, PG_TEXT, pyarrow_available
+
+
+class TranspileTests(TestCase):
+
+    def test_postgres_cast_syntax_is_translated(self):
+        sql = analytics.transpile_to_duckdb("SELECT CAST(land_val AS NUMERIC), name::text FROM real_acct")
+        self.assertIn('CAST(name AS TEXT)', sql)
+        self.assertIn('DECIMAL', sql)
+
+    def test_type_codes_from_duckdb_description(self):
+        description = [('a', 'BIGINT'), ('b', 'DECIMAL(18,3)'), ('c', 'VARCHAR'), ('d', 'MAP(VARCHAR, INTEGER)')]
+        self.assertEqual(analytics.analytics_type_codes(description), [PG_INT8, PG_NUMERIC, PG_TEXT, PG_TEXT])
+
+
+@skipUnless(analytics.duckdb is not None and pyarrow_available(), "duckdb/pyarrow not installed")
+class SnapshotQueryTests(TestCase):
+
+    def setUp(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.base_dir = tempfile.mkdtemp()
+        for year, rows in ((2024, [('1', 'A1', '100')]), (2025, [('1', 'A1', '150'), ('2', 'B1', '50')])):
+            partition = os.path.join(self.base_dir, 'real_acct', f'records_year={year}')
+            os.makedirs(partition)
+            table = pa.table({name: list(values) for name, values in zip(('acct', 'state_class', 'land_val'), zip(*rows))})
+            pq.write_table(table, os.path.join(partition, 'part-0.parquet'))
+
+        self._patches = [
+            patch.object(analytics, 'ANALYTICS_PARQUET_DIR', self.base_dir),
+            patch.object(analytics, '_database', None),
+            patch.object(analytics, '_registered_tables', set()),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.base_dir)
+
+    def test_group_by_over_partitions(self):
+        self.assertTrue(analytics.analytics_available())
+        result = analytics.execute_analytics(
+            "SELECT records_year, SUM(CAST(land_val AS NUMERIC)) AS total FROM real_acct GROUP BY records_year ORDER BY 1"
+        )
+        self.assertEqual(result.columns, ['records_year', 'total'])
+        self.assertEqual([(year, float(total)) for year, total in result.rows], [(2024, 100.0), (2025, 200.0)])
+        self.assertEqual(result.type_codes[0], PG_INT8)
+
+    def test_files_outside_snapshot_dir_are_not_readable(self):
+        with self.assertRaises(analytics.duckdb.Error):
+            analytics.execute_analytics("SELECT * FROM read_csv('/etc/hostname')")
+
+    def test_tables_added_after_start_are_registered(self):
+        analytics.execute_analytics("SELECT COUNT(*) FROM real_acct")
+        shutil.copytree(os.path.join(self.base_dir, 'real_acct'), os.path.join(self.base_dir, 'building_res'))
+        self.assertEqual(analytics.execute_analytics("SELECT COUNT(*) FROM building_res").rows, [(3,)])
+
+    def test_table_directory_without_files_is_skipped(self):
+        # e.g. the partition directory left by an aborted snapshot
+        os.makedirs(os.path.join(self.base_dir, 'owners', 'records_year=2025'))
+        self.assertEqual(analytics.execute_analytics("SELECT COUNT(*) FROM real_acct").rows, [(3,)])
+        self.assertNotIn('owners', analytics._registered_tables)
+        with self.assertRaises(analytics.duckdb.Error):
+            analytics.execute_analytics("SELECT COUNT(*) FROM owners")
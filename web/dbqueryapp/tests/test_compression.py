@@ -0,0 +1,42 @@
+import gzip
+from unittest import TestCase, skipUnless
+
+from .. import compression
+
+CHUNKS = [f"{i},row-{i}\n".encode() * 50 for i in range(200)]
+
+
+class CompressStreamTests(TestCase):
+
+    def test_gzip_round_trip(self):
+        body = b''.join(compression.compress_stream(iter(CHUNKS), 'gzip'))
+        self.assertEqual(gzip.decompress(body), b''.join(CHUNKS))
+        self.assertLess(len(body), len(b''.join(CHUNKS)))
+
+    def test_empty_stream_is_valid_gzip(self):
+        self.assertEqual(gzip.decompress(b''.join(compression.compress_stream(iter([]), 'gzip'))), b'')
+
+    @skipUnless(compression.compression_available('zstd'), "zstandard not installed")
+    def test_zstd_round_trip(self):
+        body = b''.join(compression.compress_stream(iter(CHUNKS), 'zstd'))
+        reader = compression.zstandard.ZstdDecompressor().decompressobj()
+        self.assertEqual(reader.decompress(body), b''.join(CHUNKS))
+
+    def test_producer_error_propagates_and_stops_worker(self):
+        def failing():
+            yield b'first'
+            raise RuntimeError("cursor failed")
+
+        stream = compression.compress_stream(failing(), 'gzip')
+        with self.assertRaises(RuntimeError):
+            list(stream)
+
+    def test_closing_early_does_not_hang(self):
+        stream = compression.compress_stream(iter(CHUNKS * 10), 'gzip')
+        next(stream, None)
+        stream.close()
+
+    def test_unknown_method(self):
+        self.assertFalse(compression.compression_available('brotli'))
+        with self.assertRaises(ValueError):
+            list(compression.compress_stream(iter(CHUNKS), 'brotli'))
@@ -0,0 +1,102 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest import TestCase, skipUnless
+from unittest.mock import MagicMock
+
+from .. import exporters
+from ..exporters import PG_DATE, PG_INT4, PG_NUMERIC
+
+COLUMNS = ['id', 'value', 'sold_on', 'name']
+TYPE_CODES = [PG_INT4, PG_NUMERIC, PG_DATE, 25]
+BATCHES = [
+    [(1, Decimal('1.50'), datetime.date(2024, 1, 2), 'a'), (2, None, None, None)],
+    [(3, Decimal('2.25'), datetime.date(2024, 3, 4), 'c')],
+]
+
+
+class StreamingExporterTests(TestCase):
+
+    def test_iter_cursor_batches(self):
+        cursor = MagicMock()
+        cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+        self.assertEqual(list(exporters.iter_cursor_batches(cursor, 2)), [[(1,), (2,)], [(3,)]])
+
+    def test_stream_csv(self):
+        body = b''.join(exporters.stream_csv(COLUMNS, TYPE_CODES, iter(BATCHES))).decode()
+        self.assertEqual(body.splitlines(), [
+            'id,value,sold_on,name',
+            '1,1.50,2024-01-02,a',
+            '2,,,',
+            '3,2.25,2024-03-04,c',
+        ])
+
+    def test_stream_json_matches_row_objects(self):
+        body = b''.join(exporters.stream_json(COLUMNS, TYPE_CODES, iter(BATCHES)))
+        data = json.loads(body)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0], {'id': 1, 'value': '1.50', 'sold_on': '2024-01-02', 'name': 'a'})
+
+    def test_stream_json_empty(self):
+        self.assertEqual(json.loads(b''.join(exporters.stream_json(COLUMNS, TYPE_CODES, iter([])))), [])
+
+
+@skipUnless(exporters.pyarrow_available(), "pyarrow not installed")
+class ArrowExporterTests(TestCase):
+
+    def test_parquet_round_trip_with_mapped_types(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunks = list(exporters.stream_parquet(COLUMNS, TYPE_CODES, iter(BATCHES)))
+        self.assertGreater(len(chunks), 1)  # written batch by batch
+
+        parquet_file = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        table = parquet_file.read()
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.schema.field('id').type, pa.int32())
+        self.assertEqual(table.schema.field('value').type, pa.float64())
+        self.assertEqual(table.schema.field('sold_on').type, pa.date32())
+        self.assertEqual(table.column('value').to_pylist(), [1.5, None, 2.25])
+
+    def test_numeric_precision_from_description(self):
+        import pyarrow as pa
+
+        description = [(name, code, None, None, None, None, None) for name, code in zip(COLUMNS, TYPE_CODES)]
+        description[1] = ('value', PG_NUMERIC, None, None, 10, 2, None)
+        schema, _ = exporters.arrow_schema(COLUMNS, TYPE_CODES, description)
+        self.assertEqual(schema.field('value').type, pa.decimal128(10, 2))
+
+    def test_arrow_ipc_round_trip(self):
+        import pyarrow as pa
+
+        body = b''.join(exporters.stream_arrow(COLUMNS, TYPE_CODES, iter(BATCHES)))
+        table = pa.ipc.open_file(io.BytesIO(body)).read_all()
+        self.assertEqual(table.column('name').to_pylist(), ['a', None, 'c'])
+
+
+class SqlExporterTests(TestCase):
+
+    def test_insert_statements_are_batched_across_cursor_batches(self):
+        body = b''.join(exporters.stream_sql(COLUMNS, TYPE_CODES, iter(BATCHES), rows_per_statement=2)).decode()
+        self.assertEqual(body.count('INSERT INTO result_table (id, value, sold_on, name) VALUES'), 2)
+        self.assertIn("  (1, 1.50, '2024-01-02', 'a'),\n  (2, NULL, NULL, NULL);", body)
+        self.assertTrue(body.endswith("(3, 2.25, '2024-03-04', 'c');\n"))
+
+    def test_literals_follow_column_types(self):
+        body = b''.join(exporters.stream_sql(
+            ['flag', 'note'], [exporters.PG_BOOL, 25], iter([[(True, "it's"), (False, '7')]]),
+        )).decode()
+        self.assertIn("  (TRUE, 'it''s'),\n  (FALSE, '7');", body)
+
+    def test_copy_mode_escapes_text_format(self):
+        batches = [[(1, Decimal('1.50'), None, 'tab\there'), (2, None, None, 'back\\slash\nline')]]
+        body = b''.join(exporters.stream_sql(COLUMNS, TYPE_CODES, iter(batches), mode='copy')).decode()
+        self.assertEqual(body.splitlines(), [
+            'COPY result_table (id, value, sold_on, name) FROM stdin;',
+            '1\t1.50\t\\N\ttab\\there',
+            '2\t\\N\t\\N\tback\\\\slash\\nline',
+            '\\.',
+        ])
@@ -0,0 +1,92 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from .. import jobs
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _mock_connection(rows, pid=4242):
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (pid,)
+    remaining = list(rows)
+
+    def fetchmany(size):
+        batch = remaining[:size]
+        del remaining[:size]
+        return batch
+
+    rows_cursor = MagicMock()
+    rows_cursor.description = [('id',), ('name',)]
+    rows_cursor.fetchmany.side_effect = fetchmany
+    conn = MagicMock(alias='default')
+    conn.cursor.return_value.__enter__.return_value = cursor
+    conn.chunked_cursor.return_value.__enter__.return_value = rows_cursor
+    return conn, cursor
+
+
+def _patch_db(conn):
+    """Route jobs' database access to `conn`."""
+    handler = MagicMock()
+    handler.__getitem__.return_value = conn
+    return patch.multiple(jobs, connections=handler, run_on_read_database=lambda fn: fn(conn))
+
+
+class QueryJobTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self._override.disable()
+
+    def test_run_job_records_first_page(self):
+        rows = [(i, f"name-{i}") for i in range(jobs.QUERY_JOB_PAGE_SIZE + 5)]
+        conn, cursor = _mock_connection(rows)
+        with _patch_db(conn), \
+                patch.object(jobs, '_get_executor') as get_executor:
+            job_id = jobs.submit_query_job('SELECT 1', owner='session-a')
+            submitted = get_executor.return_value.submit.call_args[0]
+            submitted[0](*submitted[1:])
+
+        job = jobs.get_job(job_id)
+        self.assertEqual(job['status'], jobs.JOB_DONE)
+        self.assertEqual(job['owner'], 'session-a')
+        self.assertEqual(job['columns'], ['id', 'name'])
+        self.assertEqual(job['row_count'], len(rows))
+        self.assertEqual(len(job['rows']), jobs.QUERY_JOB_PAGE_SIZE)
+        self.assertEqual(job['rows'][-1], [jobs.QUERY_JOB_PAGE_SIZE - 1, f"name-{jobs.QUERY_JOB_PAGE_SIZE - 1}"])
+        self.assertEqual(job['backend_pid'], 4242)
+        self.assertEqual(job['db_alias'], 'default')
+
+    def test_cancel_running_job_cancels_backend(self):
+        conn, cursor = _mock_connection([])
+        with _patch_db(conn), patch.object(jobs, '_get_executor'):
+            job_id = jobs.submit_query_job('SELECT pg_sleep(60)')
+            jobs._update_job(job_id, status=jobs.JOB_RUNNING, db_alias='default', backend_pid=99)
+            self.assertTrue(jobs.cancel_query_job(job_id))
+
+        cursor.execute.assert_called_with("SELECT pg_cancel_backend(%s)", [99])
+        self.assertTrue(jobs.is_cancel_requested(job_id))
+
+    def test_cancel_before_start_skips_execution(self):
+        conn, cursor = _mock_connection([])
+        with _patch_db(conn), patch.object(jobs, '_get_executor'):
+            job_id = jobs.submit_query_job('SELECT 1')
+            jobs.cancel_query_job(job_id)
+            jobs._run_job(job_id, 'SELECT 1')
+
+        self.assertEqual(jobs.get_job(job_id)['status'], jobs.JOB_CANCELLED)
+        cursor.execute.assert_not_called()
+
+    def test_cancel_finished_job_is_noop(self):
+        with patch.object(jobs, '_get_executor'):
+            job_id = jobs.submit_query_job('SELECT 1')
+        jobs._update_job(job_id, status=jobs.JOB_DONE)
+        self.assertFalse(jobs.cancel_query_job(job_id))
+        self.assertFalse(jobs.cancel_query_job('missing-job'))
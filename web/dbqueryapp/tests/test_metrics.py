@@ -0,0 +1,31 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from .. import metrics
+
+
+class PoolMetricsTests(TestCase):
+
+    def _connections(self, wrappers):
+        handler = MagicMock()
+        handler.__iter__.return_value = iter(wrappers)
+        handler.__getitem__.side_effect = wrappers.__getitem__
+        return handler
+
+    def test_pool_stats_with_average_wait(self):
+        pool = MagicMock()
+        pool.get_stats.return_value = {'pool_size': 4, 'requests_num': 4, 'requests_wait_ms': 10}
+        wrappers = {'default': MagicMock(pool=pool), 'replica': MagicMock(pool=None)}
+
+        with patch.object(metrics, 'connections', self._connections(wrappers)):
+            result = metrics.get_pool_metrics()
+
+        self.assertEqual(list(result), ['default'])
+        self.assertEqual(result['default']['pool_size'], 4)
+        self.assertEqual(result['default']['avg_wait_ms'], 2.5)
+
+    def test_no_requests_reports_zero_wait(self):
+        pool = MagicMock()
+        pool.get_stats.return_value = {'pool_size': 1}
+        with patch.object(metrics, 'connections', self._connections({'default': MagicMock(pool=pool)})):
+            self.assertEqual(metrics.get_pool_metrics()['default']['avg_wait_ms'], 0.0)
@@ -0,0 +1,138 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+from .. import profiles, views
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ParseAccountNumbersTests(TestCase):
+
+    def test_repeated_and_comma_separated_deduplicated(self):
+        self.assertEqual(profiles.parse_account_numbers(['1, 2', '3', '2']), ['1', '2', '3'])
+
+    def test_rejects_empty_invalid_and_too_many(self):
+        with self.assertRaises(profiles.ProfileError):
+            profiles.parse_account_numbers([' , '])
+        with self.assertRaises(profiles.ProfileError):
+            profiles.parse_account_numbers(["1'; DROP"])
+        with self.assertRaises(profiles.ProfileError):
+            profiles.parse_account_numbers([','.join(str(i) for i in range(profiles.PROFILE_MAX_ACCOUNTS + 1))])
+
+
+class FetchProfilesTests(TestCase):
+
+    def setUp(self):
+        profiles.reset_profile_tables_memo()
+
+    def tearDown(self):
+        profiles.reset_profile_tables_memo()
+
+    def _batch_cursor(self, description, rows):
+        cursor = MagicMock()
+        cursor.description = description
+        cursor.fetchall.return_value = rows
+        return cursor
+
+    def test_one_pipelined_query_per_existing_table(self):
+        tables_cursor = MagicMock()
+        tables_cursor.fetchall.return_value = [('real_acct',), ('owners',)]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = tables_cursor
+        raw = conn.connection
+        batch_cursors = [
+            self._batch_cursor([('acct',), ('records_year',), ('mailto',)], [('1', '2025', 'SMITH')]),
+            self._batch_cursor([('acct',), ('records_year',), ('name',)], [('1', '2025', 'A'), ('1', '2025', 'B')]),
+        ]
+        raw.cursor.side_effect = batch_cursors
+
+        with patch.object(profiles, 'run_on_read_database_at', lambda fn, generation: fn(conn)):
+            result = profiles.fetch_profiles(['1', '2'], 2025, generation=4)
+
+        raw.pipeline.assert_called_once()
+        self.assertEqual(
+            [c.execute.call_args[0] for c in batch_cursors],
+            [('SELECT * FROM "real_acct" WHERE acct = ANY(%s) AND records_year = %s', [['1', '2'], '2025']),
+             ('SELECT * FROM "owners" WHERE acct = ANY(%s) AND records_year = %s', [['1', '2'], '2025'])],
+        )
+        self.assertEqual(result['1']['tables'], {
+            'real_acct': [{'mailto': 'SMITH'}],
+            'owners': [{'name': 'A'}, {'name': 'B'}],
+        })
+        self.assertTrue(result['1']['found'])
+        self.assertEqual(result['2'], {'acct': '2', 'year': 2025, 'tables': {}, 'found': False})
+
+    def test_existing_tables_checked_once_per_generation(self):
+        tables_cursor = MagicMock()
+        tables_cursor.fetchall.return_value = []
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = tables_cursor
+        with patch.object(profiles, 'run_on_read_database_at', lambda fn, generation: fn(conn)):
+            profiles.fetch_profiles(['1'], 2025, generation=1)
+            profiles.fetch_profiles(['1'], 2025, generation=1)
+            self.assertEqual(tables_cursor.execute.call_count, 1)
+            profiles.fetch_profiles(['1'], 2025, generation=2)
+        self.assertEqual(tables_cursor.execute.call_count, 2)
+
+
+class ProfileCacheTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self._override.disable()
+
+    def _loader(self):
+        return MagicMock(side_effect=lambda accounts, year, generation: {
+            account: {'acct': account, 'year': year, 'tables': {}, 'found': False} for account in accounts
+        })
+
+    def test_only_uncached_accounts_are_fetched(self):
+        loader = self._loader()
+        with patch.object(profiles, 'get_data_generation', return_value=1):
+            profiles.get_account_profiles(['1', '2'], 2025, loader=loader)
+            result, cached = profiles.get_account_profiles(['3', '2', '1'], 2025, loader=loader)
+
+        self.assertEqual([p['acct'] for p in result], ['3', '2', '1'])
+        self.assertEqual(cached, 2)
+        self.assertEqual(loader.call_args_list[1][0], (['3'], 2025, 1))
+
+    def test_new_generation_or_year_misses(self):
+        loader = self._loader()
+        with patch.object(profiles, 'get_data_generation', return_value=1):
+            profiles.get_account_profiles(['1'], 2025, loader=loader)
+            profiles.get_account_profiles(['1'], 2024, loader=loader)
+        with patch.object(profiles, 'get_data_generation', return_value=2):
+            profiles.get_account_profiles(['1'], 2025, loader=loader)
+        self.assertEqual(loader.call_count, 3)
+
+
+class AccountProfilesViewTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('year=2025', 'acct=1', 'acct=1&year=x', 'acct=%27&year=2025'):
+            response = views.account_profiles(self.factory.get(f'/accounts/profiles/?{query}'))
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_profiles_returned_in_request_order(self):
+        request = self.factory.get('/accounts/profiles/?acct=2,1&year=2025')
+        request.user = MagicMock(is_authenticated=True, pk=1)
+        found = [{'acct': '2'}, {'acct': '1'}]
+        with patch.object(views, 'get_account_profiles', return_value=(found, 2)) as get_profiles, \
+                patch.object(views, 'record_query') as record_query:
+            response = views.account_profiles(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'year': 2025, 'cached': 2, 'profiles': found})
+        self.assertEqual(get_profiles.call_args[0], (['2', '1'], 2025))
+        record_query.assert_not_called()
@@ -0,0 +1,79 @@
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from .. import result_cache
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ResultCacheTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+        result_cache.reset_data_generation_memo()
+
+    def tearDown(self):
+        self._override.disable()
+        result_cache.reset_data_generation_memo()
+
+    def test_encode_round_trip(self):
+        value = ('SELECT 1', [{'avg': Decimal('1.50'), 'name': 'A1'}], None)
+        blob = result_cache.encode_result(value)
+        self.assertIsInstance(blob, bytes)
+        self.assertEqual(result_cache.decode_result(blob), value)
+
+    def test_loader_runs_once_per_generation(self):
+        loader = MagicMock(return_value=('SELECT 1', [{'a': 1}], None))
+        with patch.object(result_cache, 'get_data_generation', return_value=3):
+            first = result_cache.get_cached_predefined_result('q', loader)
+            second = result_cache.get_cached_predefined_result('q', loader)
+        self.assertEqual(first, second)
+        loader.assert_called_once_with('q', 3)
+
+        with patch.object(result_cache, 'get_data_generation', return_value=4):
+            result_cache.get_cached_predefined_result('q', loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        loader = MagicMock(return_value=('SELECT 1', None, 'boom'))
+        with patch.object(result_cache, 'get_data_generation', return_value=1):
+            result_cache.get_cached_predefined_result('q', loader)
+            result_cache.get_cached_predefined_result('q', loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_generation_memoized_and_defaults_to_zero(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = Exception('relation does not exist')
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        with patch.object(result_cache, 'connection', conn):
+            self.assertEqual(result_cache.get_data_generation(), 0)
+            self.assertEqual(result_cache.get_data_generation(), 0)
+        cursor.execute.assert_called_once()
+
+
+class ReadDatabaseAtGenerationTests(TestCase):
+
+    def _connection(self, alias, generation):
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [('ingest_data_generation',), (generation,)]
+        conn = MagicMock(alias=alias)
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return conn
+
+    def test_replica_that_replayed_the_generation_serves_the_load(self):
+        replica = self._connection('replica', 5)
+        with patch.object(result_cache, 'run_on_read_database', lambda fn: fn(replica)):
+            self.assertEqual(result_cache.run_on_read_database_at(lambda conn: conn.alias, 5), 'replica')
+
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        replica, primary = self._connection('replica', 4), MagicMock(alias='default')
+        with patch.object(result_cache, 'run_on_read_database', lambda fn: fn(replica)), \
+                patch.object(result_cache, 'connections', {'default': primary}):
+            self.assertEqual(result_cache.run_on_read_database_at(lambda conn: conn.alias, 5), 'default')
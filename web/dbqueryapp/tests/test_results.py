@@ -0,0 +1,76 @@
+import datetime
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from ..results import QueryResult
+from ..utils import generate_export_sql
+
+
+class QueryResultTests(TestCase):
+
+    def test_from_cursor_keeps_row_tuples(self):
+        cursor = MagicMock()
+        cursor.description = [('acct', 25, None), ('land_val', 1700, None)]
+        rows = [('001', Decimal('10.50')), ('002', None)]
+        cursor.fetchall.return_value = rows
+
+        result = QueryResult.from_cursor(cursor)
+
+        self.assertEqual(result.columns, ['acct', 'land_val'])
+        self.assertEqual(result.type_codes, [25, 1700])
+        self.assertIs(result.rows, rows)
+        self.assertEqual(len(result), 2)
+        self.assertTrue(result)
+
+    def test_empty_result_is_falsy(self):
+        self.assertFalse(QueryResult(['a'], []))
+
+    def test_to_serializable_converts_whole_columns(self):
+        result = QueryResult(
+            ['acct', 'value', 'sold_on'],
+            [('1', Decimal('1.10'), datetime.date(2024, 5, 1)), ('2', None, None)],
+        )
+        converted = result.to_serializable()
+        self.assertEqual(converted.rows, [('1', '1.10', '2024-05-01'), ('2', None, None)])
+        # untouched source result
+        self.assertIsInstance(result.rows[0][1], Decimal)
+
+    def test_to_serializable_converts_values_nested_in_arrays_and_json(self):
+        result = QueryResult(
+            ['acct', 'values', 'doc'],
+            [('1', [Decimal('1.5'), None], {'sold': [datetime.date(2024, 5, 1)], 'val': Decimal('2')}),
+             ('2', None, {'note': 'x'})],
+        )
+        converted = result.to_serializable()
+        self.assertEqual(converted.rows, [
+            ('1', ['1.5', None], {'sold': ['2024-05-01'], 'val': '2'}),
+            ('2', None, {'note': 'x'}),
+        ])
+
+    def test_to_serializable_reuses_rows_when_nothing_to_convert(self):
+        rows = [(1, 'a'), (2, 'b')]
+        self.assertIs(QueryResult(['id', 'name'], rows).to_serializable().rows, rows)
+
+    def test_session_round_trip(self):
+        result = QueryResult(['id', 'amount'], [(1, Decimal('2.5'))], type_codes=[23, 1700])
+        restored = QueryResult.from_dict(result.to_dict())
+        self.assertEqual(restored.columns, ['id', 'amount'])
+        self.assertEqual(restored.type_codes, [23, 1700])
+        self.assertEqual(list(restored.rows), [(1, '2.5')])
+        self.assertIsNone(QueryResult.from_dict(None))
+
+    def test_iter_dicts_and_from_records(self):
+        records = [{'id': 1, 'name': 'Alice'}, {'id': 2, 'name': 'Bob'}]
+        result = QueryResult.from_records(records)
+        self.assertEqual(result.rows, [(1, 'Alice'), (2, 'Bob')])
+        self.assertEqual(list(result.iter_dicts()), records)
+
+    def test_generate_export_sql_from_query_result(self):
+        result = QueryResult(['id', 'name', 'age'], [(1, 'Alice', None), (2, "O'Brien", 30)])
+        expected = (
+            "INSERT INTO table_name (id, name, age) VALUES\n"
+            "  (1, 'Alice', NULL),\n"
+            "  (2, 'O''Brien', 30);"
+        )
+        self.assertEqual(generate_export_sql(result), expected)
@@ -0,0 +1,93 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.db import OperationalError
+
+from .. import routers
+from ..routers import ReplicaSelector
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReplicaSelectorTests(TestCase):
+
+    def test_no_replicas_uses_primary(self):
+        self.assertEqual(ReplicaSelector([]).select(), 'default')
+
+    def test_round_robin_between_healthy_replicas(self):
+        selector = ReplicaSelector(['r0', 'r1'], lag_probe=lambda alias: 0.0)
+        self.assertEqual([selector.select() for _ in range(4)], ['r0', 'r1', 'r0', 'r1'])
+
+    def test_lagging_replica_skipped(self):
+        lags = {'r0': 120.0, 'r1': 1.0}
+        selector = ReplicaSelector(['r0', 'r1'], max_lag_seconds=30, lag_probe=lags.get)
+        self.assertEqual({selector.select() for _ in range(4)}, {'r1'})
+
+    def test_falls_back_to_primary_when_no_replica_available(self):
+        selector = ReplicaSelector(['r0', 'r1'], lag_probe=lambda alias: None)
+        self.assertEqual(selector.select(), 'default')
+
+    def test_lag_probe_cached_until_interval_elapses(self):
+        clock = FakeClock()
+        probe = MagicMock(return_value=0.0)
+        selector = ReplicaSelector(['r0'], check_interval=5, lag_probe=probe, clock=clock)
+        selector.select()
+        selector.select()
+        self.assertEqual(probe.call_count, 1)
+        clock.now = 6
+        selector.select()
+        self.assertEqual(probe.call_count, 2)
+
+    def test_failed_replica_skipped_until_recheck(self):
+        clock = FakeClock()
+        selector = ReplicaSelector(['r0', 'r1'], check_interval=5, lag_probe=lambda alias: 0.0, clock=clock)
+        selector.mark_failed('r0')
+        self.assertEqual({selector.select() for _ in range(4)}, {'r1'})
+        clock.now = 6
+        self.assertEqual({selector.select() for _ in range(4)}, {'r0', 'r1'})
+
+
+class RunOnReadDatabaseTests(TestCase):
+
+    def test_unreachable_replica_fails_over(self):
+        selector = ReplicaSelector(['r0', 'r1'], lag_probe=lambda alias: 0.0)
+        broken = MagicMock(alias='r0')
+        broken.ensure_connection.side_effect = OperationalError('connection refused')
+        healthy = MagicMock(alias='r1')
+        handler = MagicMock()
+        handler.__getitem__.side_effect = {'r0': broken, 'r1': healthy}.__getitem__
+
+        with patch.multiple(routers, _selector=selector, connections=handler):
+            alias = routers.run_on_read_database(lambda conn: conn.alias)
+
+        self.assertEqual(alias, 'r1')
+        self.assertFalse(selector.is_available('r0'))
+
+    def test_query_errors_are_not_retried(self):
+        selector = ReplicaSelector(['r0', 'r1'], lag_probe=lambda alias: 0.0)
+        fn = MagicMock(side_effect=OperationalError('canceling statement'))
+        with patch.multiple(routers, _selector=selector, connections=MagicMock()):
+            with self.assertRaises(OperationalError):
+                routers.run_on_read_database(fn)
+        fn.assert_called_once()
+
+
+class ReadReplicaRouterTests(TestCase):
+
+    def test_only_listed_models_read_from_replicas(self):
+        selector = ReplicaSelector(['r0'], lag_probe=lambda alias: 0.0)
+        listed = MagicMock()
+        listed._meta.label = 'dbqueryapp.Listed'
+        other = MagicMock()
+        other._meta.label = 'dbqueryapp.Other'
+        router = routers.ReadReplicaRouter()
+        with patch.multiple(routers, _selector=selector, READ_REPLICA_MODELS=frozenset({'dbqueryapp.Listed'})):
+            self.assertEqual(router.db_for_read(listed), 'r0')
+            self.assertEqual(router.db_for_read(other), 'default')
@@ -0,0 +1,175 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+from .. import schema_catalog, views
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _catalog():
+    relations = {
+        'real_acct': [('acct', 'text'), ('records_year', 'bigint'), ('state_class', 'text')],
+        'owners': [('acct', 'text'), ('records_year', 'bigint'), ('ln_num', 'character varying'),
+                   ('name', 'character varying')],
+    }
+    return schema_catalog.build_catalog(
+        relations,
+        {'owners': ['acct', 'ln_num']},
+        [('real_acct', 'acct', 10, 0, 10), ('real_acct', 'state_class', 10, 4, 3)],
+        [('real_acct', 2024, 8), ('real_acct', 2025, 10)],
+        {'real_acct': {'acct': ['0001', '0002'], 'state_class': ['A1']}},
+    )
+
+
+class ParseTableNamesTests(TestCase):
+
+    def test_repeated_and_comma_separated(self):
+        self.assertEqual(schema_catalog.parse_table_names(['owners, real_acct', 'owners', '']),
+                         ('owners', 'real_acct'))
+        self.assertEqual(schema_catalog.parse_table_names([]), ())
+
+    def test_rejects_names_that_are_not_identifiers(self):
+        with self.assertRaises(schema_catalog.CatalogError):
+            schema_catalog.parse_table_names(['real_acct; drop table owners'])
+
+
+class BuildCatalogTests(TestCase):
+
+    def test_columns_with_profiled_statistics(self):
+        tables = {table['name']: table for table in _catalog()['tables']}
+        self.assertEqual(sorted(tables), ['owners', 'real_acct'])
+
+        real_acct = tables['real_acct']
+        self.assertEqual((real_acct['years'], real_acct['row_count']), ([2024, 2025], 10))
+        state_class = real_acct['columns'][2]
+        self.assertEqual(state_class['type'], 'text')
+        self.assertEqual((state_class['distinct_estimate'], state_class['null_ratio']), (3, 0.4))
+        self.assertEqual(state_class['samples'], ['A1'])
+
+    def test_keys_from_the_codebook_or_acct(self):
+        tables = {table['name']: table for table in _catalog()['tables']}
+        self.assertEqual((tables['owners']['keys'], tables['owners']['key_source']),
+                         (['acct', 'ln_num', 'records_year'], 'codebook'))
+        self.assertEqual((tables['real_acct']['keys'], tables['real_acct']['key_source']),
+                         (['acct', 'records_year'], 'default'))
+        self.assertEqual([c['key'] for c in tables['owners']['columns']], [True, True, True, False])
+        self.assertIsNone(tables['owners']['row_count'])
+
+    def test_sample_values_skip_empty_and_repeated_values(self):
+        description = [('acct',), ('name',)]
+        rows = [('1', None), ('1', ''), ('2', 'SMITH'), ('3', 'SMITH'), ('4', 'x' * 100)]
+        with patch.object(schema_catalog, 'SCHEMA_CATALOG_SAMPLE_VALUES', 2):
+            samples = schema_catalog._sample_values(description, rows)
+        self.assertEqual(samples['acct'], ['1', '2'])
+        self.assertEqual(samples['name'], ['SMITH', 'x' * schema_catalog.SAMPLE_VALUE_LENGTH])
+
+
+class RenderCatalogTextTests(TestCase):
+
+    def test_most_detailed_level_that_fits(self):
+        catalog = {**_catalog(), 'generation': 4}
+        detailed = schema_catalog.render_catalog_text(catalog, 10000)
+        self.assertIn('real_acct key(acct, records_year) years 2024-2025', detailed)
+        self.assertIn('  state_class text: ~3 distinct; 40.0% null; e.g. A1', detailed)
+
+        budget = schema_catalog.estimate_tokens(detailed) - 1
+        typed = schema_catalog.render_catalog_text(catalog, budget)
+        self.assertIn('  state_class text\n', typed + '\n')
+        self.assertLessEqual(schema_catalog.estimate_tokens(typed), budget)
+
+    def test_header_names_the_generation(self):
+        header = schema_catalog.render_catalog_text({**_catalog(), 'generation': 4}, 10000).splitlines()[0]
+        self.assertEqual(header, '-- HCAD PostgreSQL tables (data generation 4). Each table holds every records_year; '
+                                 'tables with encoded columns are views that read them as text.')
+        self.assertNotIn("'query'", header)
+
+    def test_tables_dropped_when_names_do_not_fit(self):
+        table = _catalog()['tables'][0]
+        catalog = {'generation': 1, 'tables': [{**table, 'name': f'table_{i}'} for i in range(200)]}
+        text = schema_catalog.render_catalog_text(catalog, 300)
+        self.assertLessEqual(schema_catalog.estimate_tokens(text), 300)
+        self.assertIn('table_0 ', text)
+        self.assertRegex(text.splitlines()[-1], r'^-- \d+ more tables omitted$')
+
+
+class SchemaCatalogCacheTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+        schema_catalog.reset_schema_catalog_memo()
+
+    def tearDown(self):
+        schema_catalog.reset_schema_catalog_memo()
+        self._override.disable()
+
+    def test_built_once_per_generation(self):
+        loader = MagicMock(side_effect=lambda generation: _catalog())
+        with patch.object(schema_catalog, 'get_data_generation', return_value=1):
+            first = schema_catalog.get_schema_catalog(loader)
+            self.assertIs(schema_catalog.get_schema_catalog(loader), first)
+            schema_catalog.reset_schema_catalog_memo()
+            # another process finds it in the shared cache
+            self.assertEqual(schema_catalog.get_schema_catalog(loader), first)
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(first['generation'], 1)
+
+        with patch.object(schema_catalog, 'get_data_generation', return_value=2):
+            self.assertEqual(schema_catalog.get_schema_catalog(loader)['generation'], 2)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_text_memoized_until_the_generation_changes(self):
+        loader = MagicMock(side_effect=lambda generation: _catalog())
+        with patch.object(schema_catalog, 'get_data_generation', return_value=1), \
+                patch.object(schema_catalog, 'render_catalog_text', return_value='text') as render:
+            schema_catalog.get_catalog_text(500, ('owners',), loader)
+            schema_catalog.get_catalog_text(500, ('owners',), loader)
+            schema_catalog.get_catalog_text(800, ('owners',), loader)
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual([t['name'] for t in render.call_args_list[0][0][0]['tables']], ['owners'])
+
+        with patch.object(schema_catalog, 'get_data_generation', return_value=2), \
+                patch.object(schema_catalog, 'render_catalog_text', return_value='text') as render:
+            schema_catalog.get_catalog_text(500, ('owners',), loader)
+        self.assertEqual(render.call_count, 1)
+
+
+class SchemaCatalogViewTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_invalid_parameters_are_rejected(self):
+        response = views.schema_catalog(self.factory.get('/schema/catalog/?table=a-b'))
+        self.assertEqual(response.status_code, 400)
+        for query in ('max_tokens=10', 'max_tokens=x', 'table=a;b'):
+            response = views.schema_catalog_text(self.factory.get(f'/schema/catalog/text/?{query}'))
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', json.loads(response.content))
+
+    def test_catalog_filtered_by_table(self):
+        request = self.factory.get('/schema/catalog/?table=owners')
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        with patch.object(views, 'get_schema_catalog', return_value={**_catalog(), 'generation': 3}):
+            response = views.schema_catalog(request)
+
+        self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content)
+        self.assertEqual(payload['generation'], 3)
+        self.assertEqual([t['name'] for t in payload['tables']], ['owners'])
+
+    def test_text_rendering_served_as_plain_text(self):
+        request = self.factory.get('/schema/catalog/text/?max_tokens=500&table=real_acct')
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        with patch.object(views, 'get_catalog_text', return_value='real_acct ...') as get_catalog_text:
+            response = views.schema_catalog_text(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertEqual(response.content.decode(), 'real_acct ...')
+        self.assertEqual(get_catalog_text.call_args[0][:2], (500, ('real_acct',)))
@@ -0,0 +1,117 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+from .. import search, views
+from ..constants import SEARCH_FIELDS
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class SearchSqlTests(TestCase):
+
+    def test_normalize_collapses_whitespace(self):
+        self.assertEqual(search.normalize_search_term('  john   smith '), 'john smith')
+
+    def test_normalize_rejects_short_and_long_terms(self):
+        with self.assertRaises(search.SearchError):
+            search.normalize_search_term(' ab ')
+        with self.assertRaises(search.SearchError):
+            search.normalize_search_term('x' * (search.SEARCH_MAX_TERM_LENGTH + 1))
+
+    def test_like_pattern_escapes_wildcards(self):
+        self.assertEqual(search.like_pattern('50%_off\\'), '%50\\%\\_off\\\\%')
+
+    def test_sql_covers_every_field_and_binds_the_term(self):
+        sql = search.search_sql()
+        for field, table, column in SEARCH_FIELDS:
+            self.assertIn(f"'{field}' AS field", sql)
+            self.assertIn(f"FROM {table}", sql)
+            self.assertIn(f"to_tsvector('simple', coalesce({column}, ''))", sql)
+        self.assertNotIn('records_year = %(year)s', sql)
+        self.assertIn('records_year = %(year)s', search.search_sql(with_year=True))
+
+
+class FetchSearchPageTests(TestCase):
+
+    def _run_on(self, cursor):
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return lambda fn, generation: fn(conn)
+
+    def test_extra_row_sets_has_next(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [
+            ('1', 1.5, '2025', [{'field': 'owner_name', 'value': 'SMITH JOHN'}]),
+            ('2', 0.75, '2024', '[{"field": "site_address", "value": "1 SMITH ST"}]'),
+            ('3', 0.5, '2025', []),
+        ]
+        with patch.object(search, 'run_on_read_database_at', self._run_on(cursor)):
+            page = search.fetch_search_page('smith', 2025, 2, 2)
+
+        params = cursor.execute.call_args[0][1]
+        self.assertEqual(params, {'term': 'smith', 'pattern': '%smith%', 'limit': 3, 'offset': 2, 'year': '2025'})
+        self.assertTrue(page['has_next'])
+        self.assertEqual([r['acct'] for r in page['results']], ['1', '2'])
+        self.assertEqual(page['results'][1]['matches'], [{'field': 'site_address', 'value': '1 SMITH ST'}])
+
+
+class SearchCacheTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self._override.disable()
+
+    def test_pages_cached_per_generation_and_case_insensitive(self):
+        loader = MagicMock(side_effect=lambda *args: {'results': [], 'has_next': False})
+        with patch.object(search, 'get_data_generation', return_value=1):
+            first = search.search_accounts('Smith', loader=loader)
+            second = search.search_accounts('SMITH', loader=loader)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(loader.call_count, 1)
+
+        with patch.object(search, 'get_data_generation', return_value=2):
+            search.search_accounts('smith', loader=loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        loader = MagicMock(side_effect=RuntimeError('boom'))
+        with patch.object(search, 'get_data_generation', return_value=1):
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    search.search_accounts('smith', loader=loader)
+        self.assertEqual(loader.call_count, 2)
+
+
+class SearchViewTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('q=ab', 'q=smith&page=0', 'q=smith&page_size=x', 'q=smith&year=20'):
+            response = views.search(self.factory.get(f'/search/?{query}'))
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', json.loads(response.content))
+
+    def test_results_returned_as_json(self):
+        request = self.factory.get('/search/?q=smith&year=2025&page=2')
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        payload = {'query': 'smith', 'results': [{'acct': '1'}], 'has_next': False, 'cached': True}
+        with patch.object(views, 'search_accounts', return_value=payload) as search_accounts, \
+                patch.object(views, 'record_query') as record_query:
+            response = views.search(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), payload)
+        args = search_accounts.call_args
+        self.assertEqual(args[0], ('smith', 2025, 2, search.SEARCH_PAGE_SIZE))
+        record_query.assert_not_called()
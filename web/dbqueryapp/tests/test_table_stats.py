@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+from .. import table_stats, views
+from ..admission import AdmissionRejected
+from ..constants import COLUMN_STATS_TABLE
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+PROFILED_AT = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _row(table, year, column, rows, nulls, distinct, lo, hi, numeric=False):
+    return (table, year, column, rows, nulls, distinct, lo, hi, len(hi), numeric,
+            float(lo) if numeric else None, float(hi) if numeric else None, PROFILED_AT)
+
+
+class ParseTableNameTests(TestCase):
+
+    def test_blank_means_every_table(self):
+        self.assertIsNone(table_stats.parse_table_name(None))
+        self.assertIsNone(table_stats.parse_table_name('  '))
+
+    def test_rejects_names_that_are_not_identifiers(self):
+        self.assertEqual(table_stats.parse_table_name(' real_acct '), 'real_acct')
+        for value in ('real_acct; drop', 'real-acct', 'x' * 64):
+            with self.assertRaises(table_stats.TableStatsError):
+                table_stats.parse_table_name(value)
+
+
+class FetchTableStatsTests(TestCase):
+
+    def _run_on(self, cursor):
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return lambda fn, generation: fn(conn)
+
+    def test_rows_grouped_per_table_and_year(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (COLUMN_STATS_TABLE,)
+        cursor.fetchall.return_value = [
+            _row('real_acct', 2024, 'acct', 10, 0, 10, '0001', '0010', numeric=True),
+            _row('real_acct', 2024, 'state_class', 10, 4, 3, 'A1', 'XV'),
+            _row('real_acct', 2025, 'acct', 0, 0, 0, None, '', numeric=False),
+        ]
+        with patch.object(table_stats, 'run_on_read_database_at', self._run_on(cursor)):
+            payload = table_stats.fetch_table_stats('real_acct', None)
+
+        self.assertEqual(cursor.execute.call_args[0][1], {'table': 'real_acct', 'year': None})
+        self.assertEqual([(t['table'], t['year'], t['row_count']) for t in payload['tables']],
+                         [('real_acct', 2024, 10), ('real_acct', 2025, 0)])
+        acct, state_class = payload['tables'][0]['columns']
+        self.assertEqual(acct['numeric'], {'min': 1.0, 'max': 10.0})
+        self.assertEqual((state_class['null_ratio'], state_class['distinct_estimate']), (0.4, 3))
+        self.assertIsNone(state_class['numeric'])
+        self.assertIsNone(payload['tables'][1]['columns'][0]['null_ratio'])
+        self.assertEqual(payload['tables'][0]['profiled_at'], PROFILED_AT.isoformat())
+
+    def test_nothing_profiled_yet(self):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (None,)
+        with patch.object(table_stats, 'run_on_read_database_at', self._run_on(cursor)):
+            payload = table_stats.fetch_table_stats(None, 2025)
+        self.assertEqual(payload['tables'], [])
+        self.assertEqual(cursor.execute.call_count, 1)
+
+
+class TableStatsCacheTests(TestCase):
+
+    def setUp(self):
+        self._override = override_settings(CACHES=LOCMEM_CACHE)
+        self._override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self._override.disable()
+
+    def test_cached_per_generation(self):
+        loader = MagicMock(side_effect=lambda table, year, generation: {'table': table, 'year': year, 'tables': []})
+        with patch.object(table_stats, 'get_data_generation', return_value=1):
+            first = table_stats.get_table_stats('real_acct', 2025, loader=loader)
+            second = table_stats.get_table_stats('real_acct', 2025, loader=loader)
+            table_stats.get_table_stats(None, 2025, loader=loader)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(loader.call_count, 2)
+
+        with patch.object(table_stats, 'get_data_generation', return_value=2):
+            table_stats.get_table_stats('real_acct', 2025, loader=loader)
+        self.assertEqual(loader.call_count, 3)
+
+
+class TableStatsViewTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_invalid_parameters_are_rejected(self):
+        for query in ('table=a-b', 'year=20', 'table=real_acct&year=x'):
+            response = views.table_stats(self.factory.get(f'/tables/stats/?{query}'))
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', json.loads(response.content))
+
+    def test_statistics_returned_as_json(self):
+        request = self.factory.get('/tables/stats/?table=real_acct&year=2025')
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        payload = {'table': 'real_acct', 'year': 2025, 'tables': [], 'cached': True}
+        with patch.object(views, 'get_table_stats', return_value=payload) as get_table_stats:
+            response = views.table_stats(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), payload)
+        self.assertEqual(get_table_stats.call_args[0], ('real_acct', 2025))
+
+    def test_rejected_admission_asks_to_retry(self):
+        request = self.factory.get('/tables/stats/')
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        with patch.object(views, 'get_table_stats', side_effect=AdmissionRejected("busy", retry_after=3)):
+            response = views.table_stats(request)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertIn('error', json.loads(response.content))
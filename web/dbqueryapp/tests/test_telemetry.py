@@ -0,0 +1,89 @@
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from django.apps import apps
+
+from .. import telemetry
+from ..constants import TELEMETRY_SOURCE_CUSTOM
+
+
+class FingerprintTests(TestCase):
+
+    def test_literals_do_not_change_fingerprint(self):
+        first, normalized = telemetry.fingerprint_sql("SELECT * FROM real_acct WHERE acct = '1' LIMIT 10")
+        second, _ = telemetry.fingerprint_sql("select *  from real_acct where acct = '2' limit 500")
+        self.assertEqual(first, second)
+        self.assertNotIn("'1'", normalized)
+
+    def test_different_shapes_differ(self):
+        first, _ = telemetry.fingerprint_sql("SELECT acct FROM real_acct")
+        second, _ = telemetry.fingerprint_sql("SELECT acct FROM building_res")
+        self.assertNotEqual(first, second)
+
+    def test_unparseable_sql_still_fingerprints(self):
+        fingerprint, normalized = telemetry.fingerprint_sql("SELEC  1")
+        self.assertEqual(len(fingerprint), 16)
+        self.assertEqual(normalized, "SELEC 1")
+
+
+class QueryTimingsTests(TestCase):
+
+    def test_phases_accumulate_into_total(self):
+        timings = telemetry.QueryTimings()
+        with timings.phase('execute_ms'):
+            pass
+        timings['render_ms'] = 2.0
+        self.assertGreaterEqual(timings['execute_ms'], 0.0)
+        self.assertAlmostEqual(timings.total_ms, timings['execute_ms'] + 2.0)
+
+
+class TelemetryBufferTests(TestCase):
+
+    def test_flush_hands_pending_records_to_writer(self):
+        written = []
+        buffer = telemetry.TelemetryBuffer(writer=written.append, batch_size=100, flush_interval=3600)
+        with patch.object(buffer, '_run'):
+            buffer.add({'sql': 'SELECT 1'})
+            buffer.add({'sql': 'SELECT 2'})
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(written, [[{'sql': 'SELECT 1'}, {'sql': 'SELECT 2'}]])
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_full_buffer_drops_oldest(self):
+        written = []
+        buffer = telemetry.TelemetryBuffer(writer=written.append, batch_size=100, flush_interval=3600, max_size=2)
+        with patch.object(buffer, '_run'):
+            for i in range(3):
+                buffer.add({'i': i})
+        buffer.flush()
+        self.assertEqual(written, [[{'i': 1}, {'i': 2}]])
+        self.assertEqual(buffer.dropped, 1)
+
+    def test_writer_errors_are_swallowed(self):
+        def failing(records):
+            raise RuntimeError("database unavailable")
+
+        buffer = telemetry.TelemetryBuffer(writer=failing, flush_interval=3600)
+        with patch.object(buffer, '_run'):
+            buffer.add({'sql': 'SELECT 1'})
+        self.assertEqual(buffer.flush(), 1)
+
+    def test_record_query_builds_record(self):
+        timings = telemetry.QueryTimings(parse_ms=1.0, execute_ms=4.0)
+        with patch.object(telemetry, '_buffer') as buffer, patch.object(telemetry, 'TELEMETRY_ENABLED', True):
+            telemetry.record_query(TELEMETRY_SOURCE_CUSTOM, 'SELECT 1', timings, row_count=1, bytes_serialized=10)
+        record = buffer.add.call_args[0][0]
+        self.assertEqual(record['total_ms'], 5.0)
+        self.assertEqual(record['execute_ms'], 4.0)
+        self.assertIsNone(record['render_ms'])
+        self.assertEqual(record['source'], 'custom')
+
+
+@skipUnless(apps.ready, "requires the Django app registry (run with manage.py test)")
+class PercentileTests(TestCase):
+
+    def test_percentile_sql(self):
+        from ..models import QueryTelemetry
+
+        queryset = QueryTelemetry.objects.values('fingerprint').annotate(p95=telemetry.Percentile('total_ms', 0.95))
+        self.assertIn('PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY', str(queryset.query))
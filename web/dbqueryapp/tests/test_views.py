@@ -0,0 +1,114 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from django.db import ProgrammingError
+from django.test import RequestFactory
+
+from .. import views
+from ..admission import PRIORITY_PREDEFINED
+from ..results import QueryResult
+from ..constants import DEFAULT_SQL_QUERIES, PREDEFINED_QUERY_SUMMARY_TABLES
+
+
+class PredefinedQueryTests(TestCase):
+
+    def _run_on(self, cursor):
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        return lambda fn, generation: fn(conn)
+
+    def test_summary_table_served_when_available(self):
+        cursor = MagicMock()
+        cursor.description = [('state_class', 25), ('avg_building_value', 1700)]
+        cursor.fetchall.return_value = [('A1', 10)]
+        key = 'get_avg_bldg_and_land_val_by_state_class'
+
+        with patch.object(views, 'run_on_read_database_at', self._run_on(cursor)), \
+                patch.object(views, '_execute_sql') as execute_sql:
+            sql, result, error = views._execute_predefined_sql(key)
+
+        self.assertEqual(sql, f"SELECT * FROM {PREDEFINED_QUERY_SUMMARY_TABLES[key]}")
+        self.assertEqual(result, QueryResult(['state_class', 'avg_building_value'], [('A1', 10)]))
+        self.assertEqual(result.type_codes, [25, 1700])
+        self.assertIsNone(error)
+        execute_sql.assert_not_called()
+
+    def test_missing_summary_table_falls_back_to_live_query(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = ProgrammingError('relation does not exist')
+        key = 'get_avg_bldg_and_land_val_by_state_class'
+
+        with patch.object(views, 'run_on_read_database_at', self._run_on(cursor)), \
+                patch.object(views, '_execute_sql', return_value=([{'x': 1}], None)) as execute_sql:
+            sql, result, error = views._execute_predefined_sql(key)
+
+        execute_sql.assert_called_once_with(DEFAULT_SQL_QUERIES[key], priority=PRIORITY_PREDEFINED, generation=0)
+        self.assertEqual(sql, DEFAULT_SQL_QUERIES[key])
+        self.assertEqual(result, [{'x': 1}])
+
+    def test_query_without_summary_table_runs_live(self):
+        key = 'get_first_100_real_acct'
+        self.assertNotIn(key, PREDEFINED_QUERY_SUMMARY_TABLES)
+        with patch.object(views, '_execute_sql', return_value=([], None)) as execute_sql:
+            sql, result, error = views._execute_predefined_sql(key)
+        execute_sql.assert_called_once_with(DEFAULT_SQL_QUERIES[key], priority=PRIORITY_PREDEFINED, generation=0)
+
+
+class ExportStreamTests(TestCase):
+
+    def test_closing_an_unstarted_stream_releases_once(self):
+        cursor, on_finish = MagicMock(), MagicMock()
+        stream = views._CursorExportStream(iter([b'a']), cursor, 'q1', on_finish=on_finish)
+        stream.close()
+        stream.close()
+        cursor.close.assert_called_once()
+        on_finish.assert_called_once_with(0, 0.0, None)
+
+    def test_finished_stream_reports_bytes(self):
+        cursor, on_finish = MagicMock(), MagicMock()
+        stream = views._CursorExportStream(iter([b'ab', b'c']), cursor, 'q1', on_finish=on_finish)
+        self.assertEqual(b''.join(stream), b'abc')
+        stream.close()
+        cursor.close.assert_called_once()
+        self.assertEqual(on_finish.call_args[0][0], 3)
+        self.assertIsNone(on_finish.call_args[0][2])
+
+    def test_failing_stream_is_truncated_and_reports_the_error(self):
+        def chunks():
+            yield b'a'
+            raise RuntimeError('boom')
+
+        cursor, on_finish = MagicMock(), MagicMock()
+        stream = views._CursorExportStream(chunks(), cursor, 'q1', on_finish=on_finish)
+        self.assertEqual(list(stream), [b'a'])
+        cursor.close.assert_called_once()
+        self.assertIsNotNone(on_finish.call_args[0][2])
+
+    def test_response_close_releases_the_admission_slot(self):
+        request = RequestFactory().get('/export/q1/?format=csv')
+        request.session = {'data': {'q1': {'sql': 'SELECT 1', 'result': None}}}
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        cursor = MagicMock(description=[('a', 23)])
+        controller = MagicMock()
+        with patch.object(views, 'run_on_read_database', return_value=cursor), \
+                patch.object(views.admission, 'controller', controller), \
+                patch.object(views, 'record_query'):
+            response = views.export_results(request, 'q1')
+            controller.release.assert_not_called()
+            response.close()
+        controller.release.assert_called_once()
+        cursor.close.assert_called_once()
+
+    def test_failure_before_streaming_releases_the_admission_slot(self):
+        request = RequestFactory().get('/export/q1/?format=csv')
+        request.session = {'data': {'q1': {'sql': 'SELECT 1', 'result': None}}}
+        request.user = MagicMock(is_authenticated=True, pk=7)
+        cursor = MagicMock(description=None)
+        controller = MagicMock()
+        with patch.object(views, 'run_on_read_database', return_value=cursor), \
+                patch.object(views.admission, 'controller', controller), \
+                patch.object(views, 'record_query'):
+            response = views.export_results(request, 'q1')
+        self.assertEqual(response.status_code, 500)
+        controller.release.assert_called_once()
+        cursor.close.assert_called_once()
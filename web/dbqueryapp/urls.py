@@ -4,4 +4,12 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('export/<str:query_id>/', views.export_results, name='export_results'),
+    path('jobs/<str:job_id>/', views.query_job_status, name='query_job_status'),
+    path('jobs/<str:job_id>/cancel/', views.cancel_job, name='cancel_job'),
+    path('search/', views.search, name='search'),
+    path('accounts/profiles/', views.account_profiles, name='account_profiles'),
+    path('tables/stats/', views.table_stats, name='table_stats'),
+    path('schema/catalog/', views.schema_catalog, name='schema_catalog'),
+    path('schema/catalog/text/', views.schema_catalog_text, name='schema_catalog_text'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
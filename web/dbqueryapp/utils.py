@@ -2,10 +2,10 @@
 Utility helpers for SQL validation, formatting, and safe read-only handling.
 
 Provided helpers:
-- `format_sql_rows(result, columns)` — Convert iterable query results into SQL VALUES tuples.
+- `format_sql_rows(result, columns)` — Convert a `QueryResult` (or list of row dicts) into SQL VALUES tuples.
 - `generate_insert_sql(result, table_name="table_name")` — Produce an INSERT statement intended only for data export.
 - `clean_sql_input(sql)` — Normalize whitespace, unicode spaces, and newlines in SQL input.
-- `validate_sql_with_sqlglot(sql)` — Parse and validate SQL using `sqlglot`, enforcing read-only rules
+- `validate_sql_with_sqlglot(sql, timings=None)` — Parse and validate SQL using `sqlglot`, enforcing read-only rules
     and a configurable nesting depth (`MAX_QUERY_DEPTH` from Django settings).
 - `_compute_query_depth(parsed)` — Internal helper to compute query nesting via sqlglot's scope tree.
 - `generate_unique_query_key()` — UUID-based unique key generator for queries.
@@ -27,7 +27,10 @@ import logging
 from django.conf import settings
 import uuid
 import re
+import time
 from .query_depth import QueryDepthAnalyzer
+from .results import QueryResult
+from .exporters import sql_literal_formatter, format_sql_values, infer_type_codes
 
 logger = logging.getLogger("DjangoApp Utilities Module")
 logger.setLevel(logging.INFO)  # Set default logging level to INFO
@@ -38,27 +41,34 @@ def generate_unique_query_key():
     """Generate a unique query key for cache using UUID."""
     return str(uuid.uuid4())
 
+def _row_values(result, columns):
+    """Return (rows, type_codes) with values in `columns` order from a QueryResult or a list of row dicts."""
+    if isinstance(result, QueryResult):
+        if columns == result.columns:
+            return result.rows, result.type_codes
+        positions = [result.columns.index(col) for col in columns]
+        type_codes = [result.type_codes[i] for i in positions] if result.type_codes else None
+        return [[row[i] for i in positions] for row in result.rows], type_codes
+    return [[row.get(col) for col in columns] for row in result], None
+
 def format_sql_rows(result, columns):
-    """Format rows for SQL export."""
-    rows_out = []
-    for row in result:
-        vals = []
-        for col in columns:
-            v = row.get(col)
-            if v is None:
-                vals.append('NULL')
-            elif isinstance(v, (int, float)):
-                vals.append(str(v))
-            else:
-                s = str(v).replace("'", "''")
-                vals.append(f"'{s}'")
-        rows_out.append('  (' + ', '.join(vals) + ')')
-    return rows_out
+    """Format rows for SQL export, quoting values by column type."""
+    rows, type_codes = _row_values(result, columns)
+    if type_codes is None:
+        type_codes = infer_type_codes(columns, rows)
+    formatters = [sql_literal_formatter(code) for code in type_codes]
+    return format_sql_values(formatters, rows)
 
 
 def generate_export_sql(result, table_name="table_name"):
-    """Generate SQL text for file export."""
-    columns = list(result[0].keys()) if result else []
+    """Generate SQL text for file export from a QueryResult or a list of row dicts.
+
+    Produces a single INSERT statement; use `exporters.stream_sql` for large results.
+    """
+    if isinstance(result, QueryResult):
+        columns = result.columns if result else []
+    else:
+        columns = list(result[0].keys()) if result else []
     if not columns:
         return None  # No columns, return None to indicate empty result
 
@@ -82,7 +92,7 @@ def _compute_query_depth(parsed: Expression) -> int:
     analyzer = QueryDepthAnalyzer()
     return analyzer.compute_from_parsed(parsed)
 
-def validate_sql_with_sqlglot(sql: str) -> Tuple[bool, Optional[str], Optional[Expression]]:
+def validate_sql_with_sqlglot(sql: str, timings: Optional[dict] = None) -> Tuple[bool, Optional[str], Optional[Expression]]:
     """
     Validate a parsed SQL Expression and enforce read-only and complexity constraints.
 
@@ -96,11 +106,14 @@ def validate_sql_with_sqlglot(sql: str) -> Tuple[bool, Optional[str], Optional[E
 
     Args:
         sql (str | sqlglot.Expression): Raw SQL string or already-parsed Expression.
+        timings (dict, optional): If given, receives `parse_ms` and `validate_ms` (see `telemetry.QueryTimings`).
 
     Returns:
         Tuple[bool, Optional[str], Optional[Expression]]: (is_valid, error_message, parsed_expression).
         `parsed_expression` will be None when parsing fails.
     """
+    started = time.perf_counter()
+    parsed_at = started
     try:
         # Input must be a raw SQL string
         if not isinstance(sql, str) or not sql.strip():
@@ -110,6 +123,8 @@ def validate_sql_with_sqlglot(sql: str) -> Tuple[bool, Optional[str], Optional[E
         except ParseError as e:
             logger.error(f"SQL parse failed: {e}")
             return False, f"Invalid SQL syntax: {sql}", None
+        finally:
+            parsed_at = time.perf_counter()
 
         # Check for disallowed operations
         for node in parsed.walk():
@@ -142,4 +157,9 @@ def validate_sql_with_sqlglot(sql: str) -> Tuple[bool, Optional[str], Optional[E
         logger.error(f"Unexpected error during SQL validation: {e}")
         return False, "An unexpected error occurred during SQL validation.", None
 
+    finally:
+        if timings is not None:
+            timings['parse_ms'] = (parsed_at - started) * 1000
+            timings['validate_ms'] = (time.perf_counter() - parsed_at) * 1000
+
     return True, None, parsed
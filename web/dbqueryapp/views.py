@@ -12,39 +12,106 @@ Security Considerations:
 Usage:
 - The `home` view handles user-submitted queries via a form and displays the results in a table format.
 - Ensure that all queries added to `SQL_QUERIES` are pre-approved and safe for execution.
+- Custom queries submitted with "Run in background" are handed to `jobs.submit_query_job`; the page then polls
+  `query_job_status` for the outcome and may call `cancel_query_job` to stop the backend query.
+- Predefined queries listed in `PREDEFINED_QUERY_SUMMARY_TABLES` are served from materialized views refreshed by ingest.
+- All user SQL runs on a read replica chosen by `routers.run_on_read_database`, falling back to the primary.
+- Predefined query results are shared across users through `result_cache`, keyed by the ingest data generation.
+- Custom SQL may instead run on the embedded DuckDB engine over ingest's Parquet snapshots (see `analytics`).
+- Custom SQL, predefined queries and exports pass through `admission.controller`, which caps concurrent
+  queries globally and per user/session and admits predefined queries ahead of ad-hoc SQL.
+- `search` returns ranked owner-name/address matches from the ingest-built trigram and full-text indexes,
+  paginated and cached by data generation (see `search`).
+- `account_profiles` returns every profile table's rows for up to `PROFILE_MAX_ACCOUNTS` accounts in one
+  pipelined batch, cached per account, year and data generation (see `profiles`).
+- `table_stats` returns the per-column statistics ingest profiled while loading (null ratios, distinct
+  estimates, value ranges), cached by data generation (see `table_stats`).
+- `schema_catalog` and `schema_catalog_text` serve the cached catalog of tables, columns, keys and sample values,
+  as JSON or as plain text within a token budget for LLM prompts (see `schema_catalog`).
+- Every execution is recorded by `telemetry.record_query` (fingerprint, phase timings, rows and bytes).
+- `export_results` streams CSV, JSON, SQL (INSERT batches or COPY), Parquet and Arrow IPC downloads from a
+  server-side cursor (see `exporters`), optionally gzip/zstd compressed with `?compress=` (see `compression`).
 """
 
-import csv
-import json
 import logging
-from decimal import Decimal
+import time
 
 from django.shortcuts import render
-from django.db import connection
-from django.http import HttpResponse, HttpRequest
-from io import StringIO
-from django.core.serializers.json import DjangoJSONEncoder
-from .forms import QueryForm, CustomSQLForm
-from .utils import clean_sql_input, generate_export_sql, generate_unique_query_key, validate_sql_with_sqlglot
+from django.db import OperationalError, ProgrammingError
+from django.http import HttpResponse, HttpRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from django.contrib.admin.views.decorators import staff_member_required
+from .forms import BACKEND_ANALYTICS, BACKEND_POSTGRES, QueryForm, CustomSQLForm
+from .utils import clean_sql_input, generate_unique_query_key, validate_sql_with_sqlglot
 from .errors import map_exception_to_response
-from .constants import DEFAULT_SQL_QUERIES
+from .constants import (
+    DEFAULT_SQL_QUERIES,
+    PREDEFINED_QUERY_SUMMARY_TABLES,
+    TELEMETRY_SOURCE_CUSTOM,
+    TELEMETRY_SOURCE_EXPORT,
+    TELEMETRY_SOURCE_PREDEFINED,
+    TELEMETRY_SOURCE_PROFILE,
+    TELEMETRY_SOURCE_SEARCH,
+)
+from .result_cache import get_cached_predefined_result, run_on_read_database_at
+from .jobs import JOB_DONE, cancel_query_job, get_job, submit_query_job
+from .metrics import get_admission_metrics, get_pool_metrics
+from . import admission
+from .admission import PRIORITY_ADHOC, PRIORITY_PREDEFINED, AdmissionRejected
+from .routers import run_on_read_database
+from .results import QueryResult
+from .telemetry import QueryTimings, record_query
+from .analytics import analytics_available, analytics_type_codes, execute_analytics, open_analytics_cursor
+from .search import (
+    SEARCH_MAX_PAGE,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    fetch_search_page,
+    normalize_search_term,
+    search_accounts,
+    search_sql,
+)
+from .profiles import ProfileError, fetch_profiles, get_account_profiles, parse_account_numbers
+from .table_stats import fetch_table_stats, get_table_stats, parse_table_name
+from .schema_catalog import (
+    SCHEMA_CATALOG_MAX_TEXT_TOKENS,
+    SCHEMA_CATALOG_TEXT_TOKENS,
+    fetch_catalog,
+    filter_catalog,
+    get_catalog_text,
+    get_schema_catalog,
+    parse_table_names,
+)
+from .compression import COMPRESSION_METHODS, compress_stream, compression_available
+from .exporters import (
+    EXPORT_FORMATS,
+    SQL_EXPORT_MODES,
+    SQL_EXPORT_ROWS_PER_STATEMENT,
+    iter_cursor_batches,
+    pyarrow_available,
+)
 from sqlglot.errors import ParseError
-from typing import Optional, List, Dict, Any
+from typing import Optional
 
 DEFAULT_QUERY_LIMIT = 1000
-DEFAULT_DOWNLOAD_FORMATS = ['csv', 'json', 'sql']
+DEFAULT_DOWNLOAD_FORMATS = ['csv', 'json', 'sql', 'parquet', 'arrow']
+MAX_SQL_EXPORT_ROWS_PER_STATEMENT = 100000
+# Parquet and Arrow are compressed internally, so `compress` is ignored for them.
+COMPRESSIBLE_FORMATS = ('csv', 'json', 'sql')
 logger = logging.getLogger("DjangoApp")
 
 class RequestQueryData:
-    def __init__(self, sql, result=None):
+    def __init__(self, sql, result: Optional[QueryResult] = None, backend: str = BACKEND_POSTGRES):
         self.sql = sql
         self.result = result
+        self.backend = backend
 
     def to_dict(self):
         """Convert the object to a dictionary for storing in the session."""
         return {
             "sql": self.sql,
-            "result": self.result,
+            "result": self.result.to_dict() if self.result is not None else None,
+            "backend": self.backend,
         }
 
     @classmethod
@@ -52,20 +119,28 @@ class RequestQueryData:
         """Create an object from a dictionary."""
         return cls(
             sql=data.get("sql"),
-            result=data.get("result"),
+            result=QueryResult.from_dict(data.get("result")),
+            backend=data.get("backend", BACKEND_POSTGRES),
         )
 
-def retrieve_cursor_as_dict(cursor):
-    "Return all rows from a cursor as a dict"
-    columns = [col[0] for col in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+def _fetch_all(sql_text):
+    """Return a callable running `sql_text` on a given connection, for `run_on_read_database`."""
+    def fetch(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(sql_text)
+            return QueryResult.from_cursor(cursor)
+    return fetch
+
+def _execute_sql(sql_text, owner=None, priority=PRIORITY_ADHOC, generation=None):
+    """Execute SQL on a read replica (or the primary) once admitted, and return (result, error).
 
-def _execute_sql(sql_text):
-    """Execute SQL and return (result, error)."""
+    With a `generation`, only a replica that has replayed it is used (see `run_on_read_database_at`).
+    """
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(sql_text)
-            return retrieve_cursor_as_dict(cursor), None
+        with admission.controller.admit(owner, priority):
+            if generation is not None:
+                return run_on_read_database_at(_fetch_all(sql_text), generation), None
+            return run_on_read_database(_fetch_all(sql_text)), None
     except Exception as e:
         # Map exception to a safe message for the caller and log appropriately.
         status, msg, level = map_exception_to_response(e)
@@ -75,23 +150,46 @@ def _execute_sql(sql_text):
             logger.warning("SQL execution warning: %s", e)
         return None, msg
 
-def _convert_decimal_to_serializable(obj):
-    """Recursively convert Decimal objects to string in a dictionary or list."""
-    if isinstance(obj, Decimal):
-        return str(obj)  # Convert Decimal to string
-    elif isinstance(obj, dict):
-        return {key: _convert_decimal_to_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_decimal_to_serializable(item) for item in obj]
-    return obj
-
-def _save_data_in_session(request, sql, result, query_id):
+def _execute_analytics_sql(sql, owner=None):
+    """Execute validated SQL on the DuckDB analytics backend once admitted, and return (result, error)."""
+    try:
+        with admission.controller.admit(owner, PRIORITY_ADHOC):
+            return execute_analytics(sql), None
+    except Exception as e:
+        status, msg, level = map_exception_to_response(e)
+        if level == 'ERROR':
+            logger.exception("Error executing analytics SQL: %s", e)
+        else:
+            logger.warning("Analytics SQL warning: %s", e)
+        return None, msg
+
+def _execute_predefined_sql(query_key, generation=0):
+    """Execute a predefined query on a database at `generation` and return (sql_executed, result, error).
+
+    Queries backed by a materialized summary table are read from that table; the
+    live query is used when the summary table has not been created yet.
+    """
+    summary_table = PREDEFINED_QUERY_SUMMARY_TABLES.get(query_key)
+    if summary_table:
+        summary_sql = f"SELECT * FROM {summary_table}"
+        try:
+            with admission.controller.admit(priority=PRIORITY_PREDEFINED):
+                return summary_sql, run_on_read_database_at(_fetch_all(summary_sql), generation), None
+        except (ProgrammingError, OperationalError) as e:
+            # missing or not-yet-populated summary table
+            logger.warning("Summary table %s unavailable, running live query: %s", summary_table, e)
+        except AdmissionRejected as e:
+            logger.warning("Predefined query %s not admitted: %s", query_key, e)
+            return summary_sql, None, map_exception_to_response(e)[1]
+
+    sql = DEFAULT_SQL_QUERIES.get(query_key)
+    result, exec_err = _execute_sql(sql, priority=PRIORITY_PREDEFINED, generation=generation)
+    return sql, result, exec_err
+
+def _save_data_in_session(request, sql, result, query_id, backend=BACKEND_POSTGRES):
     """Store a custom SQL statement and its result in the session using a custom class."""
     logger.debug(f"Saving data in session for query_id: {query_id}")
-    request_data = RequestQueryData(
-        sql=sql,
-        result=_convert_decimal_to_serializable(result)
-    )
+    request_data = RequestQueryData(sql=sql, result=result, backend=backend)
     stored = request.session.get('data', {})
 
     if not isinstance(stored, dict):
@@ -103,14 +201,32 @@ def _save_data_in_session(request, sql, result, query_id):
     request.session['data'] = stored  # Save the updated dictionary back to the session
     request.session.modified = True  # Mark the session as modified
 
+def _session_owner(request) -> str:
+    """Return the session key used to tie background jobs to the submitting session."""
+    if not request.session.session_key:
+        request.session.create()
+    return request.session.session_key
+
+def _admission_owner(request) -> str:
+    """Identify the user (or, for anonymous visitors, the session) for per-owner admission limits."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"session:{_session_owner(request)}"
+
 def home(request: HttpRequest) -> HttpResponse:
-    result: Optional[List[Dict[str, Any]]] = None
+    result: Optional[QueryResult] = None
     error: Optional[str] = None
     form: QueryForm = QueryForm(request.POST or None)
     custom_form: CustomSQLForm = CustomSQLForm(request.POST or None)
     query_id: Optional[str] = None 
+    job_id: Optional[str] = None
     sql: Optional[str] = None
     formatted_sql: Optional[str] = None
+    backend: str = BACKEND_POSTGRES
+    parsed_sql = None
+    timings = QueryTimings()
+    telemetry_source: Optional[str] = None
 
     if request.method == 'POST':
         form_type = request.POST.get('form_type')
@@ -126,12 +242,27 @@ def home(request: HttpRequest) -> HttpResponse:
                     else:
                         try:
                             sql = clean_sql_input(sql)
-                            is_valid, error, parsed_sql = validate_sql_with_sqlglot(sql)
-
-                            if is_valid:
-                                result, exec_err = _execute_sql(sql)
-                                if exec_err:
-                                    error = exec_err
+                            is_valid, error, parsed_sql = validate_sql_with_sqlglot(sql, timings=timings)
+
+                            backend = custom_form.cleaned_data.get('backend') or BACKEND_POSTGRES
+                            if is_valid and backend == BACKEND_ANALYTICS:
+                                # Runs in-process on DuckDB; background jobs only target PostgreSQL.
+                                if not analytics_available():
+                                    error = "The analytics engine is not available on this server."
+                                else:
+                                    telemetry_source = TELEMETRY_SOURCE_CUSTOM
+                                    with timings.phase('execute_ms'):
+                                        result, error = _execute_analytics_sql(parsed_sql, owner=_admission_owner(request))
+                                formatted_sql = parsed_sql.sql(pretty=True) if parsed_sql else sql
+                            elif is_valid:
+                                if custom_form.cleaned_data.get('run_async'):
+                                    job_id = submit_query_job(sql, owner=_session_owner(request))
+                                else:
+                                    telemetry_source = TELEMETRY_SOURCE_CUSTOM
+                                    with timings.phase('execute_ms'):
+                                        result, exec_err = _execute_sql(sql, owner=_admission_owner(request))
+                                    if exec_err:
+                                        error = exec_err
                                 formatted_sql = parsed_sql.sql(pretty=True) if parsed_sql else sql
                         except ParseError as pe:
                             error = f"SQL Parsing Error: {pe}"
@@ -140,12 +271,13 @@ def home(request: HttpRequest) -> HttpResponse:
                 if form.is_valid():
                     logger.debug("Predefined query form submitted.")
                     query_key = form.cleaned_data['query']
-                    sql = DEFAULT_SQL_QUERIES.get(query_key)
 
-                    if not sql:
+                    if not DEFAULT_SQL_QUERIES.get(query_key):
                         error = 'No SQL query found for the selected option.'
                     else:
-                        result, exec_err = _execute_sql(sql)
+                        telemetry_source = TELEMETRY_SOURCE_PREDEFINED
+                        with timings.phase('execute_ms'):
+                            sql, result, exec_err = get_cached_predefined_result(query_key, _execute_predefined_sql)
                         if exec_err:
                             error = exec_err
                         formatted_sql = sql
@@ -156,23 +288,340 @@ def home(request: HttpRequest) -> HttpResponse:
         if sql and result is not None:
             query_id = generate_unique_query_key()
             logger.debug(f"Generated query_id: {query_id} for the executed SQL.")
-            _save_data_in_session(request, sql, result, query_id)
-
-    return render(request, 'home.html', {
-        'form': form,
-        'custom_form': custom_form,
-        'result': result,
-        'error': error,
-        'query_id': query_id,
-        'sql': sql,
-        'formatted_sql': formatted_sql,
-    })
+            _save_data_in_session(request, sql, result, query_id, backend=backend)
+
+    with timings.phase('render_ms'):
+        response = render(request, 'home.html', {
+            'form': form,
+            'custom_form': custom_form,
+            'result': result,
+            'error': error,
+            'query_id': query_id,
+            'job_id': job_id,
+            'sql': sql,
+            'formatted_sql': formatted_sql,
+            'analytics_enabled': analytics_available(),
+        })
+
+    if telemetry_source:
+        record_query(
+            telemetry_source,
+            parsed_sql or sql,
+            timings,
+            row_count=len(result) if result is not None else None,
+            bytes_serialized=len(response.content),
+            backend=backend,
+            error=error,
+        )
+    return response
+
+def _get_owned_job(request, job_id: str):
+    """Return the job record if it exists and belongs to the requesting session."""
+    job = get_job(job_id)
+    if job is None or job.get('owner') != request.session.session_key:
+        return None
+    return job
+
+@require_GET
+def query_job_status(request: HttpRequest, job_id: str) -> JsonResponse:
+    """Report the status of a background query and, once finished, its first page of rows."""
+    job = _get_owned_job(request, job_id)
+    if job is None:
+        return JsonResponse({'error': 'Unknown or expired job.'}, status=404)
+
+    payload = {
+        'job_id': job_id,
+        'status': job.get('status'),
+        'error': job.get('error'),
+        'columns': job.get('columns'),
+        'rows': job.get('rows'),
+        'row_count': job.get('row_count'),
+        'query_id': None,
+    }
+
+    if job.get('status') == JOB_DONE:
+        # The job id doubles as the export key for the finished query.
+        stored = request.session.get('data', {})
+        if not isinstance(stored, dict) or job_id not in stored:
+            result = QueryResult(job['columns'], job['rows'])
+            _save_data_in_session(request, job['sql'], result, job_id)
+        payload['query_id'] = job_id
+
+    return JsonResponse(payload)
+
+@require_POST
+def cancel_job(request: HttpRequest, job_id: str) -> JsonResponse:
+    """Cancel a pending or running background query."""
+    if _get_owned_job(request, job_id) is None:
+        return JsonResponse({'error': 'Unknown or expired job.'}, status=404)
+    return JsonResponse({'job_id': job_id, 'cancelled': cancel_query_job(job_id)})
+
+def _int_param(request, name, default, minimum, maximum):
+    """Read an optional integer query parameter, raising ValueError with a user-facing message."""
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a whole number.")
+    if not minimum <= number <= maximum:
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}.")
+    return number
+
+def _json_error_response(e: Exception, action: str, telemetry=None) -> JsonResponse:
+    """Log a failed JSON endpoint call and map it to an error response.
+
+    `action` completes the log line ("Error <action>: ..."); `telemetry`, a
+    (source, sql, timings) tuple, records the failure. Admission rejections
+    carry Retry-After.
+    """
+    status, msg, level = map_exception_to_response(e)
+    if level == 'ERROR':
+        logger.exception("Error %s: %s", action, e)
+    else:
+        logger.warning("Warning %s: %s", action, e)
+    if telemetry is not None:
+        source, sql, timings = telemetry
+        record_query(source, sql, timings, error=msg)
+    response = JsonResponse({'error': msg}, status=status)
+    if isinstance(e, AdmissionRejected):
+        response['Retry-After'] = str(e.retry_after)
+    return response
+
+@require_GET
+def search(request: HttpRequest) -> JsonResponse:
+    """Search owner names and addresses (`?q=`), returning ranked accounts as JSON.
+
+    Optional parameters: `year` (records year), `page` and `page_size`.
+    """
+    try:
+        term = normalize_search_term(request.GET.get('q'))
+        year = _int_param(request, 'year', None, 1900, 2999)
+        page = _int_param(request, 'page', 1, 1, SEARCH_MAX_PAGE)
+        page_size = _int_param(request, 'page_size', SEARCH_PAGE_SIZE, 1, SEARCH_MAX_PAGE_SIZE)
+    except ValueError as e:
+        # SearchError and _int_param's errors
+        return JsonResponse({'error': str(e)}, status=400)
+
+    owner = _admission_owner(request)
+    timings = QueryTimings()
+
+    def load(term, year, page, page_size, generation):
+        # Search is a fixed, index-backed statement, so it is admitted like a predefined query.
+        with admission.controller.admit(owner, PRIORITY_PREDEFINED), timings.phase('execute_ms'):
+            return fetch_search_page(term, year, page, page_size, generation)
+
+    sql = search_sql(with_year=year is not None)
+    try:
+        payload = search_accounts(term, year, page, page_size, loader=load)
+    except Exception as e:
+        return _json_error_response(e, f"searching for {term!r}", (TELEMETRY_SOURCE_SEARCH, sql, timings))
+
+    if not payload['cached']:
+        record_query(TELEMETRY_SOURCE_SEARCH, sql, timings, row_count=len(payload['results']))
+    return JsonResponse(payload)
+
+@require_GET
+def account_profiles(request: HttpRequest) -> JsonResponse:
+    """Return full property profiles for `?acct=` (repeated or comma-separated) in `?year=` as JSON."""
+    try:
+        accounts = parse_account_numbers(request.GET.getlist('acct'))
+        year = _int_param(request, 'year', None, 1900, 2999)
+        if year is None:
+            raise ProfileError("A records year ('year') is required.")
+    except ValueError as e:
+        # ProfileError and _int_param's errors
+        return JsonResponse({'error': str(e)}, status=400)
+
+    owner = _admission_owner(request)
+    timings = QueryTimings()
+    # Telemetry groups every batch under this statement shape.
+    sql = "SELECT * FROM profile_table WHERE acct = ANY(%s) AND records_year = %s"
+
+    def load(missing, year, generation):
+        with admission.controller.admit(owner, PRIORITY_PREDEFINED), timings.phase('execute_ms'):
+            return fetch_profiles(missing, year, generation)
+
+    try:
+        profiles, cached = get_account_profiles(accounts, year, loader=load)
+    except Exception as e:
+        return _json_error_response(e, f"fetching profiles for {len(accounts)} accounts",
+                                    (TELEMETRY_SOURCE_PROFILE, sql, timings))
+
+    if cached < len(accounts):
+        record_query(TELEMETRY_SOURCE_PROFILE, sql, timings, row_count=len(accounts) - cached)
+    return JsonResponse({'year': year, 'cached': cached, 'profiles': profiles})
+
+@require_GET
+def table_stats(request: HttpRequest) -> JsonResponse:
+    """Return the column statistics ingest stored for `?table=` in `?year=` (both optional) as JSON."""
+    try:
+        table = parse_table_name(request.GET.get('table'))
+        year = _int_param(request, 'year', None, 1900, 2999)
+    except ValueError as e:
+        # TableStatsError and _int_param's errors
+        return JsonResponse({'error': str(e)}, status=400)
+
+    owner = _admission_owner(request)
+
+    def load(table, year, generation):
+        with admission.controller.admit(owner, PRIORITY_PREDEFINED):
+            return fetch_table_stats(table, year, generation)
+
+    try:
+        payload = get_table_stats(table, year, loader=load)
+    except Exception as e:
+        return _json_error_response(e, f"fetching column statistics for {table or 'all tables'}")
+    return JsonResponse(payload)
+
+def _catalog_loader(request):
+    """Build the schema catalog on a cache miss, admitted like a predefined query."""
+    owner = _admission_owner(request)
+
+    def load(generation):
+        with admission.controller.admit(owner, PRIORITY_PREDEFINED):
+            return fetch_catalog(generation)
+    return load
+
+
+@require_GET
+def schema_catalog(request: HttpRequest) -> JsonResponse:
+    """Return the schema catalog as JSON, optionally only for `?table=` (repeated or comma-separated)."""
+    try:
+        tables = parse_table_names(request.GET.getlist('table'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        catalog = get_schema_catalog(loader=_catalog_loader(request))
+    except Exception as e:
+        return _json_error_response(e, "building the schema catalog")
+    return JsonResponse(filter_catalog(catalog, tables))
+
+@require_GET
+def schema_catalog_text(request: HttpRequest) -> HttpResponse:
+    """Return the schema catalog as plain text for a prompt, within `?max_tokens=` estimated tokens.
+
+    Optional parameters: `table` (repeated or comma-separated) and `max_tokens`.
+    """
+    try:
+        tables = parse_table_names(request.GET.getlist('table'))
+        max_tokens = _int_param(request, 'max_tokens', SCHEMA_CATALOG_TEXT_TOKENS, 100, SCHEMA_CATALOG_MAX_TEXT_TOKENS)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        text = get_catalog_text(max_tokens, tables, loader=_catalog_loader(request))
+    except Exception as e:
+        return _json_error_response(e, "building the schema catalog")
+    return HttpResponse(text, content_type='text/plain; charset=utf-8')
+
+@staff_member_required
+@require_GET
+def metrics(request: HttpRequest) -> JsonResponse:
+    """Expose operational metrics (connection pool usage, admission queue and wait times) as JSON."""
+    return JsonResponse({'connection_pools': get_pool_metrics(), 'admission': get_admission_metrics()})
 
 def generate_response(content, content_type, filename):
         response = HttpResponse(content, content_type=content_type)
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
+def generate_streaming_response(chunks, content_type, filename):
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _open_export_cursor(sql_text):
+    """Return a callable opening a server-side cursor for `sql_text`, for `run_on_read_database`."""
+    def open_cursor(conn):
+        cursor = conn.chunked_cursor()
+        try:
+            cursor.execute(sql_text)
+        except Exception:
+            cursor.close()
+            raise
+        return cursor
+    return open_cursor
+
+def _count_rows(batches, counts):
+    """Pass cursor batches through, tallying rows in counts['rows']."""
+    for rows in batches:
+        counts['rows'] += len(rows)
+        yield rows
+
+class _CursorExportStream:
+    """Export chunks that close the server-side cursor once streaming ends.
+
+    `close()` is idempotent and calls `on_finish(bytes_sent, stream_ms, error)`
+    exactly once. StreamingHttpResponse registers it as a resource closer, so it
+    also runs when the response is closed before the stream was ever iterated
+    (a generator's `finally` would not run in that case).
+    """
+
+    def __init__(self, chunks, cursor, query_id, on_finish=None):
+        self._chunks = chunks
+        self._iterator = iter(chunks)
+        self._cursor = cursor
+        self._query_id = query_id
+        self._on_finish = on_finish
+        self._bytes_sent = 0
+        self._error = None
+        self._started = None
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        if self._started is None:
+            self._started = time.perf_counter()
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception as e:
+            # Headers are already sent, so the download is truncated; log for diagnosis.
+            logger.exception("Error streaming export for query_id=%s: %s", self._query_id, e)
+            self._error = map_exception_to_response(e)[1]
+            self.close()
+            raise StopIteration
+        self._bytes_sent += len(chunk)
+        return chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        stream_ms = (time.perf_counter() - self._started) * 1000 if self._started is not None else 0.0
+        try:
+            close_chunks = getattr(self._chunks, 'close', None)
+            if close_chunks is not None:
+                close_chunks()
+        finally:
+            try:
+                self._cursor.close()
+            finally:
+                if self._on_finish is not None:
+                    self._on_finish(self._bytes_sent, stream_ms, self._error)
+
+def _sql_export_options(request):
+    """Parse the SQL export's `sql_mode` and `sql_batch_size` query parameters into (options, error)."""
+    mode = request.GET.get('sql_mode', 'insert')
+    if mode not in SQL_EXPORT_MODES:
+        return None, "Unsupported SQL export mode"
+    try:
+        rows_per_statement = int(request.GET.get('sql_batch_size', SQL_EXPORT_ROWS_PER_STATEMENT))
+    except ValueError:
+        return None, "Invalid SQL batch size"
+    if not 1 <= rows_per_statement <= MAX_SQL_EXPORT_ROWS_PER_STATEMENT:
+        return None, f"SQL batch size must be between 1 and {MAX_SQL_EXPORT_ROWS_PER_STATEMENT}"
+    return {'table_name': 'result_table', 'mode': mode, 'rows_per_statement': rows_per_statement}, None
+
 def export_results(request, query_id: Optional[str] = None) -> HttpResponse:
     """Export the results of a predefined or custom SQL query using the session_id."""
     format = request.GET.get('format', 'csv')  # Default to CSV
@@ -193,39 +642,94 @@ def export_results(request, query_id: Optional[str] = None) -> HttpResponse:
     else: 
         session_data = RequestQueryData.from_dict(session_data)
 
+    if format in EXPORT_FORMATS and EXPORT_FORMATS[format][3] and not pyarrow_available():
+        return HttpResponse(f"The {format} format is not available on this server.", status=400)
+
+    compress = request.GET.get('compress') or None
+    if compress is not None:
+        if compress not in COMPRESSION_METHODS:
+            return HttpResponse("Unsupported compression", status=400)
+        if not compression_available(compress):
+            return HttpResponse(f"{compress} compression is not available on this server.", status=400)
+        if format not in COMPRESSIBLE_FORMATS:
+            compress = None
+
+    export_options = {}
+    if format == 'sql':
+        export_options, options_error = _sql_export_options(request)
+        if options_error:
+            return HttpResponse(options_error, status=400)
+
+    timings = QueryTimings()
+    owner = _admission_owner(request)
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(session_data.sql)
-            result = retrieve_cursor_as_dict(cursor)
-    except Exception as e:
+        # The slot is held until the stream finishes, since the cursor keeps running until then.
+        admission.controller.acquire(owner, PRIORITY_ADHOC)
+    except AdmissionRejected as e:
+        status, msg, _ = map_exception_to_response(e)
+        logger.warning("Export for query_id=%s not admitted: %s", query_id, e)
+        response = HttpResponse(msg, status=status)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+
+    def fail(e):
         status, msg, level = map_exception_to_response(e)
         if level == 'ERROR':
             logger.exception("Error exporting results for query_id=%s: %s", query_id, e)
         else:
             logger.warning("Export warning for query_id=%s: %s", query_id, e)
+        record_query(TELEMETRY_SOURCE_EXPORT, session_data.sql, timings, backend=session_data.backend, error=msg)
         return HttpResponse(msg, status=status)
 
-    filename = f"query_result.{format}"
-
-    if format == 'csv':
-        if not result:
-            return generate_response('', 'text/csv', filename)
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=result[0].keys())
-        writer.writeheader()
-        writer.writerows(result)
-        return generate_response(output.getvalue(), 'text/csv', filename)
-
-    elif format == 'json':
-        return generate_response(json.dumps(result, cls=DjangoJSONEncoder), 'application/json', filename)
-
-    elif format == 'sql':
-        if not result:
-            return generate_response('', 'text/plain', filename)
-        sql_text = generate_export_sql(result, 'result_table')
-        if sql_text:
-            return generate_response(sql_text, 'text/plain', filename)
-        else:
-            return generate_response('', 'text/plain', filename)
+    try:
+        with timings.phase('execute_ms'):
+            if session_data.backend == BACKEND_ANALYTICS:
+                cursor = open_analytics_cursor(session_data.sql)
+            else:
+                cursor = run_on_read_database(_open_export_cursor(session_data.sql))
+    except Exception as e:
+        admission.controller.release(owner)
+        return fail(e)
+
+    counts = {'rows': 0}
+
+    def on_finish(bytes_sent, stream_ms, error):
+        admission.controller.release(owner)
+        # Fetching continues while streaming, so the stream time is recorded as the render phase.
+        timings['render_ms'] = stream_ms
+        record_query(
+            TELEMETRY_SOURCE_EXPORT,
+            session_data.sql,
+            timings,
+            row_count=counts['rows'],
+            bytes_serialized=bytes_sent,
+            backend=session_data.backend,
+            error=error,
+        )
 
-    return HttpResponse("Unsupported format", status=400)
+    try:
+        columns = [col[0] for col in cursor.description]
+        if session_data.backend == BACKEND_ANALYTICS:
+            type_codes = analytics_type_codes(cursor.description)
+        else:
+            type_codes = [col[1] for col in cursor.description]
+
+        content_type, extension, exporter, _ = EXPORT_FORMATS[format]
+        batches = _count_rows(iter_cursor_batches(cursor), counts)
+        stream = exporter(columns, type_codes, batches, description=cursor.description, **export_options)
+        if compress is not None:
+            # Served as a .gz/.zst file rather than with Content-Encoding, so clients keep the compressed bytes.
+            stream = compress_stream(stream, compress)
+            content_type, suffix = COMPRESSION_METHODS[compress]
+            extension = f"{extension}.{suffix}"
+    except Exception as e:
+        try:
+            cursor.close()
+        finally:
+            admission.controller.release(owner)
+        return fail(e)
+
+    # From here on the stream owns the cursor and the admission slot; closing the response releases both.
+    return generate_streaming_response(
+        _CursorExportStream(stream, cursor, query_id, on_finish=on_finish), content_type, f"query_result.{extension}"
+    )
@@ -84,6 +84,20 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', None)
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DJANGO_DEBUG', 'False')
 
+# Connection reuse: with POSTGRES_POOL_ENABLED (default) connections come from a psycopg 3
+# connection pool (requires psycopg[pool]); otherwise persistent connections are kept open
+# for POSTGRES_CONN_MAX_AGE seconds. CONN_HEALTH_CHECKS verifies a reused connection before use
+# (for the pool it enables psycopg_pool's check on checkout). Pool statistics, including wait
+# times, are served by the `metrics` endpoint.
+POSTGRES_POOL_ENABLED = os.getenv('POSTGRES_POOL_ENABLED', 'True') == 'True'
+POSTGRES_POOL_OPTIONS = {
+    'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.getenv('POSTGRES_POOL_TIMEOUT', '10')),  # seconds to wait for a free connection
+    'max_idle': float(os.getenv('POSTGRES_POOL_MAX_IDLE', '300')),  # close idle connections after N seconds
+    'max_lifetime': float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', '3600')),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -91,10 +105,41 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USERNAME'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOSTNAME'),
-        'PORT': '5432'
+        'PORT': '5432',
+        # Pooling and persistent connections are mutually exclusive in Django.
+        'CONN_MAX_AGE': 0 if POSTGRES_POOL_ENABLED else int(os.getenv('POSTGRES_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('POSTGRES_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {'pool': POSTGRES_POOL_OPTIONS} if POSTGRES_POOL_ENABLED else {},
     }
 }
 
+# Read replicas for user SQL (see dbqueryapp/routers.py). POSTGRES_REPLICA_HOSTS is a comma-separated
+# list of host[:port] entries; each becomes a `replica_N` alias sharing the primary's credentials
+# unless POSTGRES_REPLICA_USERNAME/POSTGRES_REPLICA_PASSWORD are set. Reads fall back to `default`
+# only when every replica is unreachable or lags more than REPLICA_MAX_LAG_SECONDS.
+READ_REPLICAS = []
+for _index, _replica in enumerate(h.strip() for h in os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',') if h.strip()):
+    _host, _, _port = _replica.partition(':')
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'USER': os.getenv('POSTGRES_REPLICA_USERNAME', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('POSTGRES_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        # fail over quickly when a replica host is down instead of waiting out the OS TCP timeout
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'connect_timeout': int(os.getenv('REPLICA_CONNECT_TIMEOUT', '3'))},
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(_alias)
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', '5'))
+# ORM reads stay on the primary unless their model is listed here ("app_label.ModelName", comma-separated);
+# user SQL goes through routers.run_on_read_database regardless
+READ_REPLICA_MODELS = [m.strip() for m in os.getenv('READ_REPLICA_MODELS', '').split(',') if m.strip()]
+DATABASE_ROUTERS = ['dbqueryapp.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -168,4 +213,68 @@ LOGGING = {
 }
 
 # Custom setting for maximum SQL query depth
-MAX_QUERY_DEPTH = 10
\ No newline at end of file
+MAX_QUERY_DEPTH = 10
+
+# Background query jobs (see dbqueryapp/jobs.py)
+QUERY_JOB_MAX_WORKERS = int(os.getenv('QUERY_JOB_MAX_WORKERS', '4'))
+QUERY_JOB_PAGE_SIZE = int(os.getenv('QUERY_JOB_PAGE_SIZE', '100'))
+QUERY_JOB_TTL = int(os.getenv('QUERY_JOB_TTL', '3600'))
+QUERY_JOB_COUNT_BATCH_SIZE = int(os.getenv('QUERY_JOB_COUNT_BATCH_SIZE', '10000'))
+
+# Admission control for interactive queries and exports (see dbqueryapp/admission.py).
+# Limits apply per worker process: size MAX_CONCURRENT as the database's budget / worker count.
+QUERY_ADMISSION_ENABLED = os.getenv('QUERY_ADMISSION_ENABLED', 'True') == 'True'
+QUERY_ADMISSION_MAX_CONCURRENT = int(os.getenv('QUERY_ADMISSION_MAX_CONCURRENT', '8'))
+QUERY_ADMISSION_MAX_PER_OWNER = int(os.getenv('QUERY_ADMISSION_MAX_PER_OWNER', '2'))
+QUERY_ADMISSION_MAX_QUEUE = int(os.getenv('QUERY_ADMISSION_MAX_QUEUE', '50'))
+QUERY_ADMISSION_TIMEOUT = float(os.getenv('QUERY_ADMISSION_TIMEOUT', '10'))
+
+# Shared predefined-query result cache (see dbqueryapp/result_cache.py)
+DATA_GENERATION_CHECK_INTERVAL = int(os.getenv('DATA_GENERATION_CHECK_INTERVAL', '5'))
+PREDEFINED_RESULT_CACHE_TTL = int(os.getenv('PREDEFINED_RESULT_CACHE_TTL', str(60 * 60 * 24)))
+
+# Rows fetched from the server-side cursor per batch when streaming exports (see dbqueryapp/exporters.py)
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '10000'))
+# Rows per INSERT statement in SQL exports; overridable per download with ?sql_batch_size=
+SQL_EXPORT_ROWS_PER_STATEMENT = int(os.getenv('SQL_EXPORT_ROWS_PER_STATEMENT', '1000'))
+# Compressed exports (?compress=gzip|zstd, see dbqueryapp/compression.py)
+EXPORT_COMPRESSION_QUEUE_SIZE = int(os.getenv('EXPORT_COMPRESSION_QUEUE_SIZE', '4'))
+EXPORT_GZIP_LEVEL = int(os.getenv('EXPORT_GZIP_LEVEL', '6'))
+EXPORT_ZSTD_LEVEL = int(os.getenv('EXPORT_ZSTD_LEVEL', '3'))
+
+# Owner-name and address search endpoint (see dbqueryapp/search.py)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '25'))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '100'))
+SEARCH_MAX_PAGE = int(os.getenv('SEARCH_MAX_PAGE', '40'))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(60 * 60)))
+
+# Batch account profile endpoint (see dbqueryapp/profiles.py)
+PROFILE_MAX_ACCOUNTS = int(os.getenv('PROFILE_MAX_ACCOUNTS', '100'))
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', str(60 * 60 * 24)))
+
+# Column statistics endpoint over ingest's profiling (see dbqueryapp/table_stats.py)
+TABLE_STATS_CACHE_TTL = int(os.getenv('TABLE_STATS_CACHE_TTL', str(60 * 60 * 24)))
+
+# Schema catalog for clients and LLM prompts (see dbqueryapp/schema_catalog.py)
+SCHEMA_CATALOG_CACHE_TTL = int(os.getenv('SCHEMA_CATALOG_CACHE_TTL', str(60 * 60 * 24)))
+SCHEMA_CATALOG_SAMPLE_VALUES = int(os.getenv('SCHEMA_CATALOG_SAMPLE_VALUES', '3'))
+SCHEMA_CATALOG_TEXT_TOKENS = int(os.getenv('SCHEMA_CATALOG_TEXT_TOKENS', '2000'))
+
+# Embedded DuckDB analytics backend over ingest's Parquet snapshots (see dbqueryapp/analytics.py).
+# Leave ANALYTICS_PARQUET_DIR unset to disable it; it must point at ingest's parquet_snapshot_dir setting.
+ANALYTICS_PARQUET_DIR = os.getenv('ANALYTICS_PARQUET_DIR') or None
+ANALYTICS_THREADS = int(os.getenv('ANALYTICS_THREADS', '0')) or None  # None: one per core
+ANALYTICS_MEMORY_LIMIT = os.getenv('ANALYTICS_MEMORY_LIMIT') or None  # e.g. '4GB'
+
+# Query telemetry (see dbqueryapp/telemetry.py). Records are buffered in memory and
+# bulk-inserted by a background thread into TELEMETRY_DATABASE, whose user needs
+# INSERT on dbqueryapp_querytelemetry (run `manage.py migrate` with a privileged user).
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'True') == 'True'
+TELEMETRY_DATABASE = os.getenv('TELEMETRY_DATABASE', 'default')
+TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', '200'))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '5'))
+TELEMETRY_MAX_BUFFER = int(os.getenv('TELEMETRY_MAX_BUFFER', '10000'))
+
+# Index advisor (manage.py suggest_indexes, see dbqueryapp/advisor.py)
+ADVISOR_MAX_INDEX_COLUMNS = int(os.getenv('ADVISOR_MAX_INDEX_COLUMNS', '3'))
+ADVISOR_STATEMENT_TIMEOUT_MS = int(os.getenv('ADVISOR_STATEMENT_TIMEOUT_MS', '60000'))